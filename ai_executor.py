@@ -0,0 +1,262 @@
+"""
+AI executor for the Twenty Dots server
+Runs AI decisions in a bounded process pool so searching never blocks the eventlet loop
+"""
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_player import AIPlayer, MAX_DECISION_SECONDS
+from server_log import get_logger
+
+log = get_logger('ai')
+
+
+class GameSnapshot:
+    """
+    Picklable view of a TwentyDots game holding only what one AI seat may see.
+    Opponent hands are reduced to their sizes and only the seat's own landmines are included.
+    """
+
+    def __init__(self, game, player_name):
+        self.grid = [row[:] for row in game.grid]
+        self.blocks = [dict(block) for block in getattr(game, 'blocks', [])]
+        self.landmines = [dict(lm) for lm in game.landmines if lm['player'] == player_name]
+        self.yellow_dot_position = game.yellow_dot_position
+        self.players = {}
+        for name, data in game.players.items():
+            hand = list(data['hand']) if name == player_name else [None] * len(data['hand'])
+            self.players[name] = {'hand': hand, 'total_dots': data['total_dots'], 'score': dict(data['score'])}
+
+
+def run_decision(kind, ai_config, snapshot, player_name, cards_left, beliefs=None, ai_player=None):
+    """
+    Worker entry point: rebuild the AI (unless given one built from ai_config) and make one decision.
+
+    Returns:
+        (decision, seconds spent searching)
+    """
+    start = time.perf_counter()
+    if ai_player is None:
+        ai_player = AIPlayer(**ai_config)
+    control = ai_player.new_control()
+    if kind == 'power':
+        decision = ai_player.choose_power_action(snapshot, player_name, control, beliefs)
+    else:
+        decision = ai_player.plan_turn(snapshot, player_name, cards_left, control, beliefs)
+    return decision, time.perf_counter() - start
+
+
+def run_batch(jobs):
+    """
+    Worker entry point for a batch: make every decision in one round trip.
+    Jobs with the same budget share one AIPlayer (decisions don't change it). Their boards
+    come from different games, so the searches themselves have nothing to share.
+
+    Returns:
+        One (decision, seconds) per job, or None for a job that failed
+    """
+    ai_players = {}
+    results = []
+    for job in jobs:
+        try:
+            key = repr(job[1])
+            if key not in ai_players:
+                ai_players[key] = AIPlayer(**job[1])
+            results.append(run_decision(*job, ai_player=ai_players[key]))
+        except Exception as e:
+            log.exception("[AI_EXECUTOR] Batched decision failed: %s", e)
+            results.append(None)
+    return results
+
+
+class AIExecutor:
+    """
+    Bounded, batching process pool for AI decisions.
+
+    decide() queues a snapshot of the game and waits cooperatively (via
+    sleep_fn) for the result, so the calling greenlet parks instead of
+    blocking the hub. Decisions queued within batch_window seconds of each
+    other - usually from different games - are split over the workers and
+    sent as one job per worker, so hundreds of solo tables pay for a few
+    round trips instead of one each. A decision that arrives while no other
+    is in flight is sent at once instead of waiting out the window. Decisions for a game can be cancelled
+    when it is torn down.
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, sleep_fn=time.sleep, poll_interval=0.01,
+                 batch_window=0.005, max_batch=16):
+        """
+        Args:
+            max_workers: Worker processes (0 disables the pool - callers search in-process)
+            max_pending: Decisions allowed in flight before new ones are refused
+            sleep_fn: Cooperative sleep used while waiting (socketio.sleep on the server)
+            poll_interval: Seconds between result checks
+            batch_window: Seconds the first queued decision waits for others to join its batch
+                (only while other decisions are in flight)
+            max_batch: Queued decisions that flush the batch early
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.sleep_fn = sleep_fn
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.pool = None
+        self.queued = []  # requests waiting for the batch window to close
+        self.pending = {}  # id(request) -> request, queued or running
+        self.latencies = deque(maxlen=1000)  # queue-to-result seconds
+        self.search_times = deque(maxlen=1000)  # seconds spent searching in the worker
+        self.batch_sizes = deque(maxlen=1000)
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_pool(self):
+        if self.pool is None:
+            # spawn: never fork the running eventlet hub
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def _flush(self):
+        """Send every queued decision to the pool, one job per worker."""
+        requests, self.queued = self.queued, []
+        if not requests:
+            return
+        self.batch_sizes.append(len(requests))
+        chunks = [requests[i::self.max_workers] for i in range(min(self.max_workers, len(requests)))]
+        for chunk in chunks:
+            future = self._get_pool().submit(run_batch, [request['job'] for request in chunk])
+            for position, request in enumerate(chunk):
+                request['future'] = future
+                request['position'] = position
+
+    def decide(self, game_id, kind, ai_player, game, player_name, cards_left=2, cancelled=None, beliefs=None):
+        """
+        Run one AI decision in the pool.
+
+        Args:
+            game_id: Game the decision belongs to (for cancellation and stats)
+            kind: 'power' (AIPlayer.choose_power_action) or 'plan' (AIPlayer.plan_turn)
+            ai_player: The seat's AIPlayer (its effective budget is sent, not the object)
+            game: Live TwentyDots game (snapshotted before queueing)
+            player_name: Seat to decide for
+            cards_left: Regular cards still to play (plan only)
+            cancelled: Callable returning True once the decision is no longer wanted
+            beliefs: The seat's OpponentBeliefs (picklable, sent with the snapshot)
+
+        Returns:
+            (True, decision) on success, or (False, None) if the pool is disabled,
+            full, timed out or the decision was cancelled
+        """
+        if self.max_workers <= 0:
+            return False, None
+        if len(self.pending) >= self.max_pending:
+            self.rejected += 1
+            return False, None
+
+        ai_config = ai_player.budget()
+        request = {
+            'game_id': game_id,
+            'job': (kind, ai_config, GameSnapshot(game, player_name), player_name, cards_left, beliefs),
+            'future': None,
+            'position': None,
+            'cancelled': False,
+        }
+        submitted = time.perf_counter()
+        self.queued.append(request)
+        self.pending[id(request)] = request
+
+        try:
+            if len(self.queued) >= self.max_batch:
+                self._flush()
+            elif len(self.queued) == 1:
+                # First in the window: if other games' AIs are busy, give them a moment to join, then send the batch
+                if len(self.pending) > 1:
+                    self.sleep_fn(self.batch_window)
+                self._flush()
+
+            # Generous timeout - the first decision also pays for starting the worker
+            timeout = submitted + MAX_DECISION_SECONDS * self.max_batch + 5.0
+            while request['future'] is None or not request['future'].done():
+                if request['cancelled'] or (cancelled and cancelled()) or time.perf_counter() > timeout:
+                    if not request['cancelled'] and not (cancelled and cancelled()):
+                        self.timed_out += 1
+                    self._abandon(request)
+                    return False, None
+                self.sleep_fn(self.poll_interval)
+            if request['future'].cancelled():
+                self.cancelled += 1
+                return False, None
+            result = request['future'].result()[request['position']]
+            if result is None:
+                return False, None
+            decision, search_seconds = result
+        except Exception as e:
+            log.warning("[AI_EXECUTOR] Decision for %s failed: %s", game_id, e)
+            return False, None
+        finally:
+            self.pending.pop(id(request), None)
+
+        self.completed += 1
+        self.latencies.append(time.perf_counter() - submitted)
+        self.search_times.append(search_seconds)
+        return True, decision
+
+    def _abandon(self, request):
+        """Drop a request: unqueue it, or cancel its batch if nobody else is waiting on it."""
+        request['cancelled'] = True
+        self.cancelled += 1
+        if request in self.queued:
+            self.queued.remove(request)
+            return
+        future = request['future']
+        if future is not None and all(other['cancelled'] for other in self.pending.values()
+                                      if other['future'] is future):
+            future.cancel()
+
+    def cancel_game(self, game_id):
+        """Cancel every queued or running decision for a game. Returns how many were cancelled."""
+        count = 0
+        for request in list(self.pending.values()):
+            if request['game_id'] == game_id and not request['cancelled']:
+                self._abandon(request)
+                count += 1
+        return count
+
+    def stats(self):
+        """Queue depth, batching, counters and latency percentiles (milliseconds)"""
+        def percentile(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        by_game = {}
+        for request in self.pending.values():
+            by_game[request['game_id']] = by_game.get(request['game_id'], 0) + 1
+        return {
+            'workers': self.max_workers,
+            'queue_depth': len(self.pending),
+            'waiting_for_batch': len(self.queued),
+            'max_pending': self.max_pending,
+            'pending_by_game': by_game,
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'batches': len(self.batch_sizes),
+            'mean_batch_size': round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else 0,
+            'batch_window_ms': self.batch_window * 1000,
+            'latency_ms': {'p50': percentile(self.latencies, 0.5), 'p95': percentile(self.latencies, 0.95),
+                           'p99': percentile(self.latencies, 0.99)},
+            'search_ms': {'p50': percentile(self.search_times, 0.5), 'p95': percentile(self.search_times, 0.95)},
+        }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
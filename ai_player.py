@@ -1,95 +1,330 @@
+import json
+import logging
+import os
 import random
-from typing import List, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
+
+from twenty_dots import Dot, TwentyDots
+
+# AI diagnostics (the server routes these through server_log; standalone, warnings go to stderr)
+log = logging.getLogger('twentydots.ai')
+
+
+# Weights for the board evaluation used by the AI search
+DEFAULT_WEIGHTS = {
+    'gain': 1.0,            # dots collected by the move itself
+    'hand_potential': 0.6,  # best collection still available from the cards left in hand
+    'open_lines': 0.15,     # lines of 3 with two matching dots and an open third cell
+    'card_cost': 0.5,       # cost per card given away or sacrificed
+    'denial': 0.5,          # value per opponent dot a block or landmine takes away
+}
+
+# Tuned weights written by tune_weights.py, loaded over DEFAULT_WEIGHTS when present
+WEIGHTS_FILE = os.environ.get('AI_WEIGHTS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_weights.json'))
+WEIGHTS_FORMAT = 1
+_loaded_weights = {}
+
+# Compute budget behind each difficulty name: milliseconds and search nodes per
+# decision (None = no node cap) and the deepest search iteration. Every level
+# runs the same search; the GUI and server names only pick a budget. Levels
+# differ in how many moves they look at: in tournaments, searching past depth 1
+# gained nothing measurable, so Hard stops at planning its whole turn.
+DIFFICULTY_BUDGETS = {
+    'easy': {'ms': 20, 'nodes': 2, 'depth': 1},
+    'medium': {'ms': 50, 'nodes': 3, 'depth': 1},
+    'hard': {'ms': 100, 'nodes': None, 'depth': 2},
+}
+
+# Hard cap on any single decision, whatever the budget asks for
+MAX_DECISION_SECONDS = 0.5
+
+# Opponent hands sampled from the seat's beliefs when scoring the reply (depth 3)
+BELIEF_SAMPLES = 12
+
+COLORS = ['red', 'blue', 'purple', 'green']
+LINE_DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+
+def load_weights(path: str = None) -> Dict[str, float]:
+    """
+    Evaluation weights from a tuned weight file (cached per path).
+    
+    Returns an empty dict if the file is missing or has an unknown format,
+    so callers fall back to DEFAULT_WEIGHTS.
+    """
+    path = path or WEIGHTS_FILE
+    if path not in _loaded_weights:
+        weights = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('format') == WEIGHTS_FORMAT:
+                weights = {k: float(v) for k, v in data['weights'].items() if k in DEFAULT_WEIGHTS}
+                log.info("[AI] Loaded weights version %s from %s", data.get('version'), path)
+            else:
+                log.warning("[AI] Ignoring %s: unknown weight file format %s", path, data.get('format'))
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("[AI] Ignoring %s: %s", path, e)
+        _loaded_weights[path] = weights
+    return _loaded_weights[path]
+
+
+def _line_windows(size: int = 6) -> List[Tuple[Tuple[int, int], ...]]:
+    """All 3-cell windows (as (row_idx, col_idx) triples) on the board."""
+    windows = []
+    for r in range(size):
+        for c in range(size):
+            for dc, dr in LINE_DIRECTIONS:
+                cells = tuple((r + dr * k, c + dc * k) for k in range(3))
+                if all(0 <= rr < size and 0 <= cc < size for rr, cc in cells):
+                    windows.append(cells)
+    return windows
+
+
+LINE_WINDOWS = _line_windows()
+
+
+class BoardSim:
+    """
+    Scratch copy of the board that the AI can play moves on.
+    
+    Borrows TwentyDots.check_line_match so simulated outcomes follow the
+    same matching rules as the live game.
+    """
+    
+    check_line_match = TwentyDots.check_line_match
+    
+    def __init__(self, grid, blocked=None, landmines=None, yellow_dot_position=None):
+        self.grid_size = 6
+        self.rows = ['A', 'B', 'C', 'D', 'E', 'F']
+        self.columns = ['1', '2', '3', '4', '5', '6']
+        self.grid = [row[:] for row in grid]
+        self.blocked = set(blocked or ())  # {(row_idx, col_idx)}
+        self.landmines = dict(landmines or {})  # 'A1' -> color
+        self.yellow_dot_position = yellow_dot_position
+    
+    @classmethod
+    def from_game(cls, game, player_name: str = None):
+        """Build a sim from a TwentyDots game, only seeing landmines placed by player_name."""
+        blocked = [(b['row'], b['col']) for b in getattr(game, 'blocks', [])]
+        landmines = {lm['location']: lm['color'] for lm in game.landmines
+                     if player_name is None or lm['player'] == player_name}
+        return cls(game.grid, blocked, landmines, game.yellow_dot_position)
+    
+    def copy(self):
+        return BoardSim(self.grid, self.blocked, self.landmines, self.yellow_dot_position)
+    
+    def collect(self, positions) -> int:
+        """Clear matched (col_idx, row_idx) positions. Returns number of dots collected."""
+        collected = 0
+        for col_idx, row_idx in positions:
+            if self.grid[row_idx][col_idx]:
+                self.grid[row_idx][col_idx] = None
+                collected += 1
+        return collected
+    
+    def play_card(self, row_idx: int, col_idx: int, color: str) -> Optional[int]:
+        """Place a card's dot. Returns dots gained (negative for a landmine), None if blocked."""
+        if (row_idx, col_idx) in self.blocked:
+            return None
+        gained = 0
+        current = self.grid[row_idx][col_idx]
+        if current:
+            gained += 1
+            if current.color == 'yellow':
+                self.yellow_dot_position = None
+        self.grid[row_idx][col_idx] = Dot(color)
+        
+        location = f"{self.rows[row_idx]}{self.columns[col_idx]}"
+        if location in self.landmines:
+            del self.landmines[location]
+            for r in range(max(0, row_idx - 1), min(self.grid_size, row_idx + 2)):
+                for c in range(max(0, col_idx - 1), min(self.grid_size, col_idx + 2)):
+                    self.grid[r][c] = None
+            return gained - 2
+        
+        match, _ = self.check_line_match(self.rows[row_idx], self.columns[col_idx], color)
+        return gained + self.collect(match)
+    
+    def swap(self, pos1: Tuple[int, int], pos2: Tuple[int, int]) -> int:
+        """Swap two dots and collect matches at both ends (mirrors handle_swap_dots)."""
+        (r1, c1), (r2, c2) = pos1, pos2
+        dot1, dot2 = self.grid[r1][c1], self.grid[r2][c2]
+        self.grid[r1][c1], self.grid[r2][c2] = dot2, dot1
+        match1, _ = self.check_line_match(self.rows[r1], self.columns[c1], dot2.color)
+        gained = self.collect(match1)
+        match2, _ = self.check_line_match(self.rows[r2], self.columns[c2], dot1.color)
+        return gained + self.collect(match2)
+    
+    def place_wild(self, row_idx: int, col_idx: int) -> Tuple[int, bool]:
+        """Place the yellow wild and collect every colour it completes (mirrors handle_place_wild).
+        Returns (dots gained, yellow collected)."""
+        if self.yellow_dot_position:
+            old_r, old_c = self.yellow_dot_position
+            self.grid[old_r][old_c] = None
+        self.grid[row_idx][col_idx] = Dot('yellow')
+        self.yellow_dot_position = (row_idx, col_idx)
+        
+        row, col = self.rows[row_idx], self.columns[col_idx]
+        matches = []
+        for color in ['red', 'blue', 'green', 'purple']:
+            match, _ = self.check_line_match(row, col, color)
+            if match:
+                matches.append(match)
+        
+        gained = sum(self.collect(match) for match in matches)
+        if matches:
+            self.yellow_dot_position = None
+        return gained, bool(matches)
+    
+    def completion_size(self, row_idx: int, col_idx: int, color: str) -> int:
+        """How many dots a card of this colour would collect here (without placing it)."""
+        if (row_idx, col_idx) in self.blocked:
+            return 0
+        match, _ = self.check_line_match(self.rows[row_idx], self.columns[col_idx], color)
+        return len(match)
+    
+    def open_lines(self) -> int:
+        """Count 3-cell windows holding two matching dots and an open, unblocked third cell."""
+        count = 0
+        grid = self.grid
+        for window in LINE_WINDOWS:
+            colors = []
+            empty = None
+            for r, c in window:
+                dot = grid[r][c]
+                if dot is None:
+                    if empty is not None:
+                        break
+                    empty = (r, c)
+                else:
+                    colors.append(dot.color)
+            else:
+                if empty is None or empty in self.blocked:
+                    continue
+                solid = [c for c in colors if c != 'yellow']
+                if len(set(solid)) <= 1:
+                    count += 1
+        return count
+
+
+def _cell(card) -> Optional[Tuple[int, int]]:
+    """(row_idx, col_idx) a regular card targets, or None for power cards."""
+    if getattr(card, 'power', None) or not card.location or len(card.location) < 2:
+        return None
+    return 'ABCDEF'.index(card.location[0]), '123456'.index(card.location[1])
+
+
+class SearchControl:
+    """
+    Deadline, cancellation and cooperative yielding for one AI decision.
+    
+    Searches call stop() once per node. Every yield_every nodes it calls
+    yield_fn (e.g. socketio.sleep(0)) so other games keep running while
+    the AI thinks.
+    """
+    
+    def __init__(self, budget: float, yield_fn=None, cancelled=None, yield_every: int = 32, max_nodes: int = None):
+        """
+        Args:
+            budget: Seconds allowed (capped at MAX_DECISION_SECONDS)
+            yield_fn: Called periodically to hand control back to the event loop
+            cancelled: Callable returning True once the decision is no longer wanted
+            yield_every: Nodes between yields
+            max_nodes: Nodes allowed (None = only the deadline applies)
+        """
+        self.deadline = time.perf_counter() + min(budget, MAX_DECISION_SECONDS)
+        self.max_nodes = max_nodes
+        self.yield_fn = yield_fn
+        self.cancelled = cancelled or (lambda: False)
+        self.yield_every = yield_every
+        self.nodes = 0
+        self.stopped = False
+    
+    def stop(self) -> bool:
+        """Count a node and return True once the search must stop."""
+        if self.stopped:
+            return True
+        self.nodes += 1
+        if self.yield_fn and self.nodes % self.yield_every == 0:
+            self.yield_fn()
+        if ((self.max_nodes is not None and self.nodes >= self.max_nodes)
+                or time.perf_counter() >= self.deadline or self.cancelled()):
+            self.stopped = True
+        return self.stopped
 
 
 class AIPlayer:
     """AI player that makes strategic decisions."""
     
-    def __init__(self, difficulty: str = 'medium'):
+    def __init__(self, difficulty: str = 'medium', weights: Dict[str, float] = None, time_budget: float = None,
+                 node_budget: int = None, max_depth: int = None):
         """
         Initialize AI player.
         
         Args:
-            difficulty: 'easy', 'medium', or 'hard'
+            difficulty: 'easy', 'medium', or 'hard' - picks a budget from DIFFICULTY_BUDGETS
+            weights: Optional overrides for DEFAULT_WEIGHTS and the tuned weight file
+            time_budget: Optional seconds per decision (overrides the difficulty's budget)
+            node_budget: Optional search nodes per decision (overrides the difficulty's budget)
+            max_depth: Optional deepest search iteration (overrides the difficulty's budget)
         """
         self.difficulty = difficulty
+        self.weights = dict(DEFAULT_WEIGHTS, **load_weights())
+        self.weights.update(weights or {})
+        budget = DIFFICULTY_BUDGETS.get(difficulty, DIFFICULTY_BUDGETS['medium'])
+        self._time_budget = time_budget if time_budget is not None else budget['ms'] / 1000
+        self._node_budget = node_budget if node_budget is not None else budget['nodes']
+        self.max_depth = max_depth if max_depth is not None else budget['depth']
+        self.budget_scale = 1.0  # Lowered by the server under load
+    
+    @property
+    def time_budget(self) -> float:
+        """Seconds the search may spend on one decision (after budget_scale)."""
+        return self._time_budget * self.budget_scale
+    
+    @property
+    def node_budget(self) -> Optional[int]:
+        """Search nodes allowed per decision (after budget_scale), or None for no cap."""
+        if self._node_budget is None:
+            return None
+        return max(1, int(self._node_budget * self.budget_scale))
+    
+    def budget(self) -> Dict:
+        """Effective budget as AIPlayer keyword arguments (what worker processes rebuild the AI from)."""
+        return {'difficulty': self.difficulty, 'weights': self.weights, 'time_budget': self.time_budget,
+                'node_budget': self.node_budget, 'max_depth': self.max_depth}
     
-    def choose_cards(self, hand: List) -> List[int]:
+    def new_control(self, yield_fn=None, cancelled=None) -> SearchControl:
+        """SearchControl for one decision within this AI's budget."""
+        return SearchControl(self.time_budget, yield_fn=yield_fn, cancelled=cancelled, max_nodes=self.node_budget)
+    
+    def choose_cards(self, hand: List, game=None, player_name: str = None) -> List[int]:
         """
         Choose 2 cards to play from the hand.
         
+        Regular cards come from plan_turn (on an empty board when no game is
+        given); the rest of the pair is filled from the remaining cards.
+        
         Args:
             hand: List of Card objects
+            game: Optional TwentyDots game the hand belongs to
+            player_name: The hand's owner in game
         
         Returns:
             List of 2 indices to play
         """
-        if self.difficulty == 'easy':
-            return self._choose_cards_easy(hand)
-        elif self.difficulty == 'medium':
-            return self._choose_cards_medium(hand)
+        if game is None:
+            sim = BoardSim([[None] * 6 for _ in range(6)])
+            plan = self._plan(sim, hand, 2, self.new_control(), None)
         else:
-            return self._choose_cards_hard(hand)
-    
-    def _choose_cards_easy(self, hand: List) -> List[int]:
-        """Easy AI - random selection."""
-        if len(hand) < 2:
-            return list(range(len(hand)))
-        indices = list(range(len(hand)))
-        random.shuffle(indices)
-        return indices[:2]
-    
-    def _choose_cards_medium(self, hand: List) -> List[int]:
-        """Medium AI - simple strategy (prefer same colors)."""
-        if len(hand) < 2:
-            return list(range(len(hand)))
-        
-        # Group cards by color
-        color_groups = {}
-        for i, card in enumerate(hand):
-            if card.color not in color_groups:
-                color_groups[card.color] = []
-            color_groups[card.color].append(i)
-        
-        # Prefer cards of the same color
-        for color, indices in color_groups.items():
-            if len(indices) >= 2:
-                return indices[:2]
-        
-        # Otherwise pick randomly
-        indices = list(range(len(hand)))
-        random.shuffle(indices)
-        return indices[:2]
-    
-    def _choose_cards_hard(self, hand: List) -> List[int]:
-        """Hard AI - advanced strategy with board awareness."""
-        if len(hand) < 2:
-            return list(range(len(hand)))
-        
-        # Try to maximize potential line matches
-        best_score = -1
-        best_combination = None
-        
-        for i in range(len(hand)):
-            for j in range(i + 1, len(hand)):
-                # Score based on same color (higher priority for line matching)
-                score = 0
-                if hand[i].color == hand[j].color:
-                    score += 100
-                
-                # Additional strategy: prefer cards that aren't duplicated
-                if hand[i].location != hand[j].location:
-                    score += 50
-                
-                if score > best_score:
-                    best_score = score
-                    best_combination = [i, j]
-        
-        # Ensure we always return a valid combination
-        if best_combination is None or len(best_combination) < 2:
-            return [0, 1] if len(hand) >= 2 else list(range(len(hand)))
-        
-        return best_combination
+            plan = self.plan_turn(game, player_name, 2)
+        rest = [i for i in range(len(hand)) if i not in plan]
+        random.shuffle(rest)
+        return (plan + rest)[:2]
     
     def make_move(self, game_state: dict) -> Tuple[List[int], str]:
         """
@@ -107,3 +342,488 @@ class AIPlayer:
         description = f"AI plays {len(cards_to_play)} cards"
         
         return cards_to_play, description
+    
+    def card_value(self, sim: BoardSim, card) -> float:
+        """Dots a regular card would collect if played now (0 if blocked or a power card)."""
+        cell = _cell(card)
+        if cell is None or cell in sim.blocked:
+            return 0
+        row_idx, col_idx = cell
+        if f"{sim.rows[row_idx]}{sim.columns[col_idx]}" in sim.landmines:
+            return -2
+        value = sim.completion_size(row_idx, col_idx, card.color)
+        if sim.grid[row_idx][col_idx]:
+            value += 1
+        return value
+    
+    def evaluate(self, sim: BoardSim, hand: List) -> float:
+        """Score a board for the player holding hand (higher is better)."""
+        best = max((self.card_value(sim, c) for c in hand), default=0)
+        return (self.weights['hand_potential'] * max(best, 0)
+                - self.weights['open_lines'] * sim.open_lines())
+    
+    def plan_turn(self, game, player_name: str, cards_left: int = 2, control: SearchControl = None,
+                  beliefs=None) -> List[int]:
+        """
+        Pick the regular cards to play with an anytime iterative-deepening search.
+        
+        Depth 1 scores each card alone, depth 2 adds the rest of the turn and
+        depth 3 also charges for the best line left open to the next player.
+        Only completed depths replace the plan, so a deadline, node cap or
+        cancellation still returns the best move found so far. Difficulty is
+        only the size of that budget and max_depth.
+        
+        With beliefs, the reply is scored against opponent hands sampled from
+        them (the same samples for every plan) instead of assuming any card.
+        
+        Args:
+            game: TwentyDots game
+            player_name: Name of the AI seat to move
+            cards_left: Regular cards still to play this turn
+            control: Budget/cancellation for this decision (defaults to new_control())
+            beliefs: Optional hand_beliefs.OpponentBeliefs for player_name
+        
+        Returns:
+            Hand indices in play order (empty if no regular card is playable)
+        """
+        hand = game.players[player_name]['hand']
+        sim = BoardSim.from_game(game, player_name)
+        return self._plan(sim, hand, cards_left, control or self.new_control(), beliefs)
+    
+    def _plan(self, sim: BoardSim, hand: List, cards_left: int, control: SearchControl, beliefs) -> List[int]:
+        """plan_turn on a BoardSim."""
+        playable = [i for i, c in enumerate(hand) if _cell(c) is not None and _cell(c) not in sim.blocked]
+        if not playable or cards_left <= 0:
+            return []
+        
+        if control.max_nodes is None or control.max_nodes >= 2 * len(playable):
+            # Best cards first, so a cut-off iteration has already seen the likely winners
+            playable.sort(key=lambda i: -self.card_value(sim, hand[i]))
+        else:
+            # Too small a budget to order the moves: look at them in random order
+            random.shuffle(playable)
+        best_plan = playable[:1]
+        max_depth = self.max_depth
+        replies = None
+        if beliefs is not None and max_depth > cards_left:
+            replies = [[c for cards in beliefs.sample_hands().values() for c in cards if _cell(c)]
+                       for _ in range(BELIEF_SAMPLES)]
+        
+        for depth in range(1, max_depth + 1):
+            plan, complete = self._search_plan(sim, hand, playable, depth, cards_left, control, replies)
+            if complete or (depth == 1 and plan):
+                best_plan = plan
+            if not complete or depth > cards_left:
+                break
+        return best_plan
+    
+    def _search_plan(self, sim: BoardSim, hand: List, playable: List[int], depth: int,
+                     cards_left: int, control: SearchControl, replies=None) -> Tuple[List[int], bool]:
+        """One iteration of plan_turn. Returns (best plan, whether every sequence was searched)."""
+        plies = min(depth, cards_left)
+        with_reply = depth > cards_left
+        best_plan, best_score = [], None
+        
+        def sequences(prefix, used_cells):
+            if len(prefix) == plies:
+                yield prefix
+                return
+            for i in playable:
+                cell = _cell(hand[i])
+                if i not in prefix and cell not in used_cells:
+                    yield from sequences(prefix + [i], used_cells | {cell})
+        
+        for plan in sequences([], frozenset()):
+            trial = sim.copy()
+            gained = sum(trial.play_card(*_cell(hand[i]), hand[i].color) or 0 for i in plan)
+            rest = [c for j, c in enumerate(hand) if j not in plan]
+            score = self.weights['gain'] * gained + self.evaluate(trial, rest)
+            if with_reply and replies:
+                # Average over sampled opponent hands of the best card any of them could play
+                threat = sum(max((self.card_value(trial, c) for c in cards), default=0)
+                             for cards in replies) / len(replies)
+                score -= self.weights['denial'] * max(threat, 0)
+            elif with_reply:
+                open_cells = [(r, c) for r in range(6) for c in range(6)
+                              if not trial.grid[r][c] and (r, c) not in trial.blocked]
+                score -= self.weights['denial'] * max((self._threat(trial, r, c) for r, c in open_cells), default=0)
+            if best_score is None or score > best_score:
+                best_plan, best_score = plan, score
+            if control.stop():
+                return best_plan, False
+        return best_plan, True
+    
+    def choose_power_action(self, game, player_name: str, control: 'SearchControl' = None,
+                            beliefs=None) -> Optional[Dict]:
+        """
+        Decide whether to open the turn with a power card, and on which targets.
+        
+        Each power type in hand is searched over its targets (swap pairs, wild
+        cells, block cells, landmine sacrifices, card-swap partners) and the best
+        one is played only if it beats the best two regular cards.
+        
+        Args:
+            game: TwentyDots game
+            player_name: Name of the AI seat to move
+            control: Budget/cancellation for this decision (defaults to new_control())
+            beliefs: Optional hand_beliefs.OpponentBeliefs, used to value card-swap partners
+        
+        Returns:
+            Action dict with 'card_index', 'power', targets and 'score',
+            or None to play regular cards instead
+        """
+        hand = game.players[player_name]['hand']
+        power_indices = [i for i, c in enumerate(hand) if getattr(c, 'power', None)]
+        if not power_indices:
+            return None
+        
+        sim = BoardSim.from_game(game, player_name)
+        playable = [c for c in hand if _cell(c) is not None and _cell(c) not in sim.blocked]
+        opponents = {name: data for name, data in game.players.items() if name != player_name}
+        
+        control = control or self.new_control()
+        if control.max_nodes is not None and control.max_nodes < 2 * len(hand):
+            # A small budget only gets through the first power types, so don't always favour the same ones
+            random.shuffle(power_indices)
+        baseline = self._regular_turn_value(sim, hand) if playable else None
+        searchers = {
+            'swap': self._search_swap,
+            'remove': self._search_remove,
+            'wild_place': self._search_wild,
+            'block': self._search_block,
+            'landmine': self._search_landmine,
+            'card_swap': lambda *args: self._search_card_swap(*args, beliefs=beliefs),
+        }
+        
+        best = None
+        searched = set()
+        for i in power_indices:
+            power = hand[i].power
+            if power in searched or power not in searchers:
+                continue
+            searched.add(power)
+            rest = [c for j, c in enumerate(hand) if j != i]
+            action = searchers[power](sim, rest, opponents, control)
+            if action:
+                # Map indices into 'rest' back onto the full hand
+                if 'sacrifice_index' in action:
+                    action['sacrifice_index'] = hand.index(rest[action['sacrifice_index']])
+                if 'give_indices' in action:
+                    action['give_indices'] = [hand.index(rest[j]) for j in action['give_indices']]
+                action.update({'card_index': i, 'power': power})
+                if best is None or action['score'] > best['score']:
+                    best = action
+            if control.stop():
+                break
+        
+        if best is None or (baseline is not None and best['score'] <= baseline):
+            return None
+        return best
+    
+    def _regular_turn_value(self, sim: BoardSim, hand: List) -> float:
+        """Value of greedily playing the two best regular cards instead."""
+        trial = sim.copy()
+        remaining = [c for c in hand if _cell(c) is not None]
+        gained = 0
+        played_cells = set()
+        for _ in range(2):
+            options = [c for c in remaining if _cell(c) not in played_cells and _cell(c) not in trial.blocked]
+            if not options:
+                break
+            card = max(options, key=lambda c: self.card_value(trial, c))
+            gained += trial.play_card(*_cell(card), card.color) or 0
+            played_cells.add(_cell(card))
+            remaining.remove(card)
+        return self.weights['gain'] * gained + self.evaluate(trial, remaining)
+    
+    @staticmethod
+    def _touches(sim: BoardSim, pos: Tuple[int, int], color: str, exclude: Tuple[int, int]) -> bool:
+        """True if a neighbour of pos (other than exclude) could line up with color."""
+        r, c = pos
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                rr, cc = r + dr, c + dc
+                if (dr or dc) and (rr, cc) != exclude and 0 <= rr < 6 and 0 <= cc < 6:
+                    dot = sim.grid[rr][cc]
+                    if dot and (dot.color == color or dot.color == 'yellow' or color == 'yellow'):
+                        return True
+        return False
+    
+    def _search_swap(self, sim, rest, opponents, control):
+        """Best pair of dots to swap. Only pairs that land a dot next to its colour are tried."""
+        dots = [(r, c) for r in range(6) for c in range(6) if sim.grid[r][c]]
+        candidates = []
+        for a, p1 in enumerate(dots):
+            color1 = sim.grid[p1[0]][p1[1]].color
+            for p2 in dots[a + 1:]:
+                color2 = sim.grid[p2[0]][p2[1]].color
+                if color1 == color2:
+                    continue
+                if not (self._touches(sim, p1, color2, p2) or self._touches(sim, p2, color1, p1)):
+                    continue
+                trial = sim.copy()
+                gained = trial.swap(p1, p2)
+                if gained:
+                    candidates.append((gained, p1, p2, trial))
+            if control.stop():
+                break
+        
+        # Evaluate the biggest immediate gains first so a timeout keeps the best ones
+        candidates.sort(key=lambda item: -item[0])
+        best = None
+        for gained, p1, p2, trial in candidates:
+            score = self.weights['gain'] * gained + self.evaluate(trial, rest)
+            if best is None or score > best['score']:
+                best = {'pos1': p1, 'pos2': p2, 'score': score}
+            if control.stop():
+                break
+        return best
+    
+    def _search_remove(self, sim, rest, opponents, control):
+        """Expected value of removing a random coloured dot (the server picks the dot)."""
+        colored = [(r, c) for r in range(6) for c in range(6)
+                   if sim.grid[r][c] and sim.grid[r][c].color != 'yellow']
+        if not colored:
+            return None
+        total = 0.0
+        tried = 0
+        for r, c in colored:
+            trial = sim.copy()
+            trial.grid[r][c] = None
+            total += self.evaluate(trial, rest)
+            tried += 1
+            if control.stop():
+                break
+        return {'score': total / tried}
+    
+    def _search_wild(self, sim, rest, opponents, control):
+        """Best empty cell for the wild dot. Cells with no neighbouring dot cannot match and are skipped."""
+        best = None
+        for r in range(6):
+            for c in range(6):
+                if sim.grid[r][c] or (r, c) in sim.blocked:
+                    continue
+                if not self._touches(sim, (r, c), 'yellow', None):
+                    continue
+                trial = sim.copy()
+                gained, _ = trial.place_wild(r, c)
+                if not gained:
+                    continue
+                score = self.weights['gain'] * gained + self.evaluate(trial, rest)
+                if best is None or score > best['score']:
+                    best = {'position': (r, c), 'score': score}
+                if control.stop():
+                    return best
+        return best
+    
+    def _threat(self, sim: BoardSim, r: int, c: int) -> int:
+        """Largest collection any colour could make by playing at an empty cell."""
+        return max(sim.completion_size(r, c, color) for color in COLORS)
+    
+    def _search_block(self, sim, rest, opponents, control):
+        """Empty cell whose block takes the most away from opponents, keeping our own targets open."""
+        own_cells = {_cell(c) for c in rest}
+        best = None
+        for r in range(6):
+            for c in range(6):
+                if sim.grid[r][c] or (r, c) in sim.blocked or (r, c) in own_cells:
+                    continue
+                threat = self._threat(sim, r, c)
+                if not threat:
+                    continue
+                trial = sim.copy()
+                trial.blocked.add((r, c))
+                score = self.weights['denial'] * threat + self.evaluate(trial, rest)
+                if best is None or score > best['score']:
+                    best = {'position': (r, c), 'score': score}
+            if control.stop():
+                break
+        return best
+    
+    def _search_landmine(self, sim, rest, opponents, control):
+        """Sacrifice card whose (empty) cell makes the most tempting trap for its value."""
+        best = None
+        for j, card in enumerate(rest):
+            cell = _cell(card)
+            if cell is None or sim.grid[cell[0]][cell[1]] or cell in sim.blocked:
+                continue
+            location = f"{sim.rows[cell[0]]}{sim.columns[cell[1]]}"
+            if location in sim.landmines:
+                continue
+            kept = rest[:j] + rest[j + 1:]
+            trial = sim.copy()
+            trial.landmines[location] = card.color
+            score = (self.weights['denial'] * (2 + self._threat(sim, *cell))
+                     - self.weights['gain'] * max(self.card_value(sim, card), 0)
+                     - self.weights['card_cost']
+                     + self.evaluate(trial, kept))
+            if best is None or score > best['score']:
+                best = {'sacrifice_index': j, 'score': score}
+            if control.stop():
+                break
+        return best
+    
+    def _search_card_swap(self, sim, rest, opponents, control, beliefs=None):
+        """
+        Give away our two weakest cards for two of an opponent's.
+        
+        Without beliefs the opponent's cards are valued as an average card and
+        the leader is picked; with beliefs each hand is valued from its known
+        cards plus the unseen pool, and the richest hand is picked.
+        """
+        partners = [name for name, data in opponents.items() if len(data['hand']) >= 2]
+        if len(rest) < 2 or not partners:
+            return None
+        
+        def value(card):
+            return max(self.card_value(sim, card), 0) if _cell(card) else 0
+        
+        if beliefs is None:
+            partner = max(partners, key=lambda name: opponents[name]['total_dots'])
+            average = sum(max(sim.completion_size(r, c, color), 0)
+                          for r in range(6) for c in range(6) for color in COLORS) / 144
+        else:
+            pool = beliefs.pool_cards()
+            pool_average = sum(value(c) for c in pool) / len(pool) if pool else 0
+            
+            def expected_card(name):
+                known = beliefs.known_cards(name)
+                slots = beliefs.slots[name]
+                return (sum(value(c) for c in known) + slots * pool_average) / max(len(known) + slots, 1)
+            
+            partner = max(partners, key=lambda name: (expected_card(name), opponents[name]['total_dots']))
+            average = expected_card(partner)
+        
+        ranked = sorted(range(len(rest)), key=lambda j: self.card_value(sim, rest[j]) if _cell(rest[j]) else 1)
+        give = ranked[:2]
+        given_value = sum(max(self.card_value(sim, rest[j]), 0) for j in give)
+        kept = [rest[j] for j in ranked[2:]]
+        score = (self.weights['hand_potential'] * (2 * average - given_value)
+                 + self.evaluate(sim, kept))
+        return {'opponent': partner, 'give_indices': give, 'score': score}
+
+
+def apply_power_action(game, player_name: str, action: dict, num_players: int) -> dict:
+    """
+    Apply an AI power-card action to a TwentyDots game.
+    
+    Follows the same rules as the human power-card handlers in game_server.py.
+    Removes the power card (and any sacrificed or swapped cards) from the hand.
+    
+    Args:
+        game: TwentyDots game
+        player_name: AI seat playing the card
+        action: Action dict from AIPlayer.choose_power_action
+        num_players: Seats in the game (block duration is 3 rounds)
+    
+    Returns:
+        Dict with 'card' (the power card played), 'yellow_collected',
+        'events' (list of (event_name, payload) to broadcast), 'sacrifice'
+        (landmine card or None) and 'given'/'taken' (card swap cards or None)
+    """
+    hand = game.players[player_name]['hand']
+    card = hand[action['card_index']]
+    sacrifice = hand[action['sacrifice_index']] if 'sacrifice_index' in action else None
+    give = [hand[i] for i in action.get('give_indices', [])]
+    hand.remove(card)
+    
+    power = action['power']
+    events = []
+    yellow_collected = False
+    taken = None
+    
+    if power == 'swap':
+        (r1, c1), (r2, c2) = action['pos1'], action['pos2']
+        dot1, dot2 = game.grid[r1][c1], game.grid[r2][c2]
+        game.swap_dots((r1, c1), (r2, c2))
+        match1, color1 = game.check_line_match(game.rows[r1], game.columns[c1], dot2.color)
+        if match1:
+            game.collect_dots(match1, player_name, color1)
+        match2, color2 = game.check_line_match(game.rows[r2], game.columns[c2], dot1.color)
+        remaining = [(c, r) for c, r in match2 if game.grid[r][c] is not None]
+        if remaining:
+            game.collect_dots(remaining, player_name, color2)
+    
+    elif power == 'remove':
+        colored = [(r, c) for r in range(6) for c in range(6)
+                   if game.grid[r][c] and game.grid[r][c].color != 'yellow']
+        if colored:
+            r, c = random.choice(colored)
+            dot_color = game.grid[r][c].color
+            game.grid[r][c] = None
+            events.append(('dot_removed', {
+                'player': player_name,
+                'position': f"{game.rows[r]}{game.columns[c]}",
+                'color': dot_color
+            }))
+    
+    elif power == 'wild_place':
+        r, c = action['position']
+        row, col = game.rows[r], game.columns[c]
+        game.place_wild_at_location(row, col)
+        matches = []
+        for color in ['red', 'blue', 'green', 'purple']:
+            match, match_color = game.check_line_match(row, col, color)
+            if match:
+                matches.append((match, match_color))
+        for match, match_color in matches:
+            for col_idx, row_idx in match:
+                dot = game.grid[row_idx][col_idx]
+                if dot and dot.color == 'yellow':
+                    yellow_collected = True
+                    break
+            game.collect_dots(match, player_name, match_color)
+        if yellow_collected:
+            game.yellow_dot_position = None
+    
+    elif power == 'block':
+        r, c = action['position']
+        if not hasattr(game, 'blocks'):
+            game.blocks = []
+        game.blocks.append({
+            'row': r,
+            'col': c,
+            'turns_remaining': 3 * num_players,
+            'player': player_name
+        })
+        events.append(('block_placed', {
+            'position': f"{game.rows[r]}{game.columns[c]}",
+            'rounds_remaining': 3,
+            'player': player_name
+        }))
+    
+    elif power == 'landmine':
+        location = f"{sacrifice.location[0]}{sacrifice.location[1]}"
+        hand.remove(sacrifice)
+        game.place_landmine(location, sacrifice.color, player_name)
+        events.append(('landmine_placed', {
+            'player': player_name,
+            'message': f'{player_name} placed a landmine!'
+        }))
+    
+    elif power == 'card_swap':
+        opponent = action['opponent']
+        opponent_hand = game.players[opponent]['hand']
+        taken = random.sample(opponent_hand, min(2, len(opponent_hand)))
+        for c in give:
+            hand.remove(c)
+        for c in taken:
+            opponent_hand.remove(c)
+        hand.extend(taken)
+        opponent_hand.extend(give)
+        
+        def format_card(c):
+            if getattr(c, 'power', None):
+                return f"⚡{c.power.upper()}"
+            return f"{c.color.upper()} {c.location[0]}{c.location[1]}"
+        
+        events.append(('card_swap_complete', {
+            'player': player_name,
+            'opponent': opponent,
+            'gave': [format_card(c) for c in give],
+            'received': [format_card(c) for c in taken],
+            'message': f'{player_name} swapped 2 cards with {opponent}!'
+        }))
+    
+    return {'card': card, 'yellow_collected': yellow_collected, 'events': events,
+            'sacrifice': sacrifice, 'given': give if taken is not None else None, 'taken': taken}
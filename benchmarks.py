@@ -0,0 +1,407 @@
+"""
+Engine benchmarks for Twenty Dots
+Times the hot engine and server-state functions and whole simulated games on pinned seeds, writes the
+results as JSON and compares them with a stored baseline, failing on regressions past a threshold
+"""
+import argparse
+import contextlib
+import copy
+import functools
+import gc
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from twenty_dots import TwentyDots, Card
+from ai_player import AIPlayer, MAX_DECISION_SECONDS
+from simulator import HeadlessGame, play_game
+
+# Mid-game boards the micro benchmarks run on: 4 seats of easy AIs, BOARD_TURNS turns into each seed's game
+BOARD_SEEDS = range(1, 9)
+BOARD_TURNS = 12
+
+# Whole games per sample of the simulated game benchmarks. The search is capped by nodes, not time,
+# so the same seeds play the same moves on any machine.
+GAME_SEEDS = [1, 2, 3, 4]
+GAME_CONFIGS = {
+    'easy': {'difficulty': 'easy', 'time_budget': MAX_DECISION_SECONDS},
+    'medium': {'difficulty': 'medium', 'time_budget': MAX_DECISION_SECONDS, 'node_budget': 400},
+}
+
+MAX_LOOPS = 100000
+
+
+@functools.lru_cache(maxsize=None)
+def _boards():
+    """The mid-game HeadlessGames (built once, never modified - fork them before changing anything)"""
+    boards = []
+    for seed in BOARD_SEEDS:
+        ai_players = [AIPlayer(**GAME_CONFIGS['easy']) for _ in range(4)]
+        headless = HeadlessGame(ai_players, seed)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(BOARD_TURNS):
+                if headless.winner is not None:
+                    break
+                headless.play_turn()
+        boards.append(headless.game)
+    return boards
+
+
+def _fork(game):
+    """Copy of a board that collect_dots, place_card_dot and landmines can change freely"""
+    fork = copy.copy(game)
+    fork.grid = [row[:] for row in game.grid]
+    fork.players = {name: dict(data, score=dict(data['score']), hand=list(data['hand']))
+                    for name, data in game.players.items()}
+    fork.landmines = [dict(mine) for mine in game.landmines]
+    return fork
+
+
+def _cells(game, occupied=None):
+    """(row, col, dot) of every cell, only occupied (True) or empty (False) ones if asked"""
+    return [(game.rows[r], game.columns[c], dot)
+            for r, row in enumerate(game.grid) for c, dot in enumerate(row)
+            if occupied is None or (dot is not None) == occupied]
+
+
+@functools.lru_cache(maxsize=None)
+def _sessions():
+    """A started GameSession around a fork of each board"""
+    from game_server import GameSession  # Here, so the engine benchmarks don't load Flask; importing it starts nothing (see its main())
+    sessions = []
+    for index, board in enumerate(_boards()):
+        session = GameSession(f'bench{index}', None, player_count=len(board.players), power_cards=True)
+        for name in board.players:
+            session.add_player(f'sid-{name}', name)
+        session.game = _fork(board)
+        session.discard_piles = {name: [] for name in board.players}
+        session.started = True
+        sessions.append(session)
+    return sessions
+
+
+# Each benchmark takes (rng, loops), does its setup and returns run(), which does `loops` operations.
+# Only run() is timed; the setup draws from rng, so every sample times the same work.
+
+def bench_check_line_match(rng, loops):
+    cases = [(game, row, col, dot.color) for game in _boards()
+             for row, col, dot in _cells(game, occupied=True) if dot.color != 'yellow']
+    cases = [rng.choice(cases) for _ in range(loops)]
+
+    def run():
+        for game, row, col, color in cases:
+            game.check_line_match(row, col, color)
+    return run
+
+
+def bench_check_line_match_yellow(rng, loops):
+    cases = [(game, row, col) for game in _boards() for row, col, _ in _cells(game)]
+    cases = [rng.choice(cases) for _ in range(loops)]
+
+    def run():
+        for game, row, col in cases:
+            game.check_line_match(row, col, 'yellow')
+    return run
+
+
+def bench_place_card_dot(rng, loops):
+    games = [_fork(game) for game in _boards()]
+    rows, columns, colors = games[0].rows, games[0].columns, games[0].colors
+    cases = [(rng.choice(games), Card(rng.choice(rows) + rng.choice(columns), rng.choice(colors)))
+             for _ in range(loops)]
+
+    def run():
+        for game, card in cases:
+            game.place_card_dot(card)
+    return run
+
+
+def bench_collect_dots(rng, loops):
+    cases = []
+    for _ in range(loops):
+        game = _fork(rng.choice(_boards()))
+        cells = [(game.columns.index(col), game.rows.index(row)) for row, col, _ in _cells(game, occupied=True)]
+        positions = rng.sample(cells, min(len(cells), rng.randint(3, 6)))
+        cases.append((game, positions, rng.choice(list(game.players)), rng.choice(game.colors)))
+
+    def run():
+        for game, positions, player, color in cases:
+            game.collect_dots(positions, player, color)
+    return run
+
+
+def bench_check_and_detonate_landmine(rng, loops):
+    cases = []
+    for _ in range(loops):
+        game = _fork(rng.choice(_boards()))
+        locations = [row + col for row, col, _ in _cells(game)]
+        for location in rng.sample(locations, 3):  # The most a deck holds
+            game.landmines.append({'location': location, 'color': rng.choice(game.colors), 'player': 'Seat 1'})
+        cases.append((game, game.landmines[-1]['location'], rng.choice(list(game.players))))
+
+    def run():
+        for game, location, player in cases:
+            game.check_and_detonate_landmine(location, player)
+    return run
+
+
+def bench_create_deck(rng, loops):
+    game = _boards()[0]
+
+    def run():
+        for _ in range(loops):
+            game._create_deck()
+    return run
+
+
+def bench_deal_cards(rng, loops):
+    games = []
+    for _ in range(loops):
+        game = TwentyDots(num_players=4, power_cards=True)
+        rng.shuffle(game.deck)
+        games.append(game)
+
+    def run():
+        for game in games:
+            game.deal_cards(5)
+    return run
+
+
+def bench_get_game_state(rng, loops):
+    sessions = _sessions()
+    cases = [rng.choice(sessions) for _ in range(loops)]
+
+    def run():
+        for session in cases:
+            session.mark_changed()  # Rebuild, as after a move
+            session.get_game_state()
+    return run
+
+
+def bench_get_game_state_cached(rng, loops):
+    sessions = _sessions()
+    for session in sessions:
+        session.get_game_state()
+    cases = [rng.choice(sessions) for _ in range(loops)]
+
+    def run():
+        for session in cases:
+            session.get_game_state()
+    return run
+
+
+def bench_get_player_hand(rng, loops):
+    sessions = _sessions()
+    cases = [(session, rng.choice(session.player_order)) for session in (rng.choice(sessions) for _ in range(loops))]
+
+    def run():
+        for session, player in cases:
+            session.get_player_hand(player)
+    return run
+
+
+def _bench_games(difficulty):
+    def bench(rng, loops):
+        configs = [GAME_CONFIGS[difficulty]] * 2
+
+        def run():
+            for _ in range(loops):
+                for seed in GAME_SEEDS:
+                    play_game(configs, seed)
+        return run
+    return bench
+
+
+BENCHMARKS = [
+    ('check_line_match', bench_check_line_match),
+    ('check_line_match_yellow', bench_check_line_match_yellow),
+    ('place_card_dot', bench_place_card_dot),
+    ('collect_dots', bench_collect_dots),
+    ('check_and_detonate_landmine', bench_check_and_detonate_landmine),
+    ('create_deck', bench_create_deck),
+    ('deal_cards', bench_deal_cards),
+    ('get_game_state', bench_get_game_state),
+    ('get_game_state_cached', bench_get_game_state_cached),
+    ('get_player_hand', bench_get_player_hand),
+    ('simulated_games_easy', _bench_games('easy')),
+    ('simulated_games_medium', _bench_games('medium')),
+]
+
+
+def _sample(bench, loops, seed):
+    """Seconds per operation of one timed run (fresh setup from seed, garbage collector off while timing)"""
+    random.seed(seed)  # The deck's power cards and the dice use the global RNG
+    run = bench(random.Random(seed), loops)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return elapsed / loops
+
+
+def measure(bench, seed, repeats, min_time):
+    """
+    Time one benchmark.
+
+    Calibrates the loops per sample so a sample takes at least min_time seconds,
+    runs one warm-up sample, then `repeats` samples. The median and the median
+    absolute deviation (MAD) are reported, so a few samples disturbed by other
+    work on the machine don't move the result.
+
+    Returns:
+        Dict of per-operation microseconds ('median_us', 'mad_us', 'min_us', 'max_us'), 'loops' and 'samples_us'
+    """
+    loops = 1
+    while True:
+        per_op = _sample(bench, loops, seed)
+        if per_op * loops >= min_time or loops >= MAX_LOOPS:
+            break
+        loops = min(MAX_LOOPS, max(loops * 2, math.ceil(min_time / max(per_op, 1e-9) * 1.2)))
+    _sample(bench, loops, seed)
+    samples = [_sample(bench, loops, seed) * 1e6 for _ in range(repeats)]
+    median = statistics.median(samples)
+    return {
+        'median_us': round(median, 3),
+        'mad_us': round(statistics.median(abs(s - median) for s in samples), 3),
+        'min_us': round(min(samples), 3),
+        'max_us': round(max(samples), 3),
+        'loops': loops,
+        'samples_us': [round(s, 3) for s in samples],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(names, seed, repeats, min_time):
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'commit': _git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'settings': {'seed': seed, 'repeats': repeats, 'min_time': min_time},
+        'benchmarks': {},
+    }
+    for name, bench in BENCHMARKS:
+        if name not in names:
+            continue
+        result = measure(bench, seed, repeats, min_time)
+        results['benchmarks'][name] = result
+        print(f"{name:<30} {_format_us(result['median_us']):>10} ± {_format_us(result['mad_us']):<9} "
+              f"({repeats} x {result['loops']} loops)")
+    return results
+
+
+def compare(results, baseline, threshold, noise=3.0):
+    """
+    Compare results with a baseline run.
+
+    A benchmark regressed if its median is more than `threshold` (a fraction) above
+    the baseline's and the difference is also more than `noise` times the larger
+    MAD of the two runs, so jitter on a noisy machine isn't reported as a regression.
+
+    Returns:
+        List of (name, baseline median, median, ratio, verdict) with verdict
+        'regression', 'improvement' or 'ok'
+    """
+    rows = []
+    for name, result in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            continue
+        old, new = base['median_us'], result['median_us']
+        ratio = new / old if old else 1.0
+        significant = abs(new - old) > noise * max(base['mad_us'], result['mad_us'])
+        verdict = 'ok'
+        if significant and ratio > 1 + threshold:
+            verdict = 'regression'
+        elif significant and ratio < 1 / (1 + threshold):
+            verdict = 'improvement'
+        rows.append((name, old, new, ratio, verdict))
+    return rows
+
+
+def _format_us(us):
+    if us >= 1e6:
+        return f'{us / 1e6:.2f} s'
+    if us >= 1e3:
+        return f'{us / 1e3:.2f} ms'
+    return f'{us:.2f} us'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Twenty Dots engine benchmarks")
+    parser.add_argument('-k', '--filter', action='append',
+                        help="only benchmarks whose name contains this (repeatable)")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    parser.add_argument('--repeats', type=int, default=11, help="timed samples per benchmark (default 11)")
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help="seconds a sample runs for at least (default 0.05)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json',
+                        help="compare with this earlier run; the run fails if it is missing, --baseline '' skips comparing")
+    parser.add_argument('--save-baseline', action='store_true', help="also write this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown that fails the run, as a fraction (default 0.10)")
+    args = parser.parse_args()
+
+    names = [name for name, _ in BENCHMARKS
+             if not args.filter or any(pattern in name for pattern in args.filter)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = run_benchmarks(names, args.seed, args.repeats, args.min_time)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    status = 0
+    if args.baseline and not os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nNo baseline at {args.baseline}, nothing was compared. Record one on this machine with "
+              f"--save-baseline, or pass --baseline '' to run without comparing.", file=sys.stderr)
+        status = 2
+    elif args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('python') != results['environment']['python'] \
+                or baseline.get('environment', {}).get('machine') != results['environment']['machine']:
+            print("Warning: the baseline was recorded with another Python or machine")
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nAgainst {args.baseline} (commit {baseline.get('environment', {}).get('commit')}):")
+        for name, old, new, ratio, verdict in rows:
+            print(f"{name:<30} {_format_us(old):>10} -> {_format_us(new):>10}  {ratio:5.2f}x  {verdict}")
+        regressions = [row[0] for row in rows if row[4] == 'regression']
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            status = 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
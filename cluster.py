@@ -0,0 +1,460 @@
+"""
+Multi-worker mode for the Twenty Dots server
+One router port in front of several game_server.py processes: each game stays on one worker, and
+Socket.IO broadcasts reach every worker through a small Unix-socket broker run by the router.
+Requests without a game id all go to the first worker, which runs the lobby and matchmaking
+"""
+import argparse
+import bisect
+import hashlib
+import os
+import pickle
+import re
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import eventlet
+import eventlet.queue
+import socketio
+
+from server_log import get_logger, setup_logging
+
+log = get_logger('lobby')
+
+HEADER = struct.Struct('>I')  # Broker frames: 4-byte length, then a pickled pub/sub message
+PUBLISH, SUBSCRIBE = b'P', b'S'  # First byte a broker client sends: which way its connection goes (a frame with its host id follows)
+GAME_PATH = re.compile(r'^/games/([^/]+)/')
+LOBBY_KEY = 'lobby'  # Route key of requests without a game id
+# Seconds a game's routing is kept once its last connection has closed: longer than a worker keeps any idle game
+PIN_TTL = float(os.environ.get('CLUSTER_PIN_TTL', 3600))
+PIN_SWEEP_SECONDS = 60
+GAME_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_server.py')
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Broker connection closed")
+        data += chunk
+    return data
+
+
+def _send_frame(sock, body):
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def _recv_frame(sock):
+    size, = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class HashRing:
+    """
+    Consistent hashing of keys (game ids) onto nodes (workers).
+
+    Every node owns `replicas` points on the ring, so adding a node moves only
+    about 1/n of the keys to it and leaves the rest where they were.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self.points = []  # Sorted hashes
+        self.owners = {}  # hash -> node
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = self._hash(f'{node}#{i}')
+            self.owners[point] = node
+            bisect.insort(self.points, point)
+
+    def lookup(self, key):
+        """Node owning key (the first point clockwise from its hash)"""
+        if not self.points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self.points, self._hash(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+
+class UnixSocketManager(socketio.PubSubManager):
+    """
+    Socket.IO client manager that shares emits, room changes and disconnects
+    with the other workers through the router's broker (see Broker).
+
+    Publishes and the listener use separate connections; both reconnect on
+    their own if the broker goes away, and publishes made meanwhile are dropped.
+    Messages are pickled, so the broker socket must only be reachable by this
+    user (cluster.py puts it in a private directory).
+
+    Besides Socket.IO's own messages, workers can share() application data:
+    every other worker passes it to the handler registered with on_share().
+    """
+    name = 'unixsocket'
+
+    def __init__(self, path, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = path
+        self.publisher = None
+        self.publish_lock = None
+        self.share_handlers = {}  # topic -> handler(data)
+
+    def _modules(self):
+        # Green sockets under eventlet, so waiting on the broker never blocks other handlers
+        if self.server.async_mode == 'eventlet':
+            from eventlet.green import socket as socket_module, threading
+        else:
+            import threading
+            socket_module = socket
+        return socket_module, threading
+
+    def _connect(self, role):
+        socket_module, _ = self._modules()
+        sock = socket_module.socket(socket_module.AF_UNIX, socket_module.SOCK_STREAM)
+        sock.connect(self.path)
+        sock.sendall(role)
+        _send_frame(sock, self.host_id.encode('ascii'))
+        return sock
+
+    def _publish(self, data):
+        if self.publish_lock is None:
+            self.publish_lock = self._modules()[1].Lock()
+        with self.publish_lock:
+            try:
+                if self.publisher is None:
+                    self.publisher = self._connect(PUBLISH)
+                _send_frame(self.publisher, pickle.dumps(data))
+            except OSError as e:
+                log.warning("[CLUSTER] Broker publish failed, message dropped: %s", e)
+                self.publisher = None
+
+    def share(self, topic, data):
+        """Send data to the other workers' handler for topic (data must pickle)"""
+        self._publish({'method': 'share', 'topic': topic, 'data': data, 'host_id': self.host_id})
+
+    def on_share(self, topic, handler):
+        """Call handler(data) in the listener task for everything other workers share() on topic"""
+        self.share_handlers[topic] = handler
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._connect(SUBSCRIBE)
+                while True:
+                    message = pickle.loads(_recv_frame(sock))
+                    if message.get('method') != 'share':
+                        yield message
+                        continue
+                    handler = self.share_handlers.get(message['topic'])
+                    if handler is not None:
+                        try:
+                            handler(message['data'])
+                        except Exception as e:
+                            log.exception("[CLUSTER] Handling shared %s failed: %s", message['topic'], e)
+            except OSError as e:
+                log.warning("[CLUSTER] Broker connection lost (%s), reconnecting", e)
+                self.server.sleep(1)
+
+
+class Broker:
+    """
+    Fan-out for UnixSocketManager: every frame a worker publishes is sent to
+    every other subscribed worker (each connection names its worker's host id,
+    and a publisher's own subscription is skipped). Frames are passed on without
+    being decoded. Runs as green threads in the router process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.subscribers = {}  # Outgoing queue per subscribed worker -> its host id
+        self.published = 0
+
+    def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        umask = os.umask(0o177)  # Only this user may connect: workers unpickle what comes through
+        try:
+            server = eventlet.listen(self.path, family=socket.AF_UNIX)
+        finally:
+            os.umask(umask)
+        log.info("[CLUSTER] Broker listening on %s", self.path)
+        while True:
+            conn, _ = server.accept()
+            eventlet.spawn_n(self._handle, conn)
+
+    def _handle(self, conn):
+        try:
+            role = _recv_exact(conn, 1)
+            host_id = _recv_frame(conn)
+            if role == SUBSCRIBE:
+                self._feed(conn, host_id)
+            else:
+                while True:
+                    frame = _recv_frame(conn)
+                    self.published += 1
+                    for outgoing, subscriber in list(self.subscribers.items()):
+                        if subscriber != host_id:
+                            outgoing.put(frame)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _feed(self, conn, host_id):
+        outgoing = eventlet.queue.Queue()
+        self.subscribers[outgoing] = host_id
+        try:
+            while True:
+                _send_frame(conn, outgoing.get())
+        finally:
+            self.subscribers.pop(outgoing, None)
+
+
+def route_key(request_line):
+    """
+    Affinity key for one HTTP request line: its game id (from ?game_id= or a
+    /games/<id>/ path), else LOBBY_KEY - lobby and matchmaking traffic all
+    goes to one worker, so its game list and match queues cover every client.
+    """
+    try:
+        target = request_line.split(b' ')[1].decode('latin-1')
+    except IndexError:
+        target = '/'
+    url = urlsplit(target)
+    game_id = parse_qs(url.query).get('game_id', [None])[0]
+    if not game_id:
+        match = GAME_PATH.match(url.path)
+        game_id = match.group(1) if match else None
+    return f'game:{game_id}' if game_id else LOBBY_KEY
+
+
+class Router:
+    """
+    TCP front door: picks a worker from each connection's first request line
+    and then splices bytes both ways (HTTP keep-alive, long-polling and
+    WebSocket upgrades all stay on that worker).
+
+    Game keys are placed with a HashRing, and the first placement of a key is pinned,
+    so a worker added later only takes keys it has never seen - running games never move.
+    A pin is dropped once its game has had no open connection for PIN_TTL (the worker has
+    freed the game by then). LOBBY_KEY always goes to the first worker.
+    """
+
+    def __init__(self, workers=()):
+        self.workers = {}  # name -> (host, port)
+        self.ring = HashRing()
+        self.lobby_worker = None
+        self.pins = {}  # game route key -> [worker name, open connections, time the last one closed]
+        self.connections = {}  # worker name -> connections routed there
+        self.expired = 0
+        for name, address in workers:
+            self.add_worker(name, address)
+
+    def add_worker(self, name, address):
+        self.workers[name] = address
+        self.connections.setdefault(name, 0)
+        self.ring.add(name)
+        if self.lobby_worker is None:
+            self.lobby_worker = name
+
+    def pick(self, key):
+        """Worker for a route key, counting an open connection on a game's pin until release(key)"""
+        if key == LOBBY_KEY:
+            return self.lobby_worker
+        pin = self.pins.get(key)
+        if pin is None:
+            pin = self.pins[key] = [self.ring.lookup(key), 0, 0.0]
+        pin[1] += 1
+        return pin[0]
+
+    def release(self, key):
+        pin = self.pins.get(key)
+        if pin is not None:
+            pin[1] -= 1
+            pin[2] = time.time()
+
+    def expire_pins(self, now=None):
+        """Drop the pins of games with no open connection for PIN_TTL. Returns how many were dropped."""
+        cutoff = (now or time.time()) - PIN_TTL
+        stale = [key for key, (_, open_connections, closed) in self.pins.items()
+                 if not open_connections and closed < cutoff]
+        for key in stale:
+            del self.pins[key]
+        self.expired += len(stale)
+        return len(stale)
+
+    def serve(self, host, port):
+        server = eventlet.listen((host, port))
+        log.info("[CLUSTER] Router listening on %s:%s", host, port)
+        while True:
+            conn, address = server.accept()
+            eventlet.spawn_n(self._handle, conn, address)
+
+    def _handle(self, client, address):
+        upstream = None
+        key = None
+        try:
+            head = b''
+            while b'\r\n' not in head and len(head) < 8192:
+                chunk = client.recv(4096)
+                if not chunk:
+                    return
+                head += chunk
+            key = route_key(head.split(b'\r\n', 1)[0])
+            worker = self.pick(key)
+            self.connections[worker] += 1
+            upstream = eventlet.connect(self.workers[worker])
+            upstream.sendall(head)
+            eventlet.spawn_n(self._pipe, upstream, client)
+            self._pipe(client, upstream)
+        except OSError as e:
+            log.warning("[CLUSTER] Routing %s failed: %s", address, e)
+            client.close()
+            if upstream is not None:
+                upstream.close()
+        finally:
+            if key is not None:
+                self.release(key)
+
+    @staticmethod
+    def _pipe(source, target):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                target.sendall(data)
+        except (OSError, EOFError):  # EOFError: the other direction closed this socket under us
+            pass
+        finally:
+            source.close()
+            target.close()
+
+    def stats(self):
+        games = {}
+        for worker, _, _ in self.pins.values():
+            games[worker] = games.get(worker, 0) + 1
+        return {name: {'games': games.get(name, 0), 'connections': self.connections[name],
+                       'lobby': name == self.lobby_worker}
+                for name in self.workers}
+
+
+class Cluster:
+    """Worker processes, the broker and the router, run from one command"""
+
+    def __init__(self, broker_path, base_port):
+        self.broker_path = broker_path
+        self.base_port = base_port
+        self.processes = {}  # worker name -> Popen
+        self.router = Router()
+        self.grow_requested = False
+
+    def spawn_worker(self):
+        """Start one more game_server.py, wait until it listens, then give it new games"""
+        name = f'worker{len(self.processes)}'
+        port = self.base_port + len(self.processes)
+        env = dict(os.environ, PORT=str(port), TWENTYDOTS_BROKER=self.broker_path)
+        store = os.environ.get('GAME_STORE', 'games.db')
+        env['GAME_STORE'] = f'{os.path.splitext(store)[0]}-{name}.db' if store else ''  # One event log per worker
+        process = subprocess.Popen([sys.executable, '-u', GAME_SERVER], env=env)
+        self.processes[name] = process
+        deadline = time.time() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} exited with code {process.returncode}")
+            try:
+                eventlet.connect(('127.0.0.1', port)).close()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"{name} did not start listening on port {port}")
+                eventlet.sleep(0.2)
+        self.router.add_worker(name, ('127.0.0.1', port))
+        log.info("[CLUSTER] %s ready on port %s (pid %s)", name, port, process.pid)
+
+    def watch(self):
+        """Add a worker whenever SIGUSR1 arrives, report workers that exit and expire idle routing pins"""
+        reported = set()
+        next_sweep = time.time() + PIN_SWEEP_SECONDS
+        while True:
+            eventlet.sleep(0.5)
+            if time.time() >= next_sweep:
+                next_sweep = time.time() + PIN_SWEEP_SECONDS
+                if self.router.expire_pins():
+                    log.info("[CLUSTER] Expired idle game routes; routing now: %s", self.router.stats())
+            if self.grow_requested:
+                self.grow_requested = False
+                log.info("[CLUSTER] Adding a worker; routing so far: %s", self.router.stats())
+                try:
+                    self.spawn_worker()
+                except RuntimeError as e:
+                    log.error("[CLUSTER] Adding a worker failed: %s", e)
+            for name, process in self.processes.items():
+                if process.poll() is not None and name not in reported:
+                    reported.add(name)
+                    log.error("[CLUSTER] %s exited with code %s; its games are lost", name, process.returncode)
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.wait()
+        if os.path.exists(self.broker_path):
+            os.unlink(self.broker_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Twenty Dots server as several worker processes behind one port")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CLUSTER_WORKERS', 2)),
+                        help="worker processes to start with (default 2, or CLUSTER_WORKERS)")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)),
+                        help="port clients connect to (default 5000, or PORT)")
+    parser.add_argument('--base-port', type=int, default=5100,
+                        help="first worker port; workers listen on consecutive ports (default 5100)")
+    parser.add_argument('--broker',
+                        help="Unix socket path for the broadcast broker (default: in a new private temporary directory)")
+    args = parser.parse_args()
+    private_dir = None
+    if args.broker is None:
+        private_dir = tempfile.mkdtemp(prefix='twentydots-')  # Mode 0700
+        args.broker = os.path.join(private_dir, 'broker.sock')
+
+    setup_logging()
+    cluster = Cluster(args.broker, args.base_port)
+    broker = Broker(args.broker)
+    eventlet.spawn_n(broker.serve)
+    eventlet.sleep(0)
+    try:
+        for _ in range(args.workers):
+            cluster.spawn_worker()
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *_: setattr(cluster, 'grow_requested', True))
+        eventlet.spawn_n(cluster.watch)
+        print("=" * 60)
+        print(f"Twenty Dots cluster: {args.workers} workers behind http://0.0.0.0:{args.port}")
+        print(f"Add a worker: kill -USR1 {os.getpid()}")
+        print("=" * 60)
+        cluster.router.serve('0.0.0.0', args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
+        if private_dir:
+            os.rmdir(private_dir)
+
+
+if __name__ == '__main__':
+    main()
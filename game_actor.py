@@ -0,0 +1,122 @@
+"""
+Per-game actor for the Twenty Dots server
+Every change to one game runs as a command on that game's queue, one at a time, in the game's own task
+"""
+import time
+
+from server_log import get_logger
+
+log = get_logger('lobby')
+
+
+class ActorStopped(RuntimeError):
+    """The game's actor was stopped (the game was evicted), so it takes no more commands"""
+
+
+class GameActor:
+    """
+    One game's command queue and the background task that drains it.
+
+    Socket handlers call() their game's actor and wait for the result; AI turns
+    and other follow-ups are submit()ted and run after the current command.
+    Commands of one game never interleave, and games never wait on each other.
+    A command must not call() its own actor (it would wait on itself) - submit() instead.
+    """
+
+    def __init__(self, name, start_task, create_queue, after=None):
+        """
+        Args:
+            name: Game id (for logs and stats)
+            start_task: Starts a background task, e.g. socketio.start_background_task
+            create_queue: Makes a queue for the server's async mode, e.g. socketio.server.eio.create_queue
+            after: Called with no arguments after every command (failed ones too), in the actor's task
+        """
+        self.name = name
+        self.start_task = start_task
+        self.create_queue = create_queue
+        self.after = after
+        self.queue = create_queue()
+        self.task = None
+        self.stopped = False
+        self.queued = 0
+        self.max_queued = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.current = None  # Name of the running command
+
+    def _put(self, fn, args, reply):
+        if self.task is None:
+            self.task = self.start_task(self._run)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        self.queue.put((fn, args, reply))
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(*args) to run after the commands already queued, without waiting for it.
+        Returns False (and drops it) once the actor is stopped: follow-ups of an evicted game have nothing to do.
+        """
+        if self.stopped:
+            log.debug("[ACTOR] %s: dropped %s, the game is closed", self.name, getattr(fn, '__name__', repr(fn)))
+            return False
+        self._put(fn, args, None)
+        return True
+
+    def call(self, fn, *args):
+        """
+        Queue fn(*args), wait for it to run and return its result (its exception is re-raised here).
+        Raises ActorStopped once the actor is stopped.
+        """
+        if self.stopped:
+            raise ActorStopped(f"Game {self.name} is closed")
+        reply = self.create_queue()
+        self._put(fn, args, reply)
+        ok, value = reply.get()
+        if not ok:
+            raise value
+        return value
+
+    def stop(self):
+        """Finish the queued commands, then end the task. Later commands are refused."""
+        if not self.stopped:
+            self.stopped = True
+            self.queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            fn, args, reply = item
+            self.current = getattr(fn, '__name__', repr(fn))
+            start = time.perf_counter()
+            try:
+                outcome = (True, fn(*args))
+            except Exception as e:
+                self.failed += 1
+                outcome = (False, e)
+                if reply is None:
+                    log.exception("[ACTOR] %s: %s failed: %s", self.name, self.current, e)
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+                self.queued -= 1
+                self.processed += 1
+                self.current = None
+            if reply is not None:
+                reply.put(outcome)
+            if self.after is not None:
+                try:
+                    self.after()
+                except Exception as e:
+                    log.exception("[ACTOR] %s: after-command hook failed: %s", self.name, e)
+
+    def stats(self):
+        return {
+            'queued': self.queued,
+            'max_queued': self.max_queued,
+            'processed': self.processed,
+            'failed': self.failed,
+            'busy_ms': round(self.busy_seconds * 1000, 1),
+            'running': self.current,
+        }
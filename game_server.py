@@ -2,22 +2,201 @@
 Game Server for Twenty Dots
 Manages game state and coordinates multiple networked players
 """
-from flask import Flask, request, send_from_directory
+from flask import Flask, Response, copy_current_request_context, has_request_context, request, send_from_directory
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
+import functools
 import json
+import logging
 import os
+import re
+import time
+from collections import deque
 from twenty_dots import TwentyDots
-from ai_player import AIPlayer
+from ai_player import AIPlayer, apply_power_action
+from ai_executor import AIExecutor
+from cluster import UnixSocketManager
+from game_actor import ActorStopped, GameActor
+from game_store import GameStore, restore
+from game_sweeper import GameSweeper
+from hand_beliefs import HandBeliefs
+from lobby_index import LobbyIndex
+from matchmaking import Matchmaker, percentile
+from state_delta import diff_state
+from static_assets import StaticAssets
+from timer_wheel import TimerWheel
+from wire_format import JSONText, PacketJSON, WireStats, negotiate
+from server_log import get_logger, setup_logging
+from server_metrics import Registry, metered_packet_class, monitor_loop_lag
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'twentydots_secret_key'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Prometheus metrics, rendered by /metrics. Emitted events are counted by the Socket.IO packet class as they are encoded.
+metrics = Registry('twentydots')
+handler_seconds = metrics.histogram('handler_seconds', "Game command time from socket event to reply, queueing included", ['event'])
+emitted_events = metrics.counter('emitted_events_total', "Socket.IO events emitted (a room broadcast counts once)", ['event'])
+emitted_bytes = metrics.counter('emitted_bytes_total', "Encoded bytes of the emitted Socket.IO events", ['event'])
+ai_decision_seconds = metrics.histogram('ai_decision_seconds', "AI decision time, worker pool or in-process search", ['kind'])
+loop_lag_seconds = metrics.histogram('event_loop_lag_seconds', "How late a background task's sleep wakes up")
+connected_sockets = metrics.gauge('connected_sockets', "Connected Socket.IO clients")
+metrics.gauge('games', "Resident games by state", ['state'],
+              collect=lambda: {(state,): count for state, count in game_sweeper.resident().items()})
+
+# Under cluster.py each worker gets TWENTYDOTS_BROKER and shares room broadcasts and lobby changes with the other
+# workers through it (main() starts listening to the broker)
+broker_path = os.environ.get('TWENTYDOTS_BROKER')
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    client_manager=UnixSocketManager(broker_path) if broker_path else None,
+                    serializer=metered_packet_class(emitted_events, emitted_bytes), json=PacketJSON)
+
+# Handlers log through a queue drained by a background writer (LOG_LEVEL / LOG_LEVELS / LOG_FORMAT, see server_log),
+# set up by main()
+lobby_log = get_logger('lobby')
+turn_log = get_logger('turns')
+ai_log = get_logger('ai')
 
 # Active games dictionary: game_id -> game_data
 games = {}
 
+# Games not started yet, for list_games; clients in LOBBY_ROOM get every change as lobby_updated
+lobby_index = LobbyIndex()
+LOBBY_ROOM = 'lobby'
+
+# find_match queues; a table still short of players after MATCH_AI_FILL_SECONDS is completed with AI seats
+matchmaker = Matchmaker(ai_fill_after=float(os.environ.get('MATCH_AI_FILL_SECONDS', 30)))
+MATCH_AI_DIFFICULTY = os.environ.get('MATCH_AI_DIFFICULTY', 'medium')
+MATCH_MODES = ['twenty_dots', 'five_colors', 'five_with_yellow']
+
+# start_single_player takes a client-picked game_id (so cluster.py can route by it) only in the form it would generate
+SINGLE_PLAYER_ID = re.compile(r'sp_[0-9a-f]{8}')
+
+# Every command's changes to a game are logged to GAME_STORE (SQLite) so games survive a restart; GAME_STORE= turns it off.
+# A game's full state is snapshotted every GAME_SNAPSHOT_EVERY logged commands.
+GAME_STORE = os.environ.get('GAME_STORE', 'games.db')
+game_store = None  # Opened by main()
+
+# AI searches run in worker processes so a thinking AI never stalls other games (AI_WORKERS=0 searches in-process).
+# Decisions from different games arriving within AI_BATCH_MS of each other are sent to the workers together.
+ai_executor = AIExecutor(max_workers=int(os.environ.get('AI_WORKERS', 2)), sleep_fn=socketio.sleep,
+                         batch_window=float(os.environ.get('AI_BATCH_MS', 5)) / 1000)
+
+# AI difficulty is a compute budget. AI_BUDGET_SCALE multiplies every AI's budget (0.5 = half the
+# thinking time), and once more than AI_FULL_BUDGET_TURNS AI turns run at once budgets shrink so
+# total AI CPU stays about the same, down to AI_MIN_BUDGET_SCALE.
+AI_BUDGET_SCALE = float(os.environ.get('AI_BUDGET_SCALE', 1.0))
+AI_FULL_BUDGET_TURNS = int(os.environ.get('AI_FULL_BUDGET_TURNS', 8))
+AI_MIN_BUDGET_SCALE = 0.1
+
+# The pauses between AI moves (so humans can follow along) are entries on one timer wheel, advanced by a
+# single background task. AI_PACE multiplies every pause; games can set their own ai_pace (0 = no pauses).
+ai_wheel = TimerWheel(tick=float(os.environ.get('AI_WHEEL_TICK_MS', 50)) / 1000, sleep=socketio.sleep)
+AI_PACE = float(os.environ.get('AI_PACE', 1.0))
+
+# Steps of an AI turn (see GameSession.execute_ai_move), with the run times of the latest steps of each kind
+AI_ROLL = 'roll'
+AI_PLAY_CARD = 'play_card'
+AI_DRAW = 'draw'
+AI_ADVANCE = 'advance'
+AI_PHASES = [AI_ROLL, AI_PLAY_CARD, AI_DRAW, AI_ADVANCE]
+ai_transition_times = {phase: deque(maxlen=1000) for phase in AI_PHASES}
+
+
+# Wire encoding each client negotiated with set_encoding (sid -> 'msgpack'; everyone else gets JSON)
+client_encodings = {}
+wire_stats = WireStats()
+
+# The web client and its logo, read and precompressed once by main() (referenced files before the pages using them)
+STATIC_FILES = ['Twenty Dots Logo.png', 'web_client.html']
+static_assets = None
+
+
+def emit_encoded(event, payload, room, members=None, json_text=None):
+    """
+    Emit a state-bearing event (game_started, game_updated, your_hand) in each client's encoding.
+    
+    Args:
+        room: A game room or a single sid
+        members: The room's sids, for game rooms - MessagePack clients among them get the payload
+            as bytes one by one, the rest of the room gets JSON in one emit
+        json_text: The payload already encoded as JSONText, sent to JSON clients instead of encoding it again
+    """
+    binary = [sid for sid in (members if members is not None else [room]) if client_encodings.get(sid) == 'msgpack']
+    if binary:
+        data = wire_stats.encode(event, payload, 'msgpack')
+        for sid in binary:
+            socketio.emit(event, data, room=sid)
+    if members is not None or not binary:
+        socketio.emit(event, wire_stats.encode(event, json_text or payload, 'json'), room=room, skip_sid=binary or None)
+
+
+def game_command(handler):
+    """
+    Run a socket handler as a command on its game's actor (the game named by data['game_id']).
+    
+    The handler runs in the game's task with this request's context, after any commands
+    queued before it, while the socket task waits. Handlers for unknown games run directly
+    (they report the missing game themselves); a game evicted meanwhile gets an error event.
+    The wait is timed into handler_seconds.
+    """
+    event = handler.__name__[len('handle_'):]
+    
+    @functools.wraps(handler)
+    def wrapper(data, *args):
+        game_session = games.get((data or {}).get('game_id'))
+        if game_session is None:
+            return handler(data, *args)
+        start = time.perf_counter()
+        try:
+            return game_session.actor.call(copy_current_request_context(handler), data, *args)
+        except ActorStopped:
+            emit('error', {'message': 'Game not found'})
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, event)
+    return wrapper
+
+
+def run_new_game(game_session, setup, *args):
+    """
+    Register a new game and run setup(game_session, *args) as its first command, so even the
+    seating and dealing of a game go through its actor. From a socket handler the setup gets the
+    request's context and the handler waits for it; otherwise (the matchmaker) it is only queued.
+    """
+    games[game_session.game_id] = game_session
+    if has_request_context():
+        return game_session.actor.call(copy_current_request_context(setup), game_session, *args)
+    game_session.actor.submit(setup, game_session, *args)
+
+
+def ai_budget_scale():
+    """Budget multiplier for AI decisions under the current load"""
+    busy = sum(1 for session in games.values() if session.ai_move_in_progress)
+    load_scale = min(1.0, AI_FULL_BUDGET_TURNS / busy) if busy else 1.0
+    return max(AI_MIN_BUDGET_SCALE, AI_BUDGET_SCALE * load_scale)
+
+
+def ai_transition_stats():
+    """Recent AI turn steps per phase and their run time percentiles (milliseconds)"""
+    stats = {}
+    for phase, times in ai_transition_times.items():
+        ordered = sorted(times)
+        stats[phase] = {'recent': len(ordered)}
+        for pct in [50, 95]:
+            value = percentile(ordered, pct)
+            stats[phase][f'p{pct}_ms'] = round(value * 1000, 2) if ordered else 0.0
+        stats[phase]['max_ms'] = round(ordered[-1] * 1000, 2) if ordered else 0.0
+    return stats
+
+
+def ai_pace_option(data):
+    """A new game's ai_pace from its create_game / start_single_player data (AI_PACE if missing or invalid)"""
+    try:
+        return max(0.0, float(data.get('ai_pace', AI_PACE)))
+    except (ValueError, TypeError):
+        return AI_PACE
+
+
 class GameSession:
     def __init__(self, game_id, host_sid, game_mode='twenty_dots', player_count=2, power_cards=False):
         self.game_id = game_id
@@ -27,22 +206,35 @@ class GameSession:
         self.game = TwentyDots(num_players=2, difficulty='easy', ai_opponents={}, power_cards=power_cards)
         self.game.shuffle_deck()  # CRITICAL: Shuffle the deck!
         self.game.can_roll_dice = True  # First player must roll to place initial wild dot
-        print(f"Created new game {game_id} with mode {game_mode}, power_cards={power_cards}, requires {player_count} players. First 5 cards in deck: {[(c.location, c.color) for c in self.game.deck[:5]]}")
+        lobby_log.info("Created new game %s with mode %s, power_cards=%s, requires %s players. First 5 cards in deck: %s", game_id, game_mode, power_cards, player_count, [(c.location, c.color) for c in self.game.deck[:5]])
         self.players = {}  # sid -> player_info
         self.player_order = []  # List of player names in turn order
         self.ai_players = {}  # player_name -> AIPlayer instance
         self.host_sid = host_sid
         self.started = False
         self.discard_piles = {}  # Track discard piles for each player
+        # Every change to this game runs as a command on this queue (see game_command)
+        self.actor = GameActor(game_id, socketio.start_background_task, socketio.server.eio.create_queue, after=self.save)
+        self.beliefs = HandBeliefs(power_cards)  # Public card knowledge the AI infers opponent hands from
         self.ai_move_in_progress = False  # Flag to prevent overlapping AI moves
+        self.ai_cancelled = False  # Set when no human is left, stops AI searches and turn chains
+        self.ai_pace = AI_PACE  # Multiplies the pauses between AI moves
+        self.ai_timer = None  # Pending ai_wheel entry for the next AI move
+        self.ai_phase = None  # (AI player, phase of its next step) while an AI turn is under way
+        self.last_active = time.time()  # End of the last command, the sweeper evicts games idle too long
+        self.state_seq = 0  # Sequence number of the last state sent to the room
+        self.sent_state = None  # That state (a cached snapshot), deltas are diffed against it
+        self.sent_hands = {}  # Player name -> (hand seq, tuple of the Card objects last sent), your_hand diffs build on it
+        self.state_version = 0  # Bumped by mark_changed(), after every command
+        self._state_cache = {}  # 'version', 'state' and (once asked for) 'json' of the current version
         
     def add_player(self, sid, player_name, is_ai=False):
         """Add a player to the game"""
         if len(self.players) >= self.required_players:
-            print(f"[ADD_PLAYER] REJECTED: Game is full. Current: {len(self.players)}, Required: {self.required_players}")
+            lobby_log.debug("[ADD_PLAYER] REJECTED: Game is full. Current: %s, Required: %s", len(self.players), self.required_players)
             return False, f"Game is full ({self.required_players} players required)"
         
-        print(f"[ADD_PLAYER] Adding {player_name} to game {self.game_id}. Current players: {len(self.players)}, Required: {self.required_players}")
+        lobby_log.debug("[ADD_PLAYER] Adding %s to game %s. Current players: %s, Required: %s", player_name, self.game_id, len(self.players), self.required_players)
         if player_name in self.player_order:
             return False, f"Player name '{player_name}' already taken"
             
@@ -67,12 +259,50 @@ class GameSession:
                 del self.ai_players[player_name]
             del self.players[sid]
     
+    def save(self):
+        """
+        Runs after every command (a new game's setup is its first): notes the activity and
+        the state change, logs what changed for crash recovery and updates the lobby listing.
+        """
+        self.last_active = time.time()
+        self.mark_changed()
+        if games.get(self.game_id) is not self:
+            return  # Evicted (or never registered), nothing left to log or list
+        if game_store:
+            game_store.record(self)
+        update_lobby(self)
+    
     def get_player_name(self, sid):
         """Get player name from session ID"""
         return self.players.get(sid, {}).get('name')
     
+    def mark_changed(self):
+        """
+        Note that the game state may have changed, so the next get_game_state() rebuilds it.
+        Runs after every command and at the start of every broadcast (_sync_state): a spectator's
+        GET may have cached the state mid-command, before the moves being broadcast.
+        """
+        self.state_version += 1
+    
     def get_game_state(self):
-        """Get current game state for broadcasting"""
+        """
+        Current game state for broadcasting, built once per state version.
+        The returned dict is shared by every caller until the state changes - don't modify it.
+        """
+        version = self.state_version
+        if self._state_cache.get('version') != version:
+            self._state_cache = {'version': version, 'state': self._build_game_state()}
+        return self._state_cache['state']
+    
+    def get_game_state_json(self):
+        """get_game_state() encoded as JSON, also cached per state version"""
+        state = self.get_game_state()
+        if 'json' not in self._state_cache:
+            self._state_cache['json'] = json.dumps(state, separators=(',', ':'))
+        return self._state_cache['json']
+    
+    def _build_game_state(self):
+        """Build the game state dict (copies everything, so later moves never change a built state)"""
         # Build board with proper format
         board_data = []
         for row_idx, row in enumerate(self.game.grid):
@@ -121,11 +351,11 @@ class GameSession:
             'game_id': self.game_id,
             'board': board_data,
             'players': {name: {
-                'score': data['score'],
+                'score': dict(data['score']),
                 'total_dots': data['total_dots'],
                 'yellow_dots': data.get('yellow_dots', 0),
                 'hand_size': len(data['hand']),
-                'discard_pile': self.discard_piles.get(name, [])
+                'discard_pile': [dict(card) for card in self.discard_piles.get(name, [])]
             } for name, data in self.game.players.items()},
             'current_turn': self.game.get_current_player(),
             'turn_number': getattr(self.game, 'turn_number', 1),
@@ -137,39 +367,120 @@ class GameSession:
             'game_mode': self.game_mode
         }
     
-    def get_player_hand(self, player_name):
-        """Get specific player's hand"""
-        hand = self.game.players[player_name]['hand']
-        cards_data = []
-        for c in hand:
-            # Handle power cards
-            if hasattr(c, 'power') and c.power:
-                card_data = {
-                    'color': c.color,
-                    'location': ['P', 'W'],  # Power card location indicator
-                    'power': c.power,
-                    'power_description': c.get_power_description() if hasattr(c, 'get_power_description') else ''
-                }
-                cards_data.append(card_data)
-                continue
-                
-            # Handle both string and tuple locations
-            if isinstance(c.location, tuple):
-                loc = c.location
-            elif isinstance(c.location, str):
-                loc = (c.location[0], c.location[1])
-            else:
-                loc = ('?', '?')
-            
-            card_data = {
+    def _sync_state(self):
+        """Move sent_state up to the current state. Returns the game_updated payload, or None if nothing changed"""
+        self.mark_changed()
+        state = self.get_game_state()
+        if self.sent_state is None:
+            payload = dict(state, seq=self.state_seq + 1)
+        else:
+            delta = diff_state(self.sent_state, state)
+            if not delta:
+                return None  # The command didn't change anything the room sees
+            payload = {'seq': self.state_seq + 1, 'base': self.state_seq, 'delta': delta}
+        self.state_seq += 1
+        self.sent_state = state
+        return payload
+    
+    def broadcast_state(self):
+        """Send the room what changed since the last broadcast (a game_updated delta with a sequence number)"""
+        payload = self._sync_state()
+        if payload:
+            emit_encoded('game_updated', payload, self.game_id, self.players)
+    
+    def state_snapshot(self, notify=True):
+        """
+        Full state tagged with the sequence number the next delta builds on.
+        Sent on game start, join, reconnect, and when a client reports a gap.
+        
+        Args:
+            notify: Broadcast any pending change to the room first, so everyone shares the base
+                (not needed when the snapshot itself goes to the whole room)
+        """
+        payload = self._sync_state()
+        if payload and notify:
+            emit_encoded('game_updated', payload, self.game_id, self.players)
+        return dict(self.sent_state, seq=self.state_seq)
+    
+    def snapshot_json(self):
+        """The state_snapshot() just taken as JSONText, spliced from the state version's cached JSON"""
+        return JSONText('{"seq":%d,%s' % (self.state_seq, self.get_game_state_json()[1:]))
+    
+    def _card_data(self, c):
+        """One hand card as sent in your_hand"""
+        # Handle power cards
+        if hasattr(c, 'power') and c.power:
+            return {
                 'color': c.color,
-                'location': list(loc),
-                'power': None
+                'location': ['P', 'W'],  # Power card location indicator
+                'power': c.power,
+                'power_description': c.get_power_description() if hasattr(c, 'get_power_description') else ''
             }
-            cards_data.append(card_data)
         
-        print(f"Sending hand to {player_name}: {len(cards_data)} cards, power cards: {[c.get('power') for c in cards_data if c.get('power')]}")
-        return cards_data
+        # Handle both string and tuple locations
+        if isinstance(c.location, tuple):
+            loc = c.location
+        elif isinstance(c.location, str):
+            loc = (c.location[0], c.location[1])
+        else:
+            loc = ('?', '?')
+        
+        return {
+            'color': c.color,
+            'location': list(loc),
+            'power': None
+        }
+    
+    def get_player_hand(self, player_name):
+        """Get specific player's hand"""
+        return [self._card_data(c) for c in self.game.players[player_name]['hand']]
+    
+    def _hand_payload(self, player_name, full=False):
+        """
+        your_hand payload for player_name, or None if their hand is unchanged since the last one.
+        
+        Cards are compared by identity (they are never modified, only moved between deck,
+        hands and discards), so unchanged hands cost one tuple comparison. A changed hand is
+        sent as a diff against the last one: 'removed' indices into the old hand, then
+        'added' cards appended at the end. Full hands carry 'hand' instead.
+        """
+        cards = tuple(self.game.players[player_name]['hand'])
+        seq, sent = self.sent_hands.get(player_name, (0, None))
+        if not full and sent == cards:
+            return None
+        
+        payload = {'seq': seq + 1}
+        removed = []
+        kept = 0
+        if not full and sent is not None:
+            for index, card in enumerate(sent):
+                if kept < len(cards) and cards[kept] is card:
+                    kept += 1
+                else:
+                    removed.append(index)
+        if full or sent is None or not kept:
+            payload['hand'] = [self._card_data(c) for c in cards]
+        else:
+            payload.update(base=seq, removed=removed, added=[self._card_data(c) for c in cards[kept:]])
+        self.sent_hands[player_name] = (seq + 1, cards)
+        return payload
+    
+    def push_hands(self, names=None, full=False):
+        """
+        Send your_hand to every connected human whose hand changed since their last one.
+        
+        Args:
+            names: Only consider these players (default: everyone)
+            full: Send whole hands even if unchanged (game start, reconnect, resync)
+        """
+        for sid, player_info in self.players.items():
+            if player_info['is_ai'] or not player_info['connected']:
+                continue
+            if names is not None and player_info['name'] not in names:
+                continue
+            payload = self._hand_payload(player_info['name'], full)
+            if payload:
+                emit_encoded('your_hand', payload, sid)
     
     def advance_turn(self):
         """Advance to next player and decrement block turns.
@@ -181,15 +492,119 @@ class GameSession:
                 if block['turns_remaining'] <= 0:
                     row_letter = self.game.rows[block['row']]
                     col_str = self.game.columns[block['col']]
-                    print(f"[ADVANCE_TURN] Block at {row_letter}{col_str} expired")
+                    turn_log.debug("[ADVANCE_TURN] Block at %s%s expired", row_letter, col_str)
                     self.game.blocks.remove(block)
         
         # Now advance to next player
         self.game.next_player()
     
+    def start(self):
+        """Deal a new game to the seated players, send everyone the state and their hand, and let an AI open"""
+        # Initialize game with correct parameters
+        num_players = len(self.player_order)
+        self.game = TwentyDots(num_players=num_players, difficulty='easy', ai_opponents={}, power_cards=self.power_cards)
+        self.beliefs = HandBeliefs(self.game.power_cards_enabled)
+        lobby_log.debug("[START] Created TwentyDots with num_players=%s, power_cards=%s. Initial player names: %s", num_players, self.power_cards, list(self.game.players.keys()))
+        self.game.shuffle_deck()  # SHUFFLE THE NEW GAME!
+        
+        # Update player names in the game
+        old_names = list(self.game.players.keys())
+        for i, pname in enumerate(self.player_order):
+            if i < len(old_names):
+                old_name = old_names[i]
+                lobby_log.debug("[START] Renaming player %s: %s -> %s", i, old_name, pname)
+                self.game.players[pname] = self.game.players.pop(old_name)
+        
+        lobby_log.debug("[START] After renaming, player names: %s", list(self.game.players.keys()))
+        lobby_log.debug("[START] Current player (idx=0): %s", self.game.get_current_player())
+        
+        # Shuffle deck before dealing
+        self.game.shuffle_deck()
+        self.game.deal_cards(5)
+        self.started = True
+        
+        # Initialize discard piles and turn card counters for all players
+        self.game.turn_cards_played = {}
+        self.game.must_advance_after_roll = {}
+        for pname in self.player_order:
+            self.discard_piles[pname] = []
+            self.game.turn_cards_played[pname] = 0
+        
+        # Player 1 must roll wild dot first - enable roll dice
+        self.game.can_roll_dice = True
+        lobby_log.debug("[START] Set can_roll_dice=True. Player %s must roll first.", self.game.get_current_player())
+        
+        # Send game state to all players
+        game_state = self.state_snapshot(notify=False)
+        emit_encoded('game_started', game_state, self.game_id, self.players, json_text=self.snapshot_json())
+        
+        # Send each player their hand privately
+        self.push_hands(full=True)
+        
+        # Execute AI move if starting player is AI (AI must roll first)
+        if self.game.get_current_player() in self.ai_players:
+            self.actor.submit(self.execute_ai_move)
+    
+    def cancel_ai_moves(self):
+        """Stop any running AI search and AI turn chain (e.g. game abandoned)"""
+        self.ai_cancelled = True
+        ai_executor.cancel_game(self.game_id)
+        if self.ai_timer is not None:
+            ai_wheel.cancel(self.ai_timer)
+            self.ai_timer = None
+    
+    def resume_ai_moves(self):
+        """Re-enable AI moves after a cancel and continue if an AI is on turn"""
+        self.ai_cancelled = False
+        if self.started and self.game.get_current_player() in self.ai_players:
+            self.actor.submit(self.execute_ai_move)
+    
+    def has_connected_humans(self):
+        """Check if any human player is still connected"""
+        return any(not p['is_ai'] and p['connected'] for p in self.players.values())
+    
+    def ai_decide(self, ai_player, kind, player_name, cards_left):
+        """Get an AI decision from the executor pool, searching in-process if the pool is off or busy"""
+        ai_player.budget_scale = ai_budget_scale()
+        beliefs = self.beliefs.view(player_name, self.game)
+        start = time.perf_counter()
+        try:
+            ok, decision = ai_executor.decide(self.game_id, kind, ai_player, self.game, player_name,
+                                              cards_left, cancelled=lambda: self.ai_cancelled, beliefs=beliefs)
+            if ok or self.ai_cancelled:
+                return decision
+            # In-process search yields to other games and stops if this game is abandoned
+            control = ai_player.new_control(yield_fn=lambda: socketio.sleep(0), cancelled=lambda: self.ai_cancelled)
+            if kind == 'power':
+                return ai_player.choose_power_action(self.game, player_name, control, beliefs)
+            return ai_player.plan_turn(self.game, player_name, cards_left, control, beliefs)
+        finally:
+            ai_decision_seconds.observe(time.perf_counter() - start, kind)
+    
+    def schedule_ai_move(self, pause):
+        """Queue the next AI move on this game's actor after pause * ai_pace seconds (replaces a pending one)"""
+        if self.ai_timer is not None:
+            ai_wheel.cancel(self.ai_timer)
+            self.ai_timer = None
+        pause *= self.ai_pace
+        if pause > 0:
+            self.ai_timer = ai_wheel.schedule(pause, self.actor.submit, self.execute_ai_move)
+        else:
+            self.actor.submit(self.execute_ai_move)
+    
     def execute_ai_move(self):
-        """Execute AI move if current player is AI"""
-        if self.ai_move_in_progress:
+        """
+        Run one step of the current AI player's turn, then schedule the next step.
+        
+        An AI turn is a state machine: AI_ROLL places the wild dot, AI_PLAY_CARD plays one card
+        (or a power card), AI_DRAW refills the hand and AI_ADVANCE passes the turn on. Each call
+        runs one transition, and the next one runs as a later actor command (after a pause on
+        ai_wheel), so the stack never grows and self.ai_phase lets a turn resume after a restart.
+        """
+        if self.ai_timer is not None:
+            ai_wheel.cancel(self.ai_timer)  # A move submitted directly replaces the scheduled one
+            self.ai_timer = None
+        if self.ai_move_in_progress or self.ai_cancelled:
             return
         
         current_player = self.game.get_current_player()
@@ -197,285 +612,311 @@ class GameSession:
         if current_player not in self.ai_players:
             return
         
+        # Initialize turn_cards_played if not exists
+        if not hasattr(self.game, 'turn_cards_played'):
+            self.game.turn_cards_played = {}
+        if current_player not in self.game.turn_cards_played:
+            self.game.turn_cards_played[current_player] = 0
+        
+        phase = self.ai_phase[1] if self.ai_phase and self.ai_phase[0] == current_player else self.first_ai_phase(current_player)
+        transition = {AI_ROLL: self.ai_roll, AI_PLAY_CARD: self.ai_play_card,
+                      AI_DRAW: self.ai_draw, AI_ADVANCE: self.ai_advance}[phase]
         self.ai_move_in_progress = True
+        start = time.perf_counter()
         try:
-            ai_player = self.ai_players[current_player]
-            hand = self.game.players[current_player]['hand']
+            outcome = transition(current_player)
+        except Exception as e:
+            ai_log.exception("[AI_MOVE] Error in %s: %s", phase, e)
+            outcome = None
+        finally:
+            self.ai_move_in_progress = False
+            ai_transition_times[phase].append(time.perf_counter() - start)
+        
+        # outcome is (next phase, pause), next phase None once the turn has passed to another AI,
+        # or None when the chain stops (game over, human on turn, AI cancelled or failed)
+        if outcome is None:
+            self.ai_phase = None
+            return
+        next_phase, pause = outcome
+        self.ai_phase = (current_player, next_phase) if next_phase else None
+        self.schedule_ai_move(pause)
+    
+    def first_ai_phase(self, player_name):
+        """Phase an AI turn starts (or resumes) in, from the game state"""
+        if self.game.can_roll_dice:
+            return AI_ROLL
+        if self.game.turn_cards_played[player_name] >= 2:
+            return AI_ADVANCE
+        return AI_PLAY_CARD
+    
+    def ai_roll(self, current_player):
+        """AI_ROLL: roll the wild dot (same as a human's roll_dice); a match means rolling again"""
+        hand = self.game.players[current_player]['hand']
+        ai_log.debug("[AI_MOVE] %s must roll first (hand has %s cards)", current_player, len(hand))
+        # Simulate roll_dice (same as human player)
+        self.game.can_roll_dice = False
+        row, col = self.game.roll_dice()
+        row_idx = self.game.rows.index(row)
+        col_idx = self.game.columns.index(col)
+        
+        # Remove the old yellow dot first (if it exists and wasn't collected)
+        old_yellow_pos = getattr(self.game, 'yellow_dot_position', None)
+        if old_yellow_pos:
+            old_row, old_col = old_yellow_pos
+            old_dot_at_pos = self.game.grid[old_row][old_col]
+            if old_dot_at_pos and old_dot_at_pos.color == 'yellow':
+                self.game.grid[old_row][old_col] = None
+                ai_log.debug("[AI_MOVE] Removed old yellow dot from grid[%s][%s]", old_row, old_col)
+        
+        # Place yellow dot at new position
+        from twenty_dots import Dot
+        self.game.grid[row_idx][col_idx] = Dot('yellow')
+        self.game.yellow_dot_position = (row_idx, col_idx)
+        ai_log.debug("[AI_MOVE] %s rolled %s%s, placed yellow dot", current_player, row, col)
+        
+        # Check for matches created by yellow dot (same as human player)
+        match_result = self.game.check_line_match(row, col, 'yellow')
+        match, match_color = match_result
+        
+        if match:
+            ai_log.debug("[AI_MOVE] MATCH FOUND from yellow placement! Collecting %s dots of color %s", len(match), match_color)
+            self.game.collect_dots(match, current_player, match_color)
             
-            # Initialize turn_cards_played if not exists
-            if not hasattr(self.game, 'turn_cards_played'):
-                self.game.turn_cards_played = {}
-            if current_player not in self.game.turn_cards_played:
-                self.game.turn_cards_played[current_player] = 0
+            # Check for winner IMMEDIATELY after collecting dots
+            winner_result = self.check_winner()
+            if winner_result:
+                self.broadcast_state()
+                socketio.emit('game_over', {
+                    'winner': winner_result['winner'],
+                    'condition': winner_result['mode']
+                }, room=self.game_id)
+                return None
             
-            cards_played_this_turn = self.game.turn_cards_played[current_player]
+            # Can roll again if matched
+            self.game.can_roll_dice = True
+            self.broadcast_state()
+            # Send updated hands to all players
+            self.push_hands()
+            return AI_ROLL, 1.0
+        
+        # Broadcast updated game state
+        self.broadcast_state()
+        if self.game.turn_cards_played[current_player] >= 2:
+            return AI_ADVANCE, 1.0  # Rolled after the turn's cards (wild replaced or collected)
+        # After rolling, AI needs to play cards
+        ai_log.debug("[AI_MOVE] %s rolled, now choosing cards to play", current_player)
+        return AI_PLAY_CARD, 1.0
+    
+    def ai_play_card(self, current_player):
+        """AI_PLAY_CARD: play one card the AI picks (a power card only as the turn's first play)"""
+        ai_player = self.ai_players[current_player]
+        hand = self.game.players[current_player]['hand']
+        cards_played_this_turn = self.game.turn_cards_played[current_player]
+        
+        # Power cards must be played first in a turn - let the AI decide whether one beats its regular cards
+        if cards_played_this_turn == 0:
+            power_action = self.ai_decide(ai_player, 'power', current_player, 2)
+            if self.ai_cancelled:
+                return None
+            if power_action:
+                return self.play_ai_power_card(current_player, power_action)
+        
+        # Choose cards to play (1 card at a time for visible gameplay)
+        # plan_turn skips power cards and cards targeting blocked cells
+        cards_needed = 1  # Play only 1 card at a time so human can follow along
+        plan = self.ai_decide(ai_player, 'plan', current_player, 2 - cards_played_this_turn)
+        if self.ai_cancelled:
+            return None
+        cards_to_play_indices = plan[:cards_needed]
+        
+        if len(cards_to_play_indices) == 0:
+            ai_log.debug("[AI_MOVE] %s has no regular cards to play, advancing turn", current_player)
+            return AI_ADVANCE, 0
+        
+        cards_to_play = [hand[i] for i in cards_to_play_indices if i < len(hand)]
+        yellow_replaced = False
+        yellow_collected = False
+        
+        # Play the cards (similar to handle_play_cards but for AI)
+        for card in cards_to_play:
+            if card not in hand:
+                continue
             
-            # AI must roll first if can_roll_dice is True
-            if self.game.can_roll_dice:
-                print(f"[AI_MOVE] {current_player} must roll first (hand has {len(hand)} cards)")
-                # Simulate roll_dice (same as human player)
-                self.game.can_roll_dice = False
-                row, col = self.game.roll_dice()
-                row_idx = self.game.rows.index(row)
-                col_idx = self.game.columns.index(col)
-                
-                # Remove the old yellow dot first (if it exists and wasn't collected)
-                old_yellow_pos = getattr(self.game, 'yellow_dot_position', None)
-                if old_yellow_pos:
-                    old_row, old_col = old_yellow_pos
-                    old_dot_at_pos = self.game.grid[old_row][old_col]
-                    if old_dot_at_pos and old_dot_at_pos.color == 'yellow':
-                        self.game.grid[old_row][old_col] = None
-                        print(f"[AI_MOVE] Removed old yellow dot from grid[{old_row}][{old_col}]")
-                
-                # Place yellow dot at new position
-                from twenty_dots import Dot
-                old_dot = self.game.grid[row_idx][col_idx]
-                self.game.grid[row_idx][col_idx] = Dot('yellow')
-                self.game.yellow_dot_position = (row_idx, col_idx)
-                print(f"[AI_MOVE] {current_player} rolled {row}{col}, placed yellow dot")
-                
-                # Check for matches created by yellow dot (same as human player)
-                match_result = self.game.check_line_match(row, col, 'yellow')
-                match, match_color = match_result
-                
-                if match:
-                    print(f"[AI_MOVE] MATCH FOUND from yellow placement! Collecting {len(match)} dots of color {match_color}")
-                    self.game.collect_dots(match, current_player, match_color)
-                    
-                    # Check for winner IMMEDIATELY after collecting dots
-                    winner_result = self.check_winner()
-                    if winner_result:
-                        socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                        socketio.emit('game_over', {
-                            'winner': winner_result['winner'],
-                            'condition': winner_result['mode']
-                        }, room=self.game_id)
-                        self.ai_move_in_progress = False
-                        return
-                    
-                    # Can roll again if matched
-                    self.game.can_roll_dice = True
-                    socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                    # Send updated hands to all players
-                    for sid, player_info in self.players.items():
-                        if not player_info['is_ai'] and player_info['connected']:
-                            player_hand = self.get_player_hand(player_info['name'])
-                            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
-                    socketio.sleep(1.0)
-                    # Recursively continue AI move (will roll again)
-                    self.ai_move_in_progress = False
-                    self.execute_ai_move()
-                    return
-                
-                # Broadcast updated game state
-                socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                socketio.sleep(1.0)  # Use socketio.sleep for cooperative threading
-                # After rolling, AI needs to play cards
-                print(f"[AI_MOVE] {current_player} rolled, now choosing cards to play")
+            # Double-check that the cell is not blocked
+            row = card.location[0]
+            col = card.location[1]
+            row_idx = self.game.rows.index(row)
+            col_idx = self.game.columns.index(col)
+            is_blocked = False
+            if hasattr(self.game, 'blocks'):
+                for block in self.game.blocks:
+                    if block['row'] == row_idx and block['col'] == col_idx:
+                        is_blocked = True
+                        ai_log.debug("[AI_MOVE] %s tried to play on blocked cell %s%s, skipping", current_player, row, col)
+                        break
+            if is_blocked:
+                continue  # Skip this card, it targets a blocked cell
             
-            # Check if AI already played 2 cards this turn
-            if cards_played_this_turn >= 2:
-                print(f"[AI_MOVE] {current_player} already played {cards_played_this_turn} cards, advancing turn")
-                self.advance_turn()
-                new_player = self.game.get_current_player()
-                self.game.turn_cards_played[new_player] = 0
-                socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                socketio.sleep(1.5)  # Use socketio.sleep
-                self.ai_move_in_progress = False
-                if new_player in self.ai_players:
-                    self.execute_ai_move()
-                return
+            # Remove from hand
+            hand.remove(card)
+            self.game.turn_cards_played[current_player] += 1
+            self.beliefs.record_play(current_player, card)
             
-            # Choose cards to play (1 card at a time for visible gameplay)
-            # AI should skip power cards for now (simplified AI doesn't use them)
-            # Also skip cards targeting blocked cells
-            cards_needed = 1  # Play only 1 card at a time so human can follow along
-            regular_cards_indices = []
-            for i, c in enumerate(hand):
-                if getattr(c, 'power', None):
-                    continue  # Skip power cards
-                # Check if target cell is blocked
-                if hasattr(c, 'location') and c.location:
-                    row_idx = self.game.rows.index(c.location[0])
-                    col_idx = self.game.columns.index(c.location[1])
-                    is_blocked = False
-                    if hasattr(self.game, 'blocks'):
-                        for block in self.game.blocks:
-                            if block['row'] == row_idx and block['col'] == col_idx:
-                                is_blocked = True
-                                break
-                    if is_blocked:
-                        continue  # Skip cards targeting blocked cells
-                regular_cards_indices.append(i)
-            cards_to_play_indices = [regular_cards_indices[i] for i in range(min(cards_needed, len(regular_cards_indices)))]
+            # Add to AI's discard pile
+            if current_player not in self.discard_piles:
+                self.discard_piles[current_player] = []
+            card_info = {
+                'color': card.color,
+                'location': f"{card.location[0]}{card.location[1]}" if card.location else "PWR"
+            }
+            self.discard_piles[current_player].append(card_info)
             
-            if len(cards_to_play_indices) == 0:
-                print(f"[AI_MOVE] {current_player} has no regular cards to play, advancing turn")
-                self.advance_turn()
-                new_player = self.game.get_current_player()
-                self.game.turn_cards_played[new_player] = 0
-                socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                socketio.sleep(1.0)
-                self.ai_move_in_progress = False
-                if new_player in self.ai_players:
-                    self.execute_ai_move()
-                return
+            # Place dot on board first
+            location_str = f"{row}{col}"
+            success, replaced_color = self.game.place_card_dot(card)
             
-            cards_to_play = [hand[i] for i in cards_to_play_indices if i < len(hand)]
-            yellow_replaced = False
-            yellow_collected = False
+            # Check for landmine at this location AFTER placing the dot
+            # This way, the landmine explosion will also remove the dot that triggered it
+            landmine_result = self.game.check_and_detonate_landmine(location_str, current_player)
+            if landmine_result:
+                ai_log.debug("[AI_MOVE] LANDMINE DETONATED at %s! Removed %s dots (including triggering dot)", location_str, len(landmine_result.get('removed_positions', [])))
+                # Emit landmine detonation event to all players
+                socketio.emit('landmine_detonated', {
+                    'location': location_str,
+                    'color': landmine_result['color'],
+                    'removed_count': len(landmine_result.get('removed_positions', [])),
+                    'triggered_by': current_player,
+                    'placed_by': landmine_result['player']
+                }, room=self.game_id)
+                # Don't process match checking since dot was destroyed
+                success = False
             
-            # Play the cards (similar to handle_play_cards but for AI)
-            for card in cards_to_play:
-                if card not in hand:
-                    continue
+            if success:
+                # Track if yellow was replaced
+                if replaced_color == 'yellow':
+                    yellow_replaced = True
+                    self.game.players[current_player]['yellow_dots'] += 1
+                    self.game.players[current_player]['total_dots'] += 1
+                elif replaced_color and replaced_color in ['red', 'blue', 'purple', 'green']:
+                    self.game.players[current_player]['score'][replaced_color] += 1
+                    self.game.players[current_player]['total_dots'] += 1
                 
-                # Double-check that the cell is not blocked
+                # Check for matches
                 row = card.location[0]
                 col = card.location[1]
                 row_idx = self.game.rows.index(row)
                 col_idx = self.game.columns.index(col)
-                is_blocked = False
-                if hasattr(self.game, 'blocks'):
-                    for block in self.game.blocks:
-                        if block['row'] == row_idx and block['col'] == col_idx:
-                            is_blocked = True
-                            print(f"[AI_MOVE] {current_player} tried to play on blocked cell {row}{col}, skipping")
+                match_result = self.game.check_line_match(row, col, card.color)
+                match, match_color = match_result
+                if match:
+                    # Check if yellow dot is in the matched positions
+                    for col_idx_m, row_idx_m in match:
+                        dot = self.game.grid[row_idx_m][col_idx_m]
+                        if dot and dot.color == 'yellow':
+                            yellow_collected = True
                             break
-                if is_blocked:
-                    continue  # Skip this card, it targets a blocked cell
-                
-                # Remove from hand
-                hand.remove(card)
-                self.game.turn_cards_played[current_player] += 1
-                
-                # Add to AI's discard pile
-                if current_player not in self.discard_piles:
-                    self.discard_piles[current_player] = []
-                card_info = {
-                    'color': card.color,
-                    'location': f"{card.location[0]}{card.location[1]}" if card.location else "PWR"
-                }
-                self.discard_piles[current_player].append(card_info)
-                
-                # Place dot on board first
-                location_str = f"{row}{col}"
-                success, replaced_color = self.game.place_card_dot(card)
-                
-                # Check for landmine at this location AFTER placing the dot
-                # This way, the landmine explosion will also remove the dot that triggered it
-                landmine_result = self.game.check_and_detonate_landmine(location_str, current_player)
-                if landmine_result:
-                    print(f"[AI_MOVE] LANDMINE DETONATED at {location_str}! Removed {len(landmine_result.get('removed_positions', []))} dots (including triggering dot)")
-                    # Emit landmine detonation event to all players
-                    socketio.emit('landmine_detonated', {
-                        'location': location_str,
-                        'color': landmine_result['color'],
-                        'removed_count': len(landmine_result.get('removed_positions', [])),
-                        'triggered_by': current_player,
-                        'placed_by': landmine_result['player']
-                    }, room=self.game_id)
-                    # Don't process match checking since dot was destroyed
-                    success = False
-                
-                if success:
-                    # Track if yellow was replaced
-                    if replaced_color == 'yellow':
-                        yellow_replaced = True
-                        self.game.players[current_player]['yellow_dots'] += 1
-                        self.game.players[current_player]['total_dots'] += 1
-                    elif replaced_color and replaced_color in ['red', 'blue', 'purple', 'green']:
-                        self.game.players[current_player]['score'][replaced_color] += 1
-                        self.game.players[current_player]['total_dots'] += 1
-                    
-                    # Check for matches
-                    row = card.location[0]
-                    col = card.location[1]
-                    row_idx = self.game.rows.index(row)
-                    col_idx = self.game.columns.index(col)
-                    match_result = self.game.check_line_match(row, col, card.color)
-                    match, match_color = match_result
-                    if match:
-                        # Check if yellow dot is in the matched positions
-                        for col_idx_m, row_idx_m in match:
-                            dot = self.game.grid[row_idx_m][col_idx_m]
-                            if dot and dot.color == 'yellow':
-                                yellow_collected = True
-                                break
-                        self.game.collect_dots(match, current_player, match_color)
-                        
-                        # Check for winner IMMEDIATELY after collecting dots
-                        winner_result = self.check_winner()
-                        if winner_result:
-                            socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                            socketio.emit('game_over', {
-                                'winner': winner_result['winner'],
-                                'condition': winner_result['mode']
-                            }, room=self.game_id)
-                            self.ai_move_in_progress = False
-                            return
-            
-            # After playing cards
-            total_played_this_turn = self.game.turn_cards_played[current_player]
-            print(f"[AI_MOVE] {current_player} played cards, total this turn: {total_played_this_turn}")
-            
-            # Check if AI played 2 cards this turn
-            if total_played_this_turn >= 2:
-                # Draw replacement cards
-                while len(hand) < 5 and self.game.deck:
-                    self.game.draw_card(current_player)
-                
-                # If yellow was replaced or collected, AI must roll again
-                if yellow_replaced or yellow_collected:
-                    self.game.can_roll_dice = True
-                    print(f"[AI_MOVE] {current_player} replaced/collected yellow after 2 cards, must roll then end turn")
-                    socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                    socketio.sleep(1.0)
-                    self.ai_move_in_progress = False
-                    # Roll then end turn
-                    self.execute_ai_move()
-                    return
-                else:
-                    # Advance to next player
-                    print(f"[AI_MOVE] {current_player} played 2 cards, advancing turn")
-                    self.game.can_roll_dice = False
-                    self.advance_turn()
-                    new_player = self.game.get_current_player()
-                    self.game.turn_cards_played[new_player] = 0
-                    socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
+                    self.game.collect_dots(match, current_player, match_color)
                     
-                    # Check for winner
+                    # Check for winner IMMEDIATELY after collecting dots
                     winner_result = self.check_winner()
                     if winner_result:
+                        self.broadcast_state()
                         socketio.emit('game_over', {
                             'winner': winner_result['winner'],
                             'condition': winner_result['mode']
                         }, room=self.game_id)
-                        self.ai_move_in_progress = False
-                        return
-                    
-                    socketio.sleep(1.5)  # Cooperative sleep for AI delay
-                    self.ai_move_in_progress = False
-                    if new_player in self.ai_players:
-                        self.execute_ai_move()
-                    return
-            else:
-                # Still need to play more cards
-                if yellow_replaced or yellow_collected:
-                    self.game.can_roll_dice = True
-                    print(f"[AI_MOVE] {current_player} replaced/collected yellow, must roll again")
-                socketio.emit('game_updated', self.get_game_state(), room=self.game_id)
-                socketio.sleep(1.5)  # Cooperative sleep for AI delay
-                self.ai_move_in_progress = False
-                self.execute_ai_move()
-                return
-                
-        except Exception as e:
-            print(f"[AI_MOVE] Error: {e}")
-            import traceback
-            traceback.print_exc()
-            self.ai_move_in_progress = False
+                        return None
+        
+        # After playing cards
+        total_played_this_turn = self.game.turn_cards_played[current_player]
+        ai_log.debug("[AI_MOVE] %s played cards, total this turn: %s", current_player, total_played_this_turn)
+        
+        # If yellow was replaced or collected, AI must roll again
+        if yellow_replaced or yellow_collected:
+            self.game.can_roll_dice = True
+            ai_log.debug("[AI_MOVE] %s replaced/collected yellow, must roll again", current_player)
+        
+        # Check if AI played 2 cards this turn
+        if total_played_this_turn >= 2:
+            return AI_DRAW, 0
+        
+        # Still need to play more cards
+        self.broadcast_state()
+        return (AI_ROLL if self.game.can_roll_dice else AI_PLAY_CARD), 1.5
+    
+    def ai_draw(self, current_player):
+        """AI_DRAW: refill the hand to 5 once the turn's cards are played, then roll if the wild was hit"""
+        hand = self.game.players[current_player]['hand']
+        while len(hand) < 5 and self.game.deck:
+            self.game.draw_card(current_player)
+        
+        if self.game.can_roll_dice:
+            # Roll then end turn
+            ai_log.debug("[AI_MOVE] %s replaced/collected yellow after its cards, must roll then end turn", current_player)
+            self.broadcast_state()
+            return AI_ROLL, 1.0
+        return AI_ADVANCE, 0
+    
+    def ai_advance(self, current_player):
+        """AI_ADVANCE: pass the turn to the next player"""
+        ai_log.debug("[AI_MOVE] %s ends its turn, advancing turn", current_player)
+        self.game.can_roll_dice = False
+        self.advance_turn()
+        new_player = self.game.get_current_player()
+        self.game.turn_cards_played[new_player] = 0
+        self.broadcast_state()
+        
+        # Check for winner
+        winner_result = self.check_winner()
+        if winner_result:
+            socketio.emit('game_over', {
+                'winner': winner_result['winner'],
+                'condition': winner_result['mode']
+            }, room=self.game_id)
+            return None
+        
+        if new_player in self.ai_players:
+            return None, 1.5  # The next AI's turn, after a pause
+        return None
+    
+    def play_ai_power_card(self, current_player, action):
+        """Play a power card chosen by the AI (the AI_PLAY_CARD transition for power cards). Power cards end the turn."""
+        hand = self.game.players[current_player]['hand']
+        card = hand[action['card_index']]
+        if current_player not in self.discard_piles:
+            self.discard_piles[current_player] = []
+        self.discard_piles[current_player].append({
+            'location': 'PWR',
+            'color': card.color,
+            'power': card.power
+        })
+        
+        result = apply_power_action(self.game, current_player, action, len(self.player_order))
+        self.beliefs.record_power_action(current_player, action, result)
+        ai_log.debug("[AI_MOVE] %s played %s power card (score %.2f)", current_player, card.power, action['score'])
+        for event, payload in result['events']:
+            socketio.emit(event, payload, room=self.game_id)
+        
+        # Power cards end the turn
+        self.game.turn_cards_played[current_player] = 2
+        
+        winner_result = self.check_winner()
+        if winner_result:
+            self.broadcast_state()
+            socketio.emit('game_over', {
+                'winner': winner_result['winner'],
+                'condition': winner_result['mode']
+            }, room=self.game_id)
+            return None
+        
+        # Card swap changes a human's hand too
+        self.push_hands()
+        
+        if result['yellow_collected']:
+            # Wild collected by its own match - roll for a new one (after drawing), then the turn ends
+            self.game.can_roll_dice = True
+            ai_log.debug("[AI_MOVE] %s collected the wild with wild_place, must roll then end turn", current_player)
+        return AI_DRAW, 0
     
     def check_winner(self):
         """Check if anyone has won based on game_mode"""
@@ -488,42 +929,133 @@ class GameSession:
             
             if self.game_mode == 'twenty_dots':
                 total = player_data['total_dots']
-                print(f"[CHECK_WINNER] {player_name} has {total} total dots")
+                turn_log.debug("[CHECK_WINNER] %s has %s total dots", player_name, total)
                 if total >= 20:
-                    print(f"[CHECK_WINNER] {player_name} WINS with {total} dots!")
+                    turn_log.info("[CHECK_WINNER] %s WINS with %s dots!", player_name, total)
                     return {'winner': player_name, 'mode': 'twenty_dots'}
             
             elif self.game_mode == 'five_colors':
                 # Check if player has 5 of each color (red, blue, green, purple)
                 if all(player_data['score'].get(color, 0) >= 5 for color in ['red', 'blue', 'green', 'purple']):
-                    print(f"[CHECK_WINNER] {player_name} WINS with 5 of each color!")
+                    turn_log.info("[CHECK_WINNER] %s WINS with 5 of each color!", player_name)
                     return {'winner': player_name, 'mode': 'five_colors'}
             
             elif self.game_mode == 'five_with_yellow':
                 # Check if player has 5 yellow dots AND 5 of each color
                 yellow_dots = player_data.get('yellow_dots', 0)
                 if yellow_dots >= 5 and all(player_data['score'].get(color, 0) >= 5 for color in ['red', 'blue', 'green', 'purple']):
-                    print(f"[CHECK_WINNER] {player_name} WINS with 5 yellow and 5 of each color!")
+                    turn_log.info("[CHECK_WINNER] %s WINS with 5 yellow and 5 of each color!", player_name)
                     return {'winner': player_name, 'mode': 'five_with_yellow'}
         
-        print(f"[CHECK_WINNER] No winner yet (mode: {self.game_mode})")
+        turn_log.debug("[CHECK_WINNER] No winner yet (mode: %s)", self.game_mode)
         return None
 
+def update_lobby(game_session):
+    """Re-index a game in the lobby listing and push the change to lobby subscribers"""
+    change = lobby_index.update(game_session)
+    if change:
+        publish_lobby_change(change)
+
+def publish_lobby_change(change):
+    """Send a lobby_index change to lobby subscribers and, under cluster.py, to the other workers' indexes"""
+    kind, value = change
+    socketio.emit('lobby_updated', {'game': value} if kind == 'listed' else {'removed': value}, room=LOBBY_ROOM)
+    if broker_path:
+        socketio.server.manager.share('lobby', change)
+
+def apply_shared_lobby_change(change):
+    """A lobby change on another worker: index it here too (its subscribers got the emit already)"""
+    kind, value = change
+    if kind == 'listed':
+        lobby_index.put(value['game_id'], value)
+    else:
+        lobby_index.remove(value)
+
+if broker_path:
+    socketio.server.manager.on_share('lobby', apply_shared_lobby_change)
+
+def restore_games():
+    """Rebuild the games logged in game_store that were still being played when the server stopped"""
+    if not game_store:
+        return
+    for game_id, record in game_store.load().items():
+        game_session = restore(GameSession(game_id, None), record)
+        if game_session.started and game_session.check_winner():
+            game_store.spill(game_session)
+            continue
+        for player_info in game_session.players.values():
+            if not player_info['is_ai']:
+                player_info['connected'] = False
+        # AI turns wait until a human reconnects (join_game resumes them)
+        game_session.ai_cancelled = True
+        games[game_id] = game_session
+        update_lobby(game_session)
+    if games:
+        lobby_log.info("Restored %s games from %s", len(games), GAME_STORE)
+
+def evict_game(game_session, phase):
+    """Free a game the sweeper found idle (finished games are spilled to game_store, others dropped from it)"""
+    game_id = game_session.game_id
+    games.pop(game_id, None)
+    if lobby_index.remove(game_id):
+        publish_lobby_change(('removed', game_id))
+    game_session.actor.stop()
+    game_session.cancel_ai_moves()
+    if game_store:
+        if phase == 'finished':
+            game_store.spill(game_session)
+        else:
+            game_store.drop(game_id)
+    socketio.close_room(game_id)
+
+# Games idle longer than their phase's TTL are freed, checked every GAME_SWEEP_SECONDS:
+# lobbies and started games once no human is connected, finished games whether or not anyone is
+game_sweeper = GameSweeper(games, evict_game, {
+    'lobby': float(os.environ.get('GAME_TTL_LOBBY', 600)),
+    'abandoned': float(os.environ.get('GAME_TTL_ABANDONED', 1800)),
+    'finished': float(os.environ.get('GAME_TTL_FINISHED', 300)),
+}, interval=float(os.environ.get('GAME_SWEEP_SECONDS', 60)), sleep=socketio.sleep)
+
 @socketio.on('connect')
 def handle_connect():
-    print(f"Client connected: {request.sid}")
+    lobby_log.info("Client connected: %s", request.sid)
+    connected_sockets.inc()
     emit('connected', {'sid': request.sid})
 
+@socketio.on('set_encoding')
+def handle_set_encoding(data):
+    """Pick the wire encoding for this client's game_started, game_updated and your_hand events"""
+    encoding = negotiate(data.get('encodings'))
+    if encoding == 'json':
+        client_encodings.pop(request.sid, None)
+    else:
+        client_encodings[request.sid] = encoding
+    lobby_log.debug("[SET_ENCODING] %s offered %s, using %s", request.sid, data.get('encodings'), encoding)
+    emit('encoding_set', {'encoding': encoding})
+
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f"Client disconnected: {request.sid}")
+    lobby_log.info("Client disconnected: %s", request.sid)
+    connected_sockets.dec()
+    client_encodings.pop(request.sid, None)
+    matchmaker.cancel(request.sid)
     # Find and update player's connection status
     for game_id, game_session in games.items():
         if request.sid in game_session.players:
-            game_session.players[request.sid]['connected'] = False
-            emit('player_disconnected', {
-                'player': game_session.players[request.sid]['name']
-            }, room=game_id)
+            # Nobody left to watch - stop the AIs from burning CPU on this table. This can't wait
+            # for the queue (an AI turn may be the command running), so cancel right away
+            if not any(not p['is_ai'] and p['connected'] for sid, p in game_session.players.items() if sid != request.sid):
+                lobby_log.debug("[DISCONNECT] No humans left in %s, cancelling AI moves", game_id)
+                game_session.cancel_ai_moves()
+            game_session.actor.submit(mark_disconnected, game_session, request.sid)
+
+def mark_disconnected(game_session, sid):
+    """Game command: sid has disconnected"""
+    if sid in game_session.players:
+        game_session.players[sid]['connected'] = False
+        socketio.emit('player_disconnected', {
+            'player': game_session.players[sid]['name']
+        }, room=game_session.game_id)
 
 @socketio.on('create_game')
 def handle_create_game(data):
@@ -535,14 +1067,20 @@ def handle_create_game(data):
         emit('error', {'message': 'Game ID already exists'})
         return
     
-    game_session = GameSession(game_id, request.sid)
+    run_new_game(GameSession(game_id, request.sid), create_game, data, player_name)
+
+def create_game(game_session, data, player_name):
+    """Game command: seat the host of a new game"""
+    game_id = game_session.game_id
+    game_session.ai_pace = ai_pace_option(data)
     success, message = game_session.add_player(request.sid, player_name)
     
     if not success:
+        games.pop(game_id, None)
+        game_session.actor.stop()
         emit('error', {'message': message})
         return
     
-    games[game_id] = game_session
     join_room(game_id)
     
     emit('game_created', {
@@ -550,9 +1088,10 @@ def handle_create_game(data):
         'player_name': player_name,
         'players': game_session.player_order
     })
-    print(f"Game created: {game_id} by {player_name}")
+    lobby_log.info("Game created: %s by %s", game_id, player_name)
 
 @socketio.on('join_game')
+@game_command
 def handle_join_game(data):
     """Player joins an existing game (creates if doesn't exist)"""
     game_id = data.get('game_id')
@@ -562,36 +1101,22 @@ def handle_join_game(data):
         player_count = int(player_count)
     except (ValueError, TypeError):
         player_count = 2
-    print(f"[JOIN_GAME] Received join_game request for game {game_id}, player_count: {player_count} (type: {type(player_count).__name__})")
+    lobby_log.debug("[JOIN_GAME] Received join_game request for game %s, player_count: %s (type: %s)", game_id, player_count, type(player_count).__name__)
     
     # Auto-create game if it doesn't exist (first player)
     if game_id not in games:
         player_name = data.get('player_name', 'Player 1')
         game_mode = data.get('game_mode', 'twenty_dots')
         power_cards = data.get('power_cards', False)
-        print(f"[JOIN_GAME] Game doesn't exist, creating. First player: {player_name}, mode: {game_mode}, power_cards: {power_cards}, player_count: {player_count}")
+        lobby_log.debug("[JOIN_GAME] Game doesn't exist, creating. First player: %s, mode: %s, power_cards: %s, player_count: %s", player_name, game_mode, power_cards, player_count)
         game_session = GameSession(game_id, request.sid, game_mode, player_count, power_cards)
-        success, message = game_session.add_player(request.sid, player_name)
-        
-        if not success:
-            emit('error', {'message': message})
-            return
-        
-        games[game_id] = game_session
-        join_room(game_id)
-        
-        emit('join_success', {
-            'game_id': game_id,
-            'player_name': player_name,
-            'players': game_session.player_order
-        })
-        print(f"[JOIN_GAME] Game auto-created: {game_id} by {player_name}. Player order: {game_session.player_order}")
+        run_new_game(game_session, auto_create_game, player_name)
         return
     
     # Game exists, join it
     game_session = games[game_id]
     player_name = data.get('player_name', f'Player {len(game_session.players) + 1}')
-    print(f"[JOIN_GAME] Game exists. Player joining: {player_name}")
+    lobby_log.debug("[JOIN_GAME] Game exists. Player joining: %s", player_name)
     
     game_session = games[game_id]
     
@@ -600,9 +1125,7 @@ def handle_join_game(data):
     for sid, player_info in game_session.players.items():
         if player_info['name'] == player_name:
             existing_player_name = player_name
-            print(f"[JOIN_GAME] Player {player_name} is reconnecting to game {game_id}")
-            # Update their session ID
-            old_sid = sid
+            lobby_log.info("[JOIN_GAME] Player %s is reconnecting to game %s", player_name, game_id)
             break
     
     if game_session.started and not existing_player_name:
@@ -618,19 +1141,22 @@ def handle_join_game(data):
                 del game_session.players[sid]
                 game_session.players[request.sid] = player_data
                 game_session.players[request.sid]['connected'] = True
-                print(f"[JOIN_GAME] Updated {player_name}'s session ID from {sid} to {request.sid}")
+                lobby_log.debug("[JOIN_GAME] Updated %s's session ID from %s to %s", player_name, sid, request.sid)
                 break
         
         join_room(game_id)
         
         # Send current game state to reconnecting player
-        emit('game_started', game_session.get_game_state())
+        emit_encoded('game_started', game_session.state_snapshot(), request.sid, json_text=game_session.snapshot_json())
         
         # Send their hand
-        hand = game_session.game.players[player_name]['hand']
-        emit('your_hand', {'hand': [card.__dict__ for card in hand]})
+        game_session.push_hands([player_name], full=True)
         
-        print(f"[JOIN_GAME] {player_name} reconnected to game {game_id}")
+        lobby_log.info("[JOIN_GAME] %s reconnected to game %s", player_name, game_id)
+        
+        # Pick the AI turn chain back up if it was cancelled while everyone was away
+        if game_session.ai_cancelled:
+            game_session.resume_ai_moves()
         return
     
     success, message = game_session.add_player(request.sid, player_name)
@@ -653,65 +1179,41 @@ def handle_join_game(data):
         'players': game_session.player_order
     })
     
-    print(f"{player_name} joined game {game_id}")
+    lobby_log.info("%s joined game %s", player_name, game_id)
     
     # Auto-start game when required player count is reached
     if len(game_session.player_order) >= game_session.required_players and not game_session.started:
-        print(f"[AUTO_START] Auto-starting game {game_id}")
-        print(f"[AUTO_START] Players joined: {len(game_session.player_order)}, Required: {game_session.required_players}")
-        print(f"[AUTO_START] Player order: {game_session.player_order}")
-        print(f"[AUTO_START] Power cards: {game_session.power_cards}")
-        
-        # Initialize game with correct parameters
-        num_players = len(game_session.player_order)
-        game_session.game = TwentyDots(num_players=num_players, difficulty='easy', ai_opponents={}, power_cards=game_session.power_cards)
-        print(f"[AUTO_START] Created TwentyDots with num_players={num_players}, power_cards={game_session.power_cards}. Initial player names: {list(game_session.game.players.keys())}")
-        game_session.game.shuffle_deck()  # SHUFFLE THE NEW GAME!
+        lobby_log.debug("[AUTO_START] Auto-starting game %s", game_id)
+        lobby_log.debug("[AUTO_START] Players joined: %s, Required: %s", len(game_session.player_order), game_session.required_players)
+        lobby_log.debug("[AUTO_START] Player order: %s", game_session.player_order)
+        lobby_log.debug("[AUTO_START] Power cards: %s", game_session.power_cards)
         
-        # Update player names in the game
-        old_names = list(game_session.game.players.keys())
-        for i, pname in enumerate(game_session.player_order):
-            if i < len(old_names):
-                old_name = old_names[i]
-                print(f"[AUTO_START] Renaming player {i}: {old_name} -> {pname}")
-                game_session.game.players[pname] = game_session.game.players.pop(old_name)
-        
-        print(f"[AUTO_START] After renaming, player names: {list(game_session.game.players.keys())}")
-        print(f"[AUTO_START] Current player (idx=0): {game_session.game.get_current_player()}")
-        
-        # Shuffle deck before dealing
-        game_session.game.shuffle_deck()
-        game_session.game.deal_cards(5)
-        game_session.started = True
+        game_session.start()
         
-        # Initialize discard piles and turn card counters for all players
-        game_session.game.turn_cards_played = {}
-        game_session.game.must_advance_after_roll = {}
-        for pname in game_session.player_order:
-            game_session.discard_piles[pname] = []
-            game_session.game.turn_cards_played[pname] = 0
-        
-        # Player 1 must roll wild dot first - enable roll dice
-        game_session.game.can_roll_dice = True
-        print(f"[AUTO_START] Set can_roll_dice=True. Player {game_session.game.get_current_player()} must roll first.")
-        
-        # Send game state to all players
-        game_state = game_session.get_game_state()
-        emit('game_started', game_state, room=game_id)
-        
-        # Send each player their hand privately
-        for sid, player_info in game_session.players.items():
-            if not player_info['is_ai'] and player_info['connected']:
-                hand = game_session.get_player_hand(player_info['name'])
-                socketio.emit('your_hand', {'hand': hand}, room=sid)
-        
-        # Execute AI move if starting player is AI (AI must roll first)
-        if game_session.game.get_current_player() in game_session.ai_players:
-            socketio.start_background_task(game_session.execute_ai_move)
-        
-        print(f"Game {game_id} auto-started with players: {game_session.player_order}")
+        lobby_log.info("Game %s auto-started with players: %s", game_id, game_session.player_order)
+
 
+def auto_create_game(game_session, player_name):
+    """Game command: seat the first player of a game join_game created"""
+    game_id = game_session.game_id
+    success, message = game_session.add_player(request.sid, player_name)
+    
+    if not success:
+        games.pop(game_id, None)
+        game_session.actor.stop()
+        emit('error', {'message': message})
+        return
+    
+    join_room(game_id)
+    
+    emit('join_success', {
+        'game_id': game_id,
+        'player_name': player_name,
+        'players': game_session.player_order
+    })
+    lobby_log.info("[JOIN_GAME] Game auto-created: %s by %s. Player order: %s", game_id, player_name, game_session.player_order)
 @socketio.on('add_ai_player')
+@game_command
 def handle_add_ai(data):
     """Host adds an AI player"""
     game_id = data.get('game_id')
@@ -736,7 +1238,7 @@ def handle_add_ai(data):
         emit('error', {'message': message})
         return
     
-    game_session.ai_players[ai_name].difficulty = difficulty
+    game_session.ai_players[ai_name] = AIPlayer(difficulty)
     
     emit('player_joined', {
         'player_name': ai_name,
@@ -744,7 +1246,7 @@ def handle_add_ai(data):
         'is_ai': True
     }, room=game_id)
     
-    print(f"AI player {ai_name} added to game {game_id}")
+    lobby_log.info("AI player %s added to game %s", ai_name, game_id)
 
 @socketio.on('start_single_player')
 def handle_start_single_player(data):
@@ -761,20 +1263,29 @@ def handle_start_single_player(data):
     except (ValueError, TypeError):
         num_players = 2
     
-    # Create a unique game ID for single-player
+    # Create a unique game ID for single-player (clients behind cluster.py pick it, to route to this worker by it)
     import uuid
-    game_id = f"sp_{uuid.uuid4().hex[:8]}"
+    game_id = data.get('game_id')
+    if not isinstance(game_id, str) or not SINGLE_PLAYER_ID.fullmatch(game_id) or game_id in games:
+        game_id = f"sp_{uuid.uuid4().hex[:8]}"
     
     # Create game session with power cards setting
     game_session = GameSession(game_id, request.sid, game_mode, num_players, power_cards)
-    games[game_id] = game_session
-    join_room(game_id)
+    run_new_game(game_session, start_single_player, data, player_name, num_players, difficulty, power_cards)
+
+def start_single_player(game_session, data, player_name, num_players, difficulty, power_cards):
+    """Game command: seat the human and the AIs of a new single-player game and deal it"""
+    game_id = game_session.game_id
+    game_session.ai_pace = ai_pace_option(data)
     
     # Add human player
     success, message = game_session.add_player(request.sid, player_name, is_ai=False)
     if not success:
+        games.pop(game_id, None)
+        game_session.actor.stop()
         emit('error', {'message': message})
         return
+    join_room(game_id)
     
     # Add AI players
     ai_names = ['AI 1', 'AI 2', 'AI 3']
@@ -783,28 +1294,29 @@ def handle_start_single_player(data):
         ai_name = ai_names[i] if i < len(ai_names) else f"AI {i+1}"
         success, msg = game_session.add_player(ai_sid, ai_name, is_ai=True)
         if success:
-            game_session.ai_players[ai_name].difficulty = difficulty
+            game_session.ai_players[ai_name] = AIPlayer(difficulty)
     
     # Initialize game with power cards setting
     game_session.game = TwentyDots(num_players=num_players, difficulty='easy', ai_opponents={}, power_cards=power_cards)
+    game_session.beliefs = HandBeliefs(game_session.game.power_cards_enabled)
     game_session.game.shuffle_deck()
-    print(f"[SINGLE_PLAYER] Created game with power_cards={power_cards}")
+    lobby_log.debug("[SINGLE_PLAYER] Created game with power_cards=%s", power_cards)
     
     # Deal initial cards to all players
     game_session.game.deal_cards(5)
     
     # Update player names in the game
     old_names = list(game_session.game.players.keys())
-    print(f"[SINGLE_PLAYER] Old player names: {old_names}")
-    print(f"[SINGLE_PLAYER] New player order: {game_session.player_order}")
+    lobby_log.debug("[SINGLE_PLAYER] Old player names: %s", old_names)
+    lobby_log.debug("[SINGLE_PLAYER] New player order: %s", game_session.player_order)
     for i, pname in enumerate(game_session.player_order):
         if i < len(old_names):
             old_name = old_names[i]
             game_session.game.players[pname] = game_session.game.players.pop(old_name)
-            print(f"[SINGLE_PLAYER] Renamed {old_name} -> {pname}")
+            lobby_log.debug("[SINGLE_PLAYER] Renamed %s -> %s", old_name, pname)
     
-    print(f"[SINGLE_PLAYER] Final player names: {list(game_session.game.players.keys())}")
-    print(f"[SINGLE_PLAYER] Current player: {game_session.game.get_current_player()}")
+    lobby_log.debug("[SINGLE_PLAYER] Final player names: %s", list(game_session.game.players.keys()))
+    lobby_log.debug("[SINGLE_PLAYER] Current player: %s", game_session.game.get_current_player())
     
     # Initialize discard piles and turn_cards_played tracking
     game_session.game.turn_cards_played = {}
@@ -817,16 +1329,95 @@ def handle_start_single_player(data):
     game_session.started = True
     
     # Send game state
-    game_state = game_session.get_game_state()
-    emit('game_started', game_state, room=game_id)
+    game_state = game_session.state_snapshot(notify=False)
+    emit_encoded('game_started', game_state, game_id, game_session.players, json_text=game_session.snapshot_json())
     
     # Send player their hand privately
-    hand = game_session.get_player_hand(player_name)
-    emit('your_hand', {'hand': hand})
+    game_session.push_hands([player_name], full=True)
     
-    print(f"Single-player game {game_id} started with {player_name} vs {num_players - 1} AI opponents")
+    lobby_log.info("Single-player game %s started with %s vs %s AI opponents", game_id, player_name, num_players - 1)
+
+@socketio.on('find_match')
+def handle_find_match(data):
+    """
+    Queue for a table with other players: player_count (2-4), game_mode, power_cards.
+    Replies match_queued; match_found and game_started follow once the table is full (or filled with AIs).
+    """
+    data = data or {}
+    player_name = data.get('player_name') or 'Player'
+    game_mode = data.get('game_mode', 'twenty_dots')
+    try:
+        player_count = int(data.get('player_count', 2))
+    except (ValueError, TypeError):
+        player_count = 0
+    if player_count not in (2, 3, 4) or game_mode not in MATCH_MODES:
+        emit('error', {'message': 'Invalid matchmaking options'})
+        return
+    
+    key = Matchmaker.bucket(player_count, game_mode, data.get('power_cards', False))
+    table = matchmaker.enqueue(request.sid, player_name, key)
+    if table:
+        start_matched_game(table)
+    else:
+        emit('match_queued', {
+            'queued': matchmaker.queued(key),
+            'player_count': player_count,
+            'ai_fill_after': matchmaker.ai_fill_after
+        })
+
+@socketio.on('cancel_match')
+def handle_cancel_match():
+    """Leave the matchmaking queue"""
+    emit('match_cancelled', {'cancelled': matchmaker.cancel(request.sid)})
+
+def start_matched_game(tickets):
+    """Seat a table from the matchmaker in a new game, fill the empty seats with AIs and start it"""
+    import uuid
+    player_count, game_mode, power_cards = tickets[0].key
+    game_id = f"mm_{uuid.uuid4().hex[:8]}"
+    run_new_game(GameSession(game_id, tickets[0].sid, game_mode, player_count, power_cards), seat_matched_table, tickets)
+
+def seat_matched_table(game_session, tickets):
+    """Game command: seat a matched table, fill the empty seats with AIs and start the game"""
+    game_id = game_session.game_id
+    player_count = game_session.required_players
+    
+    def free_name(name):
+        taken, n = name, 2
+        while taken in game_session.player_order:
+            taken, n = f"{name} {n}", n + 1
+        return taken
+    
+    for ticket in tickets:
+        game_session.add_player(ticket.sid, free_name(ticket.player_name))
+        socketio.server.enter_room(ticket.sid, game_id, namespace='/')
+    for i in range(player_count - len(tickets)):
+        ai_name = free_name(f"AI {i + 1}")
+        game_session.add_player(f"ai_{game_id}_{i}", ai_name, is_ai=True)
+        game_session.ai_players[ai_name] = AIPlayer(MATCH_AI_DIFFICULTY)
+    
+    for sid, player_info in game_session.players.items():
+        if not player_info['is_ai']:
+            socketio.emit('match_found', {
+                'game_id': game_id,
+                'player_name': player_info['name'],
+                'players': game_session.player_order
+            }, room=sid)
+    game_session.start()
+    lobby_log.info("Matched game %s started with %s (%s AI seats)", game_id, game_session.player_order, player_count - len(tickets))
+
+def run_matchmaker():
+    """Background task: start the tables that have waited MATCH_AI_FILL_SECONDS, with AI seats"""
+    while True:
+        socketio.sleep(1)
+        try:
+            for table in matchmaker.due_tables():
+                start_matched_game(table)
+        except Exception as e:
+            lobby_log.exception("[MATCH] Filling tables failed: %s", e)
 
 @socketio.on('start_game')
+@game_command
 def handle_start_game(data):
     """Host starts the game"""
     game_id = data.get('game_id')
@@ -855,6 +1446,7 @@ def handle_start_game(data):
     # Create new game with correct number of players
     num_players = len(game_session.player_order)
     game_session.game = TwentyDots(num_players=num_players, difficulty='easy', ai_opponents=ai_opponents)
+    game_session.beliefs = HandBeliefs(game_session.game.power_cards_enabled)
     
     # Update player names in the game
     old_names = list(game_session.game.players.keys())
@@ -868,24 +1460,22 @@ def handle_start_game(data):
     game_session.started = True
     
     # Send game state to all players
-    game_state = game_session.get_game_state()
-    emit('game_started', game_state, room=game_id)
+    game_state = game_session.state_snapshot(notify=False)
+    emit_encoded('game_started', game_state, game_id, game_session.players, json_text=game_session.snapshot_json())
     
     # Send each player their hand privately
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': hand}, room=sid)
+    game_session.push_hands(full=True)
     
-    print(f"Game {game_id} started with players: {game_session.player_order}")
+    lobby_log.info("Game %s started with players: %s", game_id, game_session.player_order)
 
 @socketio.on('play_cards')
+@game_command
 def handle_play_cards(data):
     """Player plays one or more cards"""
     game_id = data.get('game_id')
     cards_data = data.get('cards')  # List of {color, location, power}
     
-    print(f"[PLAY_CARDS] Received play_cards from player. Cards: {cards_data}")
+    turn_log.debug("[PLAY_CARDS] Received play_cards from player. Cards: %s", cards_data)
     
     if game_id not in games:
         emit('error', {'message': 'Game not found'})
@@ -902,10 +1492,9 @@ def handle_play_cards(data):
         emit('error', {'message': 'Not your turn'})
         return
     
-    # Convert cards data back to Card objects
-    from twenty_dots import Card
     hand = game_session.game.players[player_name]['hand']
-    print(f"[PLAY_CARDS] Hand before: {[(c.color, c.location, getattr(c, 'power', None)) for c in hand]}")
+    if turn_log.isEnabledFor(logging.DEBUG):
+        turn_log.debug("[PLAY_CARDS] Hand before: %s", [(c.color, c.location, getattr(c, 'power', None)) for c in hand])
     
     cards_to_play = []
     
@@ -934,20 +1523,20 @@ def handle_play_cards(data):
                 # Matching power card
                 if card.color == card_data['color'] and card_power == req_power:
                     cards_to_play.append(card)
-                    print(f"[PLAY_CARDS] Found matching power card: {card.color} with power {card_power}")
+                    turn_log.debug("[PLAY_CARDS] Found matching power card: %s with power %s", card.color, card_power)
                     break
             else:
                 # Matching regular card
                 if card.color == card_data['color'] and card_loc == req_loc and not card_power:
                     cards_to_play.append(card)
-                    print(f"[PLAY_CARDS] Found matching card: {card.color} at {card_loc}")
+                    turn_log.debug("[PLAY_CARDS] Found matching card: %s at %s", card.color, card_loc)
                     break
     
-    print(f"[PLAY_CARDS] Found {len(cards_to_play)} cards to play")
+    turn_log.debug("[PLAY_CARDS] Found %s cards to play", len(cards_to_play))
     
     if len(cards_to_play) != len(cards_data):
-        print(f"[PLAY_CARDS] ERROR: Could not find all cards. Expected {len(cards_data)}, found {len(cards_to_play)}")
-        print(f"[PLAY_CARDS] Requested: {[(c['color'], c['location'], c.get('power')) for c in cards_data]}")
+        turn_log.warning("[PLAY_CARDS] ERROR: Could not find all cards. Expected %s, found %s", len(cards_data), len(cards_to_play))
+        turn_log.debug("[PLAY_CARDS] Requested: %s", [(c['color'], c['location'], c.get('power')) for c in cards_data])
         emit('error', {'message': 'Invalid cards selected'})
         return
     
@@ -992,7 +1581,7 @@ def handle_play_cards(data):
     
     # If counter is at 2, reset it (means we just started this player's turn after advancing)
     if game_session.game.turn_cards_played[current_player] >= 2:
-        print(f"[PLAY_CARDS] Resetting {current_player}'s counter from {game_session.game.turn_cards_played[current_player]} to 0")
+        turn_log.debug("[PLAY_CARDS] Resetting %s's counter from %s to 0", current_player, game_session.game.turn_cards_played[current_player])
         game_session.game.turn_cards_played[current_player] = 0
     
     cards_played_this_turn = game_session.game.turn_cards_played[current_player]
@@ -1001,11 +1590,10 @@ def handle_play_cards(data):
     total_played_this_turn = cards_played_this_turn + len(cards_to_play)
     if total_played_this_turn > 2:
         emit('error', {'message': f'Can only play 2 cards per turn. Already played {cards_played_this_turn}'})
-        print(f"[PLAY_CARDS] ERROR: {current_player} tried to play {len(cards_to_play)} cards but already played {cards_played_this_turn} this turn")
+        turn_log.warning("[PLAY_CARDS] ERROR: %s tried to play %s cards but already played %s this turn", current_player, len(cards_to_play), cards_played_this_turn)
         return
     
     # Play each card
-    matches_made = False
     yellow_replaced = False
     yellow_collected = False
     power_card_used = False
@@ -1022,31 +1610,29 @@ def handle_play_cards(data):
             'power': card.power if hasattr(card, 'power') else None
         }
         game_session.discard_piles[player_name].append(card_info)
-        print(f"[PLAY_CARDS] Added {card.color} {card.location} to {player_name}'s discard pile")
+        turn_log.debug("[PLAY_CARDS] Added %s %s to %s's discard pile", card.color, card.location, player_name)
         
         # Remove card from hand
         hand.remove(card)
-        print(f"[PLAY_CARDS] Removed {card.color} {card.location} from hand")
+        game_session.beliefs.record_play(player_name, card)
+        turn_log.debug("[PLAY_CARDS] Removed %s %s from hand", card.color, card.location)
         
         # Handle power cards
         if card.power:
             power_card_used = True
-            print(f"[PLAY_CARDS] Playing power card: {card.power}")
+            turn_log.debug("[PLAY_CARDS] Playing power card: %s", card.power)
             
             if card.power == 'wild_place':
                 # Request client to select a position for the wild dot
                 if not hasattr(game_session, 'pending_wild_place'):
                     game_session.pending_wild_place = {}
                 game_session.pending_wild_place[player_name] = True
-                print(f"[PLAY_CARDS] Wild place power - waiting for player to select position")
+                turn_log.debug("[PLAY_CARDS] Wild place power - waiting for player to select position")
                 # Emit event to tell client to select a position
                 emit('select_wild_position', {'message': 'Click any position on the board to place the wild dot'})
                 # Update game state to show card was played
-                emit('game_updated', game_session.get_game_state(), room=game_id)
-                for sid, player_info in game_session.players.items():
-                    if not player_info['is_ai'] and player_info['connected']:
-                        player_hand = game_session.get_player_hand(player_info['name'])
-                        socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+                game_session.broadcast_state()
+                game_session.push_hands()
                 return  # Early return - place_wild handler will finish the turn
                     
             elif card.power == 'remove':
@@ -1063,7 +1649,7 @@ def handle_play_cards(data):
                     row_letter = ['A', 'B', 'C', 'D', 'E', 'F'][r_idx]
                     col_number = c_idx + 1
                     game_session.game.grid[r_idx][c_idx] = None
-                    print(f"[PLAY_CARDS] Removed {dot_color} dot at {row_letter}{col_number}")
+                    turn_log.debug("[PLAY_CARDS] Removed %s dot at %s%s", dot_color, row_letter, col_number)
                     # Emit visual feedback to all players
                     socketio.emit('dot_removed', {
                         'player': player_name,
@@ -1071,7 +1657,7 @@ def handle_play_cards(data):
                         'color': dot_color
                     }, room=game_id)
                 else:
-                    print(f"[PLAY_CARDS] No colored dots on board to remove")
+                    turn_log.debug("[PLAY_CARDS] No colored dots on board to remove")
                     emit('error', {'message': 'No colored dots on board to remove!'})
                     
             elif card.power == 'swap':
@@ -1080,17 +1666,14 @@ def handle_play_cards(data):
                 if not hasattr(game_session, 'pending_swap'):
                     game_session.pending_swap = {}
                 game_session.pending_swap[player_name] = True
-                print(f"[PLAY_CARDS] Swap power - waiting for player to select two dots")
+                turn_log.debug("[PLAY_CARDS] Swap power - waiting for player to select two dots")
                 # Emit event to tell client to select dots
                 emit('select_swap_dots', {'message': 'Click two dots on the board to swap them'})
                 # Remove power card from hand but return early - wait for swap_dots event
                 # Don't go through turn ending logic - that will happen in swap_dots handler
                 # Update game state to show card was played
-                emit('game_updated', game_session.get_game_state(), room=game_id)
-                for sid, player_info in game_session.players.items():
-                    if not player_info['is_ai'] and player_info['connected']:
-                        player_hand = game_session.get_player_hand(player_info['name'])
-                        socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+                game_session.broadcast_state()
+                game_session.push_hands()
                 return  # Early return - swap_dots handler will finish the turn
                     
             elif card.power == 'block':
@@ -1103,16 +1686,13 @@ def handle_play_cards(data):
                 game_session.game.turn_cards_played[current_player] = 2
                 game_session.game.can_roll_dice = False
                 
-                print(f"[PLAY_CARDS] Block power - waiting for player to select empty cell")
+                turn_log.debug("[PLAY_CARDS] Block power - waiting for player to select empty cell")
                 emit('select_block_position', {'message': 'Click an empty cell to block it for 3 turns'})
                 
                 # Broadcast game state to show cards played
-                socketio.emit('game_updated', game_session.get_game_state(), room=game_id)
+                game_session.broadcast_state()
                 # Send updated hands to all players
-                for sid, player_info in game_session.players.items():
-                    if not player_info['is_ai'] and player_info['connected']:
-                        player_hand = game_session.get_player_hand(player_info['name'])
-                        socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+                game_session.push_hands()
                 return  # Early return - place_block handler will finish the turn
             
             elif card.power == 'card_swap':
@@ -1123,7 +1703,7 @@ def handle_play_cards(data):
                 # Get list of opponents
                 opponents = [p for p in game_session.player_order if p != player_name]
                 if not opponents:
-                    print(f"[PLAY_CARDS] Card swap - no opponents to swap with")
+                    turn_log.debug("[PLAY_CARDS] Card swap - no opponents to swap with")
                 else:
                     # Mark that this player has played their cards for the turn
                     game_session.game.turn_cards_played[current_player] = 2
@@ -1135,7 +1715,7 @@ def handle_play_cards(data):
                         'opponent': None,
                         'opponent_cards': []
                     }
-                    print(f"[PLAY_CARDS] Card swap power - waiting for player to select their cards")
+                    turn_log.debug("[PLAY_CARDS] Card swap power - waiting for player to select their cards")
                     # Emit event to tell client to select their cards first
                     emit('select_card_swap', {
                         'step': 'select_own_cards',
@@ -1143,11 +1723,8 @@ def handle_play_cards(data):
                         'opponents': opponents
                     })
                     # Update game state
-                    emit('game_updated', game_session.get_game_state(), room=game_id)
-                    for sid, player_info in game_session.players.items():
-                        if not player_info['is_ai'] and player_info['connected']:
-                            player_hand = game_session.get_player_hand(player_info['name'])
-                            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+                    game_session.broadcast_state()
+                    game_session.push_hands()
                     return  # Early return - card_swap handler will finish the turn
             
             elif card.power == 'landmine':
@@ -1156,15 +1733,12 @@ def handle_play_cards(data):
                 if not hasattr(game_session, 'pending_landmine'):
                     game_session.pending_landmine = {}
                 game_session.pending_landmine[player_name] = True
-                print(f"[PLAY_CARDS] Landmine power - waiting for player to select sacrifice card")
+                turn_log.debug("[PLAY_CARDS] Landmine power - waiting for player to select sacrifice card")
                 # Emit event to tell client to select a sacrifice card
                 emit('select_landmine_sacrifice', {'message': 'Select a regular card to sacrifice for the landmine location'})
                 # Update game state to show power card was played
-                emit('game_updated', game_session.get_game_state(), room=game_id)
-                for sid, player_info in game_session.players.items():
-                    if not player_info['is_ai'] and player_info['connected']:
-                        player_hand = game_session.get_player_hand(player_info['name'])
-                        socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+                game_session.broadcast_state()
+                game_session.push_hands()
                 return  # Early return - place_landmine handler will finish the turn
             
             # Power cards count as playing 2 cards (end turn)
@@ -1186,30 +1760,30 @@ def handle_play_cards(data):
                     emit('error', {'message': f'Cell {row}{col} is blocked for {rounds_remaining} more round(s)!'})
                     # Put the card back in hand
                     hand.append(card)
+                    game_session.beliefs.record_unplay(player_name, card)
                     # Remove from discard pile since it was added earlier
                     if player_name in game_session.discard_piles and game_session.discard_piles[player_name]:
                         game_session.discard_piles[player_name].pop()
                     game_session.game.turn_cards_played[current_player] -= 1
                     # Send updated hand to player
-                    player_hand = game_session.get_player_hand(player_name)
-                    emit('your_hand', {'hand': player_hand})
+                    game_session.push_hands([player_name])
                     return
         
         current_dot = game_session.game.grid[row_idx][col_idx]
         if current_dot and current_dot.color == 'yellow':
             yellow_replaced = True
-            print(f"[PLAY_CARDS] Yellow dot will be replaced at {row}{col}")
+            turn_log.debug("[PLAY_CARDS] Yellow dot will be replaced at %s%s", row, col)
         
         # Regular card - place dot first (but DON'T check matches yet - wait until all cards are placed)
         location_str = f"{row}{col}"
         success, replaced_color = game_session.game.place_card_dot(card)
-        print(f"[PLAY_CARDS] Placed {card.color} at {row}{col}: success={success}, replaced={replaced_color}")
+        turn_log.debug("[PLAY_CARDS] Placed %s at %s%s: success=%s, replaced=%s", card.color, row, col, success, replaced_color)
         
         # Check for landmine at this location AFTER placing the dot
         # This way, the landmine explosion will also remove the dot that triggered it
         landmine_result = game_session.game.check_and_detonate_landmine(location_str, player_name)
         if landmine_result:
-            print(f"[PLAY_CARDS] LANDMINE DETONATED at {location_str}! Removed {len(landmine_result.get('removed_positions', []))} dots (including triggering dot)")
+            turn_log.debug("[PLAY_CARDS] LANDMINE DETONATED at %s! Removed %s dots (including triggering dot)", location_str, len(landmine_result.get('removed_positions', [])))
             # Emit landmine detonation event to all players
             emit('landmine_detonated', {
                 'location': location_str,
@@ -1229,13 +1803,13 @@ def handle_play_cards(data):
             if replaced_color and replaced_color in ['red', 'blue', 'purple', 'green']:
                 game_session.game.players[player_name]['score'][replaced_color] += 1
                 game_session.game.players[player_name]['total_dots'] += 1
-                print(f"[PLAY_CARDS] Awarded point for replacing {replaced_color} dot")
+                turn_log.debug("[PLAY_CARDS] Awarded point for replacing %s dot", replaced_color)
             
             # Track yellow dots collected - when a yellow dot is replaced
             if replaced_color == 'yellow':
                 game_session.game.players[player_name]['yellow_dots'] += 1
                 game_session.game.players[player_name]['total_dots'] += 1
-                print(f"[PLAY_CARDS] {player_name} collected a yellow dot! Total yellow: {game_session.game.players[player_name]['yellow_dots']}")
+                turn_log.debug("[PLAY_CARDS] %s collected a yellow dot! Total yellow: %s", player_name, game_session.game.players[player_name]['yellow_dots'])
     
     # PHASE 2: After all cards are placed, check for matches from each placed position
     # This ensures that when placing 2 adjacent cards, both are on the board before checking
@@ -1244,10 +1818,9 @@ def handle_play_cards(data):
         match_result = game_session.game.check_line_match(placed['row'], placed['col'], placed['color'])
         match, match_color = match_result
         if match:
-            matches_made = True
             for pos in match:
                 all_match_positions.add(pos)
-            print(f"[PLAY_CARDS] Match found from {placed['row']}{placed['col']}: {len(match)} dots")
+            turn_log.debug("[PLAY_CARDS] Match found from %s%s: %s dots", placed['row'], placed['col'], len(match))
     
     # Collect all matched dots and check for yellow
     if all_match_positions:
@@ -1258,7 +1831,7 @@ def handle_play_cards(data):
             dot = game_session.game.grid[row_idx][col_idx]
             if dot and dot.color == 'yellow':
                 yellow_collected = True
-                print(f"[PLAY_CARDS] Yellow dot collected in match")
+                turn_log.debug("[PLAY_CARDS] Yellow dot collected in match")
                 break
         # Determine the color for scoring (use the first placed card's color)
         match_color = placed_positions[0]['color'] if placed_positions else 'red'
@@ -1267,10 +1840,10 @@ def handle_play_cards(data):
     # If yellow was replaced or collected, allow player to roll again for new yellow
     if yellow_replaced or yellow_collected:
         game_session.game.can_roll_dice = True
-        print(f"[PLAY_CARDS] Yellow was replaced/collected - can_roll_dice set to True")
+        turn_log.debug("[PLAY_CARDS] Yellow was replaced/collected - can_roll_dice set to True")
     else:
         game_session.game.can_roll_dice = False
-        print(f"[PLAY_CARDS] Yellow not affected - can_roll_dice set to False")
+        turn_log.debug("[PLAY_CARDS] Yellow not affected - can_roll_dice set to False")
     
     # Auto-advance turn after playing 2 cards THIS TURN
     # If power card was used, it already set turn_cards_played to 2
@@ -1279,30 +1852,30 @@ def handle_play_cards(data):
     else:
         total_played_this_turn = cards_played_this_turn + len(cards_to_play)
         game_session.game.turn_cards_played[current_player] = total_played_this_turn
-    print(f"[PLAY_CARDS] Updated {current_player}'s counter to {total_played_this_turn}, power_card_used={power_card_used}")
+    turn_log.debug("[PLAY_CARDS] Updated %s's counter to %s, power_card_used=%s", current_player, total_played_this_turn, power_card_used)
     
     # Only draw cards when turn is ending (at 2 cards played)
     if total_played_this_turn >= 2:
-        print(f"[PLAY_CARDS] {player_name} has played {total_played_this_turn} cards this turn, drawing replacements")
+        turn_log.debug("[PLAY_CARDS] %s has played %s cards this turn, drawing replacements", player_name, total_played_this_turn)
         # Draw cards back to 5 AFTER playing 2 cards
         cards_drawn = 0
         while len(hand) < 5 and game_session.game.deck:
             game_session.game.draw_card(player_name)
             cards_drawn += 1
-        print(f"[PLAY_CARDS] Drew {cards_drawn} cards")
+        turn_log.debug("[PLAY_CARDS] Drew %s cards", cards_drawn)
         
         # Only advance turn if yellow was NOT replaced or collected
         # If yellow was affected, current player must roll again
         if not (yellow_replaced or yellow_collected):
-            print(f"[PLAY_CARDS] Auto-advancing turn (yellow not affected)")
+            turn_log.debug("[PLAY_CARDS] Auto-advancing turn (yellow not affected)")
             game_session.game.can_roll_dice = False
             game_session.advance_turn()
             # Reset card counter for new player
             new_player = game_session.game.get_current_player()
             game_session.game.turn_cards_played[new_player] = 0
-            print(f"[PLAY_CARDS] Turn advanced to {new_player}")
+            turn_log.debug("[PLAY_CARDS] Turn advanced to %s", new_player)
         else:
-            print(f"[PLAY_CARDS] Yellow was affected - {player_name} must roll again")
+            turn_log.debug("[PLAY_CARDS] Yellow was affected - %s must roll again", player_name)
             # Mark that this player must advance their turn after rolling
             if not hasattr(game_session.game, 'must_advance_after_roll'):
                 game_session.game.must_advance_after_roll = {}
@@ -1310,16 +1883,15 @@ def handle_play_cards(data):
             # Keep the current card counter - player will continue from where they left off after rolling
             # DO NOT reset to 0 - they've already played some cards this turn
     else:
-        print(f"[PLAY_CARDS] {player_name} has played {total_played_this_turn} card(s) this turn, waiting for more or 2nd card")
+        turn_log.debug("[PLAY_CARDS] %s has played %s card(s) this turn, waiting for more or 2nd card", player_name, total_played_this_turn)
     
     # Broadcast updated game state BEFORE modifying discard pile
-    game_state = game_session.get_game_state()
-    emit('game_updated', game_state, room=game_id)
+    game_session.broadcast_state()
     
     # Check for winner
     winner_result = game_session.check_winner()
     if winner_result:
-        print(f"[PLAY_CARDS] GAME OVER! Winner: {winner_result['winner']} (mode: {winner_result['mode']})")
+        turn_log.info("[PLAY_CARDS] GAME OVER! Winner: %s (mode: %s)", winner_result['winner'], winner_result['mode'])
         emit('game_over', {
             'winner': winner_result['winner'],
             'condition': winner_result['mode']
@@ -1329,94 +1901,88 @@ def handle_play_cards(data):
     # Don't reset discard pile - keep it visible to show what was played
     
     # Send updated hand to all players
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': hand}, room=sid)
+    game_session.push_hands()
     
     # Execute AI move if next player is AI
     next_player_name = game_session.game.get_current_player()
     
     if next_player_name in game_session.ai_players:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
     
-    print(f"{player_name} played {len(cards_to_play)} card(s) in game {game_id}")
+    turn_log.debug("%s played %s card(s) in game %s", player_name, len(cards_to_play), game_id)
 
 
 @socketio.on('end_turn')
+@game_command
 def handle_end_turn(data):
     """Player ends their turn"""
     game_id = data.get('game_id')
-    print(f"[END_TURN] Received end_turn request for game {game_id}")
+    turn_log.debug("[END_TURN] Received end_turn request for game %s", game_id)
     
     if game_id not in games:
-        print(f"[END_TURN] ERROR: Game {game_id} not found")
+        turn_log.warning("[END_TURN] ERROR: Game %s not found", game_id)
         emit('error', {'message': 'Game not found'})
         return
     
     game_session = games[game_id]
     player_name = game_session.get_player_name(request.sid)
-    print(f"[END_TURN] Player name from session: {player_name}")
+    turn_log.debug("[END_TURN] Player name from session: %s", player_name)
     
     if not player_name:
-        print(f"[END_TURN] ERROR: Player not found in session {request.sid}")
+        turn_log.warning("[END_TURN] ERROR: Player not found in session %s", request.sid)
         emit('error', {'message': 'You are not in this game'})
         return
     
     current_player = game_session.game.get_current_player()
-    print(f"[END_TURN] Current player: {current_player}, Ending player: {player_name}")
+    turn_log.debug("[END_TURN] Current player: %s, Ending player: %s", current_player, player_name)
     
     if current_player != player_name:
-        print(f"[END_TURN] ERROR: Not this player's turn! Current={current_player}, Request from={player_name}")
+        turn_log.warning("[END_TURN] ERROR: Not this player's turn! Current=%s, Request from=%s", current_player, player_name)
         emit('error', {'message': 'Not your turn'})
         return
     
-    print(f"[END_TURN] Validations passed. Drawing cards...")
+    turn_log.debug("[END_TURN] Validations passed. Drawing cards...")
     # Draw cards to 5 before ending turn
     hand = game_session.game.players[player_name]['hand']
     cards_drawn = 0
     while len(hand) < 5 and game_session.game.deck:
         game_session.game.draw_card(player_name)
         cards_drawn += 1
-    print(f"[END_TURN] Drew {cards_drawn} cards. Hand size now: {len(hand)}")
+    turn_log.debug("[END_TURN] Drew %s cards. Hand size now: %s", cards_drawn, len(hand))
     
-    print(f"[END_TURN] Current player index before: {game_session.game.current_player_idx}")
+    turn_log.debug("[END_TURN] Current player index before: %s", game_session.game.current_player_idx)
     # Move to next turn (also decrements block turns)
     game_session.advance_turn()
     
     # Don't automatically enable roll dice - it should only be enabled at game start or when yellow is affected
-    print(f"[END_TURN] Current player index after: {game_session.game.current_player_idx}")
-    print(f"[END_TURN] New current player: {game_session.game.get_current_player()}")
+    turn_log.debug("[END_TURN] Current player index after: %s", game_session.game.current_player_idx)
+    turn_log.debug("[END_TURN] New current player: %s", game_session.game.get_current_player())
     
     # Broadcast updated game state
-    game_state = game_session.get_game_state()
-    print(f"[END_TURN] Broadcasting game state with current_turn: {game_state['current_turn']}")
-    emit('game_updated', game_state, room=game_id)
+    turn_log.debug("[END_TURN] Broadcasting game state with current_turn: %s", game_session.game.get_current_player())
+    game_session.broadcast_state()
     
     # Send hand to all players
-    print(f"[END_TURN] Sending hands to {len(game_session.players)} players")
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
-            print(f"[END_TURN] Sent hand to {player_info['name']}")
+    turn_log.debug("[END_TURN] Sending hands to %s players", len(game_session.players))
+    game_session.push_hands()
     
     # Execute AI move if next player is AI
     next_player = game_session.game.get_current_player()
-    print(f"[END_TURN] Next player: {next_player}")
-    print(f"[END_TURN] AI players: {list(game_session.ai_players.keys())}")
-    print(f"[END_TURN] Is next player AI? {next_player in game_session.ai_players}")
+    turn_log.debug("[END_TURN] Next player: %s", next_player)
+    turn_log.debug("[END_TURN] AI players: %s", list(game_session.ai_players.keys()))
+    turn_log.debug("[END_TURN] Is next player AI? %s", next_player in game_session.ai_players)
     
     if next_player in game_session.ai_players:
-        print(f"[END_TURN] Starting background task for AI move for {next_player}")
-        socketio.start_background_task(game_session.execute_ai_move)
+        turn_log.debug("[END_TURN] Starting background task for AI move for %s", next_player)
+        game_session.actor.submit(game_session.execute_ai_move)
     else:
-        print(f"[END_TURN] Next player {next_player} is not AI, waiting for player action")
+        turn_log.debug("[END_TURN] Next player %s is not AI, waiting for player action", next_player)
     
-    print(f"[END_TURN] Turn ended successfully. Now: {game_session.game.get_current_player()}")
+    turn_log.debug("[END_TURN] Turn ended successfully. Now: %s", game_session.game.get_current_player())
 
 
 @socketio.on('roll_dice')
+@game_command
 def handle_roll_dice(data):
     """Player rolls dice for yellow wild dot"""
     game_id = data.get('game_id')
@@ -1443,14 +2009,14 @@ def handle_roll_dice(data):
     # Track if this player must advance turn after rolling
     must_advance = player_name in game_session.game.must_advance_after_roll and game_session.game.must_advance_after_roll[player_name]
     if must_advance:
-        print(f"[ROLL_DICE] {player_name} must advance turn after this roll")
+        turn_log.debug("[ROLL_DICE] %s must advance turn after this roll", player_name)
     
     # Roll for yellow dot position (returns row, col as strings like 'A', '1')
     row, col = game_session.game.roll_dice()
     row_idx = game_session.game.rows.index(row)
     col_idx = game_session.game.columns.index(col)
     
-    print(f"[ROLL_DICE] Rolled {row}{col} (indices: {row_idx}, {col_idx})")
+    turn_log.debug("[ROLL_DICE] Rolled %s%s (indices: %s, %s)", row, col, row_idx, col_idx)
     
     # Remove the old yellow dot first (if it exists and wasn't collected)
     old_yellow_pos = getattr(game_session.game, 'yellow_dot_position', None)
@@ -1459,53 +2025,56 @@ def handle_roll_dice(data):
         old_dot_at_pos = game_session.game.grid[old_row][old_col]
         if old_dot_at_pos and old_dot_at_pos.color == 'yellow':
             game_session.game.grid[old_row][old_col] = None
-            print(f"[ROLL_DICE] Removed old yellow dot from grid[{old_row}][{old_col}]")
+            turn_log.debug("[ROLL_DICE] Removed old yellow dot from grid[%s][%s]", old_row, old_col)
     
     # Place yellow dot at new position
     from twenty_dots import Dot
     old_dot = game_session.game.grid[row_idx][col_idx]
     game_session.game.grid[row_idx][col_idx] = Dot('yellow')
     game_session.game.yellow_dot_position = (row_idx, col_idx)
-    print(f"[ROLL_DICE] Placed yellow dot at grid[{row_idx}][{col_idx}] (replaced: {old_dot.color if old_dot else 'empty'})")
-    
-    # Log surrounding grid state for debugging
-    print(f"[ROLL_DICE] Grid around {row}{col}:")
-    for check_row in range(max(0, row_idx-2), min(6, row_idx+3)):
-        for check_col in range(max(0, col_idx-2), min(6, col_idx+3)):
-            dot = game_session.game.grid[check_row][check_col]
-            dot_str = f"{dot.color[0].upper()}" if dot else "."
-            if check_row == row_idx and check_col == col_idx:
-                dot_str = f"[{dot_str}]"  # Mark placed dot
-            print(dot_str, end=" ")
-        print()
+    turn_log.debug("[ROLL_DICE] Placed yellow dot at grid[%s][%s] (replaced: %s)", row_idx, col_idx, old_dot.color if old_dot else 'empty')
+    
+    # Log surrounding grid state for debugging (built only when turn debugging is on)
+    if turn_log.isEnabledFor(logging.DEBUG):
+        grid_lines = []
+        for check_row in range(max(0, row_idx-2), min(6, row_idx+3)):
+            dot_strs = []
+            for check_col in range(max(0, col_idx-2), min(6, col_idx+3)):
+                dot = game_session.game.grid[check_row][check_col]
+                dot_str = f"{dot.color[0].upper()}" if dot else "."
+                if check_row == row_idx and check_col == col_idx:
+                    dot_str = f"[{dot_str}]"  # Mark placed dot
+                dot_strs.append(dot_str)
+            grid_lines.append(" ".join(dot_strs))
+        turn_log.debug("[ROLL_DICE] Grid around %s%s:\n%s", row, col, "\n".join(grid_lines))
     
     # Check for matches created by yellow dot
-    print(f"[ROLL_DICE] About to call check_line_match for {row}{col} (indices {row_idx},{col_idx})")
+    turn_log.debug("[ROLL_DICE] About to call check_line_match for %s%s (indices %s,%s)", row, col, row_idx, col_idx)
     match_result = game_session.game.check_line_match(row, col, 'yellow')
     match, match_color = match_result
     
     if match:  # Check if match list has items
-        print(f"[ROLL_DICE] check_line_match returned match of {len(match)} positions: {match} (color={match_color})")
+        turn_log.debug("[ROLL_DICE] check_line_match returned match of %s positions: %s (color=%s)", len(match), match, match_color)
         # Collect the match with the detected color (not 'yellow')
-        print(f"[ROLL_DICE] MATCH FOUND! Collecting {len(match)} positions for color {match_color}")
+        turn_log.debug("[ROLL_DICE] MATCH FOUND! Collecting %s positions for color %s", len(match), match_color)
         game_session.game.collect_dots(match, player_name, match_color)
-        print(f"[ROLL_DICE] After collect_dots, checking player stats...")
-        print(f"[ROLL_DICE] {player_name}'s score: {game_session.game.players[player_name]['score']}")
-        print(f"[ROLL_DICE] {player_name}'s total_dots: {game_session.game.players[player_name]['total_dots']}")
+        turn_log.debug("[ROLL_DICE] After collect_dots, checking player stats...")
+        turn_log.debug("[ROLL_DICE] %s's score: %s", player_name, game_session.game.players[player_name]['score'])
+        turn_log.debug("[ROLL_DICE] %s's total_dots: %s", player_name, game_session.game.players[player_name]['total_dots'])
         # Can roll again if matched
         game_session.game.can_roll_dice = True
     else:
-        print(f"[ROLL_DICE] NO MATCH detected at {row}{col}")
+        turn_log.debug("[ROLL_DICE] NO MATCH detected at %s%s", row, col)
         # No match - if player must advance after roll, do it now
         if must_advance:
-            print(f"[ROLL_DICE] Advancing {player_name}'s turn after rolling")
+            turn_log.debug("[ROLL_DICE] Advancing %s's turn after rolling", player_name)
             game_session.game.must_advance_after_roll[player_name] = False
             
             # Draw cards to 5 before ending turn
             hand = game_session.game.players[player_name]['hand']
             while len(hand) < 5 and game_session.game.deck:
                 game_session.game.draw_card(player_name)
-            print(f"[ROLL_DICE] Drew cards for {player_name}, now has {len(hand)} cards")
+            turn_log.debug("[ROLL_DICE] Drew cards for %s, now has %s cards", player_name, len(hand))
             
             game_session.advance_turn()
             new_player = game_session.game.get_current_player()
@@ -1516,22 +2085,21 @@ def handle_roll_dice(data):
             
             # Trigger AI move if next player is AI
             if new_player in game_session.ai_players:
-                print(f"[ROLL_DICE] Next player is AI {new_player}, triggering AI move")
-                socketio.start_background_task(game_session.execute_ai_move)
+                turn_log.debug("[ROLL_DICE] Next player is AI %s, triggering AI move", new_player)
+                game_session.actor.submit(game_session.execute_ai_move)
         else:
             # Normal case - player can now play cards
             game_session.game.can_roll_dice = False
     
-    print(f"[ROLL_DICE] {player_name} rolled at {row}{col}. Match: {bool(match)}. can_roll_dice={game_session.game.can_roll_dice}")
+    turn_log.debug("[ROLL_DICE] %s rolled at %s%s. Match: %s. can_roll_dice=%s", player_name, row, col, bool(match), game_session.game.can_roll_dice)
     
     # Broadcast updated game state
-    game_state = game_session.get_game_state()
-    emit('game_updated', game_state, room=game_id)
+    game_session.broadcast_state()
     
     # Check for winner
     winner_result = game_session.check_winner()
     if winner_result:
-        print(f"[ROLL_DICE] GAME OVER! Winner: {winner_result['winner']} (mode: {winner_result['mode']})")
+        turn_log.info("[ROLL_DICE] GAME OVER! Winner: %s (mode: %s)", winner_result['winner'], winner_result['mode'])
         emit('game_over', {
             'winner': winner_result['winner'],
             'condition': winner_result['mode']
@@ -1539,14 +2107,12 @@ def handle_roll_dice(data):
         return
     
     # Send updated hand to all players
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+    game_session.push_hands()
     
-    print(f"{player_name} rolled dice, placed yellow at {row}{col}")
+    turn_log.debug("%s rolled dice, placed yellow at %s%s", player_name, row, col)
 
 @socketio.on('pass_turn')
+@game_command
 def handle_pass_turn(data):
     """Player passes their turn without playing cards"""
     game_id = data.get('game_id')
@@ -1571,7 +2137,7 @@ def handle_pass_turn(data):
         emit('error', {'message': 'You must roll the wild dice first'})
         return
     
-    print(f"[PASS_TURN] {player_name} is passing their turn")
+    turn_log.debug("[PASS_TURN] %s is passing their turn", player_name)
     
     # Advance to next player
     game_session.advance_turn()
@@ -1583,10 +2149,10 @@ def handle_pass_turn(data):
     game_session.game.turn_cards_played[new_player] = 0
     game_session.game.can_roll_dice = False
     
-    print(f"[PASS_TURN] Turn advanced to {new_player}")
+    turn_log.debug("[PASS_TURN] Turn advanced to %s", new_player)
     
     # Broadcast updated game state
-    emit('game_updated', game_session.get_game_state(), room=game_id)
+    game_session.broadcast_state()
     
     # Check for winner
     winner_result = game_session.check_winner()
@@ -1599,10 +2165,11 @@ def handle_pass_turn(data):
     
     # Execute AI turn if next player is AI
     if game_session.players[game_session.sid_map[new_player]]['is_ai']:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
 
 
 @socketio.on('cancel_power_card')
+@game_command
 def handle_cancel_power_card(data):
     """Handle canceling a power card - refund the card to player's hand"""
     game_id = data.get('game_id')
@@ -1618,7 +2185,7 @@ def handle_cancel_power_card(data):
         emit('error', {'message': 'Player not found'})
         return
     
-    print(f"[CANCEL_POWER] {player_name} canceling power card")
+    turn_log.debug("[CANCEL_POWER] %s canceling power card", player_name)
     
     # Find the last power card in discard pile and return it to hand
     if player_name in game_session.discard_piles and game_session.discard_piles[player_name]:
@@ -1634,8 +2201,9 @@ def handle_cancel_power_card(data):
             power = last_card['power']
             refund_card = Card(location, color, power)
             
-            hand = game_session.get_player_hand(player_name)
+            hand = game_session.game.players[player_name]['hand']
             hand.append(refund_card)
+            game_session.beliefs.record_unplay(player_name, refund_card)
             
             # Clear pending states
             if hasattr(game_session, 'pending_swap') and player_name in game_session.pending_swap:
@@ -1651,17 +2219,17 @@ def handle_cancel_power_card(data):
             if player_name in game_session.game.turn_cards_played:
                 game_session.game.turn_cards_played[player_name] = 0
             
-            print(f"[CANCEL_POWER] Refunded {power} card to {player_name}")
+            turn_log.debug("[CANCEL_POWER] Refunded %s card to %s", power, player_name)
             
             # Send updated hand
-            player_hand = game_session.get_player_hand(player_name)
-            emit('your_hand', {'hand': player_hand})
+            game_session.push_hands([player_name])
             
             # Update game state for all
-            emit('game_updated', game_session.get_game_state(), room=game_id)
+            game_session.broadcast_state()
 
 
 @socketio.on('swap_dots')
+@game_command
 def handle_swap_dots(data):
     """Handle swap power card - player selected two dots to swap"""
     game_id = data.get('game_id')
@@ -1708,7 +2276,7 @@ def handle_swap_dots(data):
     # Perform the swap
     game_session.game.grid[row1][col1] = dot2
     game_session.game.grid[row2][col2] = dot1
-    print(f"[SWAP_DOTS] {player_name} swapped {dot1.color} at ({row1},{col1}) with {dot2.color} at ({row2},{col2})")
+    turn_log.debug("[SWAP_DOTS] %s swapped %s at (%s,%s) with %s at (%s,%s)", player_name, dot1.color, row1, col1, dot2.color, row2, col2)
     
     # Check for matches at BOTH swapped positions
     matches_found = []
@@ -1718,7 +2286,7 @@ def handle_swap_dots(data):
     col_str1 = game_session.game.columns[col1]
     match1, color1 = game_session.game.check_line_match(row_letter1, col_str1, dot2.color)
     if match1:
-        print(f"[SWAP_DOTS] Match found at position 1: {len(match1)} dots of {color1}")
+        turn_log.debug("[SWAP_DOTS] Match found at position 1: %s dots of %s", len(match1), color1)
         game_session.game.collect_dots(match1, player_name, color1)
         matches_found.extend(match1)
     
@@ -1730,7 +2298,7 @@ def handle_swap_dots(data):
         # Avoid double-counting dots that might be in both matches
         new_matches = [pos for pos in match2 if pos not in matches_found]
         if new_matches or match2:
-            print(f"[SWAP_DOTS] Match found at position 2: {len(match2)} dots of {color2}")
+            turn_log.debug("[SWAP_DOTS] Match found at position 2: %s dots of %s", len(match2), color2)
             # Only collect dots that weren't already collected
             remaining_dots = [(c, r) for c, r in match2 if game_session.game.grid[r][c] is not None]
             if remaining_dots:
@@ -1758,13 +2326,10 @@ def handle_swap_dots(data):
     game_session.game.can_roll_dice = False
     
     # Broadcast updated game state
-    emit('game_updated', game_session.get_game_state(), room=game_id)
+    game_session.broadcast_state()
     
     # Send updated hands
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+    game_session.push_hands()
     
     # Check for winner
     winner_result = game_session.check_winner()
@@ -1777,10 +2342,11 @@ def handle_swap_dots(data):
     
     # Execute AI turn if next player is AI
     if new_player in game_session.ai_players:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
 
 
 @socketio.on('place_landmine')
+@game_command
 def handle_place_landmine(data):
     """Handle landmine placement - player selected a sacrifice card"""
     game_id = data.get('game_id')
@@ -1818,7 +2384,7 @@ def handle_place_landmine(data):
     location_str = f"{row}{col}"
     color = sacrifice_card.get('color', 'red')
     
-    print(f"[PLACE_LANDMINE] {player_name} placing landmine at {location_str} with color {color}")
+    turn_log.debug("[PLACE_LANDMINE] %s placing landmine at %s with color %s", player_name, location_str, color)
     
     # Check if location is empty (required for landmine)
     row_idx = game_session.game.rows.index(row) if row in game_session.game.rows else -1
@@ -1843,8 +2409,9 @@ def handle_place_landmine(data):
         if card.location and len(card.location) >= 2:
             if card.location[0] == row and card.location[1] == col:
                 hand.pop(i)
+                game_session.beliefs.record_hidden(player_name, card)
                 sacrifice_found = True
-                print(f"[PLACE_LANDMINE] Removed sacrifice card {card.color} at {card.location}")
+                turn_log.debug("[PLACE_LANDMINE] Removed sacrifice card %s at %s", card.color, card.location)
                 break
     
     if not sacrifice_found:
@@ -1857,7 +2424,7 @@ def handle_place_landmine(data):
         emit('error', {'message': 'Failed to place landmine'})
         return
     
-    print(f"[PLACE_LANDMINE] Landmine placed successfully at {location_str}")
+    turn_log.debug("[PLACE_LANDMINE] Landmine placed successfully at %s", location_str)
     
     # Clear pending landmine
     del game_session.pending_landmine[player_name]
@@ -1887,13 +2454,10 @@ def handle_place_landmine(data):
     game_session.game.can_roll_dice = False
     
     # Broadcast updated game state
-    emit('game_updated', game_session.get_game_state(), room=game_id)
+    game_session.broadcast_state()
     
     # Send updated hands
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+    game_session.push_hands()
     
     # Check for winner
     winner_result = game_session.check_winner()
@@ -1906,10 +2470,11 @@ def handle_place_landmine(data):
     
     # Execute AI turn if next player is AI
     if new_player in game_session.ai_players:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
 
 
 @socketio.on('place_block')
+@game_command
 def handle_place_block(data):
     """Handle block power card - player selected an empty cell to block"""
     game_id = data.get('game_id')
@@ -1960,7 +2525,7 @@ def handle_place_block(data):
     
     row_letter = game_session.game.rows[row]
     col_str = game_session.game.columns[col]
-    print(f"[PLACE_BLOCK] {player_name} blocked cell {row_letter}{col_str} for {turns_to_block} turns (3 rounds)")
+    turn_log.debug("[PLACE_BLOCK] %s blocked cell %s%s for %s turns (3 rounds)", player_name, row_letter, col_str, turns_to_block)
     
     # Clear pending block
     del game_session.pending_block[player_name]
@@ -1989,20 +2554,18 @@ def handle_place_block(data):
     game_session.game.can_roll_dice = False
     
     # Broadcast updated game state
-    socketio.emit('game_updated', game_session.get_game_state(), room=game_id)
+    game_session.broadcast_state()
     
     # Send updated hands to all players
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+    game_session.push_hands()
     
     # Execute AI turn if next player is AI
     if new_player in game_session.ai_players:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
 
 
 @socketio.on('place_wild')
+@game_command
 def handle_place_wild(data):
     """Handle wild place power card - player selected a position for the wild dot"""
     game_id = data.get('game_id')
@@ -2041,7 +2604,7 @@ def handle_place_wild(data):
     row = game_session.game.rows[row_idx]
     col = game_session.game.columns[col_idx]
     
-    print(f"[PLACE_WILD] {player_name} placing wild at {row}{col}")
+    turn_log.debug("[PLACE_WILD] %s placing wild at %s%s", player_name, row, col)
     
     # Place the wild dot (this also removes old yellow if exists)
     game_session.game.place_wild_at_location(row, col)
@@ -2058,12 +2621,12 @@ def handle_place_wild(data):
         match_result = game_session.game.check_line_match(row, col, color)
         match, match_color = match_result
         if match:
-            print(f"[PLACE_WILD] Match found for {color}! {len(match)} dots")
+            turn_log.debug("[PLACE_WILD] Match found for %s! %s dots", color, len(match))
             all_matches.append((match, match_color))
     
     # Now collect all matches
     for match, match_color in all_matches:
-        print(f"[PLACE_WILD] Collecting {len(match)} {match_color} dots")
+        turn_log.debug("[PLACE_WILD] Collecting %s %s dots", len(match), match_color)
         # Check if yellow dot is in the matched positions
         for col_idx_m, row_idx_m in match:
             dot = game_session.game.grid[row_idx_m][col_idx_m]
@@ -2073,11 +2636,11 @@ def handle_place_wild(data):
         game_session.game.collect_dots(match, player_name, match_color)
     
     if all_matches:
-        print(f"[PLACE_WILD] Total matches collected: {len(all_matches)}")
+        turn_log.debug("[PLACE_WILD] Total matches collected: %s", len(all_matches))
     
     # If yellow was collected in the match, player must roll dice for new wild
     if yellow_collected:
-        print(f"[PLACE_WILD] Yellow was collected in match - player must roll dice")
+        turn_log.debug("[PLACE_WILD] Yellow was collected in match - player must roll dice")
         game_session.game.can_roll_dice = True
         game_session.game.yellow_dot_position = None  # Clear yellow position
         
@@ -2087,13 +2650,10 @@ def handle_place_wild(data):
         game_session.game.must_advance_after_roll[player_name] = True
         
         # Broadcast updated game state (player still has turn, must roll)
-        emit('game_updated', game_session.get_game_state(), room=game_id)
+        game_session.broadcast_state()
         
         # Send updated hands
-        for sid, player_info in game_session.players.items():
-            if not player_info['is_ai'] and player_info['connected']:
-                player_hand = game_session.get_player_hand(player_info['name'])
-                socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+        game_session.push_hands()
         return  # Don't advance turn - wait for roll
     
     # Now advance turn (power card ends turn, no yellow collected)
@@ -2115,13 +2675,10 @@ def handle_place_wild(data):
     game_session.game.can_roll_dice = False
     
     # Broadcast updated game state
-    emit('game_updated', game_session.get_game_state(), room=game_id)
+    game_session.broadcast_state()
     
     # Send updated hands
-    for sid, player_info in game_session.players.items():
-        if not player_info['is_ai'] and player_info['connected']:
-            player_hand = game_session.get_player_hand(player_info['name'])
-            socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+    game_session.push_hands()
     
     # Check for winner
     winner_result = game_session.check_winner()
@@ -2134,10 +2691,11 @@ def handle_place_wild(data):
     
     # Execute AI turn if next player is AI
     if new_player in game_session.ai_players:
-        socketio.start_background_task(game_session.execute_ai_move)
+        game_session.actor.submit(game_session.execute_ai_move)
 
 
 @socketio.on('card_swap_action')
+@game_command
 def handle_card_swap_action(data):
     """Handle card swap power card - multi-step process"""
     game_id = data.get('game_id')
@@ -2193,8 +2751,8 @@ def handle_card_swap_action(data):
                     break
         
         if len(card_indices) != 2:
-            print(f"[CARD_SWAP] Could not find cards. Looking for: {cards}")
-            print(f"[CARD_SWAP] Hand has: {[(c.color, c.location) for c in player_hand]}")
+            turn_log.warning("[CARD_SWAP] Could not find cards. Looking for: %s", cards)
+            turn_log.debug("[CARD_SWAP] Hand has: %s", [(c.color, c.location) for c in player_hand])
             emit('error', {'message': 'Could not find selected cards in hand'})
             return
         
@@ -2266,8 +2824,9 @@ def handle_card_swap_action(data):
         # Add swapped cards
         player_hand.extend(opponent_cards)
         opponent_hand.extend(player_cards)
+        game_session.beliefs.record_swap(player_name, opponent, player_cards, opponent_cards)
         
-        print(f"[CARD_SWAP] {player_name} swapped 2 cards with {opponent}")
+        turn_log.debug("[CARD_SWAP] %s swapped 2 cards with %s", player_name, opponent)
         
         # Clear pending swap
         del game_session.pending_card_swap[player_name]
@@ -2315,13 +2874,10 @@ def handle_card_swap_action(data):
         game_session.game.can_roll_dice = False  # New player starts by playing cards, NOT rolling
         
         # Broadcast updated game state
-        emit('game_updated', game_session.get_game_state(), room=game_id)
+        game_session.broadcast_state()
         
         # Send updated hands to all players
-        for sid, player_info in game_session.players.items():
-            if not player_info['is_ai'] and player_info['connected']:
-                player_hand = game_session.get_player_hand(player_info['name'])
-                socketio.emit('your_hand', {'hand': player_hand}, room=sid)
+        game_session.push_hands()
         
         # Check for winner
         winner_result = game_session.check_winner()
@@ -2334,63 +2890,143 @@ def handle_card_swap_action(data):
         
         # Execute AI turn if next player is AI
         if new_player in game_session.ai_players:
-            socketio.start_background_task(game_session.execute_ai_move)
+            game_session.actor.submit(game_session.execute_ai_move)
 
-
-def execute_ai_turn(game_session, ai_name):
-    """Execute an AI player's turn"""
-    ai_player = game_session.ai_players[ai_name]
+@socketio.on('request_state')
+@game_command
+def handle_request_state(data):
+    """Send a full snapshot to a client that missed a game_updated delta (sequence gap)"""
+    game_id = data.get('game_id')
     
-    # AI chooses cards to play
-    cards = ai_player.choose_cards(
-        game_session.game.players[ai_name]['hand'],
-        game_session.game.grid
-    )
+    if game_id not in games:
+        emit('error', {'message': 'Game not found'})
+        return
     
-    if cards:
-        success, message = game_session.game.play_cards(ai_name, cards)
-        if not success:
-            print(f"AI {ai_name} play failed: {message}")
+    game_session = games[game_id]
+    if request.sid not in game_session.players:
+        emit('error', {'message': 'Player not found'})
+        return
     
-    # AI ends turn
-    game_session.game.next_turn()
+    lobby_log.info("[REQUEST_STATE] Resync for %s (had seq %s, now %s)", game_session.players[request.sid]['name'], data.get('seq'), game_session.state_seq)
+    emit_encoded('game_updated', game_session.state_snapshot(), request.sid, json_text=game_session.snapshot_json())
+
+@socketio.on('request_hand')
+@game_command
+def handle_request_hand(data):
+    """Send the whole hand to a client that missed a your_hand diff (sequence gap)"""
+    game_id = data.get('game_id')
     
-    # Broadcast updated game state
-    game_state = game_session.get_game_state()
-    socketio.emit('game_updated', game_state, room=game_session.game_id)
+    if game_id not in games:
+        emit('error', {'message': 'Game not found'})
+        return
     
-    # If next player is also AI, continue
-    next_player = game_session.game.current_turn
-    if next_player in game_session.ai_players:
-        socketio.sleep(1)  # Brief delay for visibility
-        execute_ai_turn(game_session, next_player)
-    else:
-        # Send hand to human player
-        for sid, player_info in game_session.players.items():
-            if player_info['name'] == next_player:
-                hand = game_session.get_player_hand(next_player)
-                socketio.emit('your_hand', {'hand': hand}, room=sid)
-                break
+    game_session = games[game_id]
+    if request.sid not in game_session.players:
+        emit('error', {'message': 'Player not found'})
+        return
+    
+    player_name = game_session.players[request.sid]['name']
+    lobby_log.info("[REQUEST_HAND] Resync for %s (had seq %s)", player_name, data.get('seq'))
+    game_session.push_hands([player_name], full=True)
 
 @socketio.on('list_games')
-def handle_list_games():
-    """List all available games"""
-    available_games = []
-    for game_id, game_session in games.items():
-        if not game_session.started:
-            available_games.append({
-                'game_id': game_id,
-                'players': len(game_session.players),
-                'max_players': 4,
-                'player_names': game_session.player_order
-            })
-    
-    emit('games_list', {'games': available_games})
+def handle_list_games(data=None):
+    """
+    One page of open lobbies, oldest first.
+    
+    Optional filters: game_mode, power_cards, min_open_seats (default 1). Pass the reply's 'next'
+    as 'after' for the following page. subscribe=True also pushes every later lobby change to
+    this client as lobby_updated ({'game': entry} or {'removed': game_id}) until unsubscribe_lobby.
+    """
+    data = data or {}
+    try:
+        limit = max(1, min(int(data.get('limit', 20)), 100))
+        after = int(data.get('after') or 0)
+        min_open_seats = int(data.get('min_open_seats', 1))
+    except (ValueError, TypeError):
+        emit('error', {'message': 'Invalid list_games paging'})
+        return
+    page = lobby_index.query(data.get('game_mode'), data.get('power_cards'), min_open_seats, after, limit)
+    if data.get('subscribe'):
+        join_room(LOBBY_ROOM)
+    emit('games_list', page)
+
+@socketio.on('unsubscribe_lobby')
+def handle_unsubscribe_lobby():
+    """Stop lobby_updated pushes to this client"""
+    leave_room(LOBBY_ROOM)
+
+def static_response(path):
+    """One of STATIC_FILES in the encoding the browser prefers (304 if its cached copy is current), or None"""
+    served = static_assets.response(path, request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+    if served is None:
+        return None
+    status, headers, body = served
+    return Response(body, status=status, headers=headers)
 
 @app.route('/')
 def index():
     """Serve the web client"""
-    return send_from_directory('.', 'web_client.html')
+    return static_response('web_client.html')
+
+# State versions restart at 0 with the process, so ETags carry a per-process epoch: one from before a restart never matches
+STATE_ETAG_EPOCH = os.urandom(4).hex()
+
+@app.route('/games/<game_id>/state')
+def game_state_json(game_id):
+    """Current state of a game for spectators, served from the per-version JSON cache (ETag = epoch and state version)"""
+    if game_id not in games:
+        return {'error': 'Game not found'}, 404
+    game_session = games[game_id]
+    etag = f'"{game_session.game_id}-{STATE_ETAG_EPOCH}-{game_session.state_version}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    return Response(game_session.get_game_state_json(), mimetype='application/json', headers={'ETag': etag})
+
+@app.route('/ai_stats')
+def ai_stats():
+    """AI executor queue depth, decision latency, the current AI budget scale, the AI pacing timers and AI turn step times"""
+    return dict(ai_executor.stats(), budget_scale=round(ai_budget_scale(), 3),
+                ai_turns_in_progress=sum(1 for session in games.values() if session.ai_move_in_progress),
+                pacing=ai_wheel.stats(), transitions=ai_transition_stats())
+
+@app.route('/game_stats')
+def game_stats():
+    """Command queue depth and busy time of every game's actor"""
+    return {game_id: dict(session.actor.stats(), started=session.started) for game_id, session in games.items()}
+
+@app.route('/memory_stats')
+def memory_stats():
+    """Resident games per phase, their estimated memory, process RSS and sweeper evictions"""
+    return dict(game_sweeper.stats(), open_lobbies=len(lobby_index))
+
+@app.route('/match_stats')
+def match_stats():
+    """Players queued per matchmaking bucket, tables formed, AI seats filled and queue-wait percentiles"""
+    return matchmaker.stats()
+
+@app.route('/store_stats')
+def store_stats():
+    """Event log size, pending writes and commit batching of the crash-recovery store"""
+    return game_store.stats() if game_store else {'enabled': False}
+
+@app.route('/wire_stats')
+def wire_stats_route():
+    """Payload size and encode time per event and wire encoding, and how many clients use each encoding"""
+    clients = {}
+    for encoding in client_encodings.values():
+        clients[encoding] = clients.get(encoding, 0) + 1
+    return {'events': wire_stats.summary(), 'clients': clients}
+
+@app.route('/static_stats')
+def static_stats():
+    """Hashed URL of each static file and its size per precompressed encoding"""
+    return static_assets.stats()
+
+@app.route('/metrics')
+def metrics_route():
+    """Prometheus metrics: command latency per event, emits per event, games by state, sockets, AI decision time and event loop lag"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/favicon.ico')
 def favicon():
@@ -2399,13 +3035,32 @@ def favicon():
 
 @app.route('/<path:path>')
 def serve_static(path):
-    """Serve static files"""
+    """Serve static files (STATIC_FILES from memory, anything else from disk)"""
+    response = static_response(path)
+    if response is not None:
+        return response
     try:
         return send_from_directory('.', path)
     except:
         return '', 404
 
-if __name__ == '__main__':
+def main():
+    """
+    Start the server. Everything with side effects (logging, the game store, restoring games,
+    the static files) happens here rather than at import, because AI worker processes
+    (spawned) and tools like benchmarks.py import this module too.
+    """
+    global game_store, static_assets
+    setup_logging()
+    if GAME_STORE:
+        game_store = GameStore(GAME_STORE, int(os.environ.get('GAME_SNAPSHOT_EVERY', 50)))
+    static_assets = StaticAssets(app.root_path, STATIC_FILES)
+    if broker_path:
+        # Listen to the other workers now, not on the first connection, so no lobby change is missed
+        socketio.server.manager_initialized = True
+        socketio.server.manager.initialize()
+    restore_games()
+    
     port = int(os.environ.get('PORT', 5000))
     print("=" * 60)
     print("Starting Twenty Dots Game Server...")
@@ -2413,4 +3068,11 @@ if __name__ == '__main__':
     print(f"Web client at: http://0.0.0.0:{port}/web_client.html")
     print("Deck shuffle: ENABLED")
     print("=" * 60)
+    socketio.start_background_task(game_sweeper.run)
+    socketio.start_background_task(run_matchmaker)
+    socketio.start_background_task(ai_wheel.run)
+    socketio.start_background_task(monitor_loop_lag, socketio.sleep, loop_lag_seconds)
     socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
+
+if __name__ == '__main__':
+    main()
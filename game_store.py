@@ -0,0 +1,325 @@
+"""
+Crash recovery for the Twenty Dots server
+What each command changes in a game is appended to an SQLite event log (WAL mode) by a background
+writer; on startup every game is rebuilt from its latest snapshot plus the events logged after it
+"""
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+
+from server_log import get_logger
+from twenty_dots import Card
+
+log = get_logger('lobby')
+
+# GameSession attributes that are rebuilt instead of saved: the actor, connection and broadcast
+# bookkeeping, caches and AI turn progress (including its pending timer)
+SESSION_TRANSIENT = {'actor', 'game', 'ai_move_in_progress', 'ai_cancelled', 'ai_timer', 'last_active', 'state_seq',
+                     'sent_state', 'sent_hands', 'state_version', '_state_cache'}
+# TwentyDots attributes its constructor rebuilds (lambdas and AI objects don't pickle)
+GAME_TRANSIENT = {'win_condition', 'ai_opponents'}
+# Card lists saved as (location, color, power) tuples, several times cheaper to pickle than Card objects.
+# Cards are only ever taken off their front (the deck is drawn from), so a list is queued again only when it is
+# dealt anew; in between, events carry just the count of cards drawn since, under the key + ('drawn',).
+# Cards are never changed in place, so identity is enough to tell.
+CARD_LISTS = {('game', 'deck')}
+# Values of these types are immutable: they are queued as they are, and only when the attribute holds another object
+SCALARS = frozenset({str, int, float, bool, type(None)})
+# How many levels of these attributes' dicts, lists and objects can change in place; what lies deeper never does
+# (cards, dots, discard pile entries, landmines, AI weights). record() copies them down to that depth as tuples
+# (freeze()), which is both the cheap way to tell whether a command changed them and what the writer thread
+# rebuilds (thaw()) and pickles. Any other attribute is pickled in record().
+FROZEN_DEPTH = {
+    ('session', 'players'): 2,
+    ('session', 'player_order'): 1,
+    ('session', 'ai_players'): 2,
+    ('session', 'discard_piles'): 2,
+    ('session', 'beliefs'): 2,
+    ('game', 'grid'): 2,
+    ('game', 'columns'): 1,
+    ('game', 'rows'): 1,
+    ('game', 'colors'): 1,
+    ('game', 'players'): 3,
+    ('game', 'landmines'): 1,
+}
+SEQUENCES = frozenset({list, tuple, set})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (game_id TEXT, seq INTEGER, data BLOB, PRIMARY KEY (game_id, seq));
+CREATE TABLE IF NOT EXISTS snapshots (game_id TEXT PRIMARY KEY, seq INTEGER, data BLOB);
+CREATE TABLE IF NOT EXISTS finished (game_id TEXT PRIMARY KEY, finished_at REAL, data BLOB);
+"""
+
+
+def freeze(value, depth):
+    """
+    value with its dicts, lists, tuples, sets and objects down to depth levels copied as (type, items) tuples
+    (items as (key, value) pairs for dicts and objects); below that, and for scalars, values are kept as they are.
+    Anything else within depth is kept too, as (None, value).
+    """
+    kind = type(value)
+    if kind in SCALARS:
+        return value
+    if kind is dict:
+        items = value.items()
+    elif kind in SEQUENCES:
+        items = value
+    elif hasattr(value, '__dict__'):
+        items = vars(value).items()
+    else:
+        return None, value
+    if depth == 1:
+        return kind, tuple(items)
+    if kind in SEQUENCES:
+        return kind, tuple([item if type(item) in SCALARS else freeze(item, depth - 1) for item in items])
+    return kind, tuple([(key, item if type(item) in SCALARS else freeze(item, depth - 1)) for key, item in items])
+
+
+def thaw(frozen, depth):
+    """Rebuild a value from freeze(value, depth)"""
+    if type(frozen) in SCALARS:
+        return frozen
+    kind, items = frozen
+    if kind is None:
+        return items
+    if depth > 1:
+        if kind in SEQUENCES:
+            items = [thaw(item, depth - 1) for item in items]
+        else:
+            items = [(key, thaw(item, depth - 1)) for key, item in items]
+    if kind in SEQUENCES or kind is dict:
+        return kind(items)
+    value = kind.__new__(kind)
+    value.__dict__.update(items)
+    return value
+
+
+def capture(session, last):
+    """
+    What changed in a GameSession (and its game) since the captures last remembers, as
+    {('session' or 'game', attribute): value} for encode(): scalars as they are, CARD_LISTS as the
+    tuple of their cards, FROZEN_DEPTH attributes freeze()d and any other attribute pickled.
+    Only this runs in the game's command task, so nothing changes under the writer thread.
+    
+    Args:
+        last: {key: value as captured} from earlier calls, updated in place ({} captures everything)
+    """
+    changed = {}
+    for owner, obj, transient in (('session', session, SESSION_TRANSIENT), ('game', session.game, GAME_TRANSIENT)):
+        for attr, value in vars(obj).items():
+            if attr in transient:
+                continue
+            key = owner, attr
+            cached = last.get(key, last)  # last itself stands for "never captured"
+            if type(value) in SCALARS:
+                if cached is not value:
+                    changed[key] = last[key] = value
+            elif key in FROZEN_DEPTH:
+                value = freeze(value, FROZEN_DEPTH[key])
+                if cached != value:
+                    changed[key] = last[key] = value
+            elif key in CARD_LISTS:
+                items = tuple(value)
+                drawn = len(cached) - len(items) if cached is not last else -1
+                if drawn < 0 or cached[drawn:] != items:  # Cards have no __eq__, so this compares identities
+                    changed[key] = last[key] = items
+                    drawn = 0
+                if last.get(key + ('drawn',)) != drawn:
+                    changed[key + ('drawn',)] = last[key + ('drawn',)] = drawn
+            else:
+                value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                if cached != value:
+                    changed[key] = last[key] = value
+    return changed
+
+
+def encode(changed):
+    """Pickle a capture() attribute by attribute, as restore() reads it"""
+    record = {}
+    for key, value in changed.items():
+        if key in CARD_LISTS:
+            value = [(c.location, c.color, c.power) for c in value]
+        elif key in FROZEN_DEPTH:
+            value = thaw(value, FROZEN_DEPTH[key])
+        elif type(value) is bytes:
+            record[key] = value  # Pickled by capture()
+            continue
+        record[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return record
+
+
+def restore(session, record):
+    """Set a freshly built GameSession's attributes (and its game's) from an encode()d record"""
+    for key, data in record.items():
+        if len(key) != 2:
+            continue  # A CARD_LISTS drawn count, applied with its list
+        owner, attr = key
+        value = pickle.loads(data)
+        if key in CARD_LISTS:
+            drawn = key + ('drawn',)
+            value = [Card(*fields) for fields in value[pickle.loads(record[drawn]) if drawn in record else 0:]]
+        setattr(session if owner == 'session' else session.game, attr, value)
+    return session
+
+
+class GameStore:
+    """
+    Append-only event log with periodic snapshots, one SQLite file for all games.
+
+    record() runs in the game's command task: it queues the attributes that changed since the
+    game's last record() as an event, copied cheaply enough to tell (see capture()). A writer
+    thread pickles the queued events (encode()), keeps every game's full record up to date with
+    them and commits them in one transaction (group commit), so moves never wait on pickling
+    or on the disk. Every `snapshot_every` events a game's full record is written as its
+    snapshot and the events it covers are deleted. Finished games are spill()ed to a table of their own,
+    which load() doesn't read.
+    """
+
+    def __init__(self, path, snapshot_every=50):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.queue = queue.Queue()
+        self.last = {}  # game_id -> capture()'s view of the game as last record()ed
+        self.seqs = {}  # game_id -> seq of the last event
+        self.since_snapshot = {}  # game_id -> events since the last snapshot
+        self.records = {}  # game_id -> full encode()d record, kept by the writer thread
+        self.events = 0
+        self.snapshots = 0
+        self.spilled = 0
+        self.bytes = 0
+        self.commits = 0
+        self.max_batch = 0
+        self.commit_seconds = 0.0
+        self.writer = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        return conn
+
+    def load(self):
+        """
+        Rebuild every logged game's latest record (snapshot, then the events after it, in order).
+        Call once at startup, before record(). Returns {game_id: record} for restore().
+        """
+        conn = self._connect()
+        records = {}
+        for game_id, seq, data in conn.execute('SELECT game_id, seq, data FROM snapshots'):
+            records[game_id] = pickle.loads(data)
+            self.seqs[game_id] = seq
+        for game_id, seq, data in conn.execute('SELECT game_id, seq, data FROM events ORDER BY game_id, seq'):
+            if seq > self.seqs.get(game_id, 0):
+                records.setdefault(game_id, {}).update(pickle.loads(data))
+                self.seqs[game_id] = seq
+                self.since_snapshot[game_id] = self.since_snapshot.get(game_id, 0) + 1
+        conn.close()
+        self.records.update((game_id, dict(record)) for game_id, record in records.items())
+        return records
+
+    def record(self, session):
+        """Queue what changed in this game since its last record() (nothing if nothing changed)"""
+        game_id = session.game_id
+        changed = capture(session, self.last.setdefault(game_id, {}))
+        if not changed:
+            return
+        seq = self.seqs[game_id] = self.seqs.get(game_id, 0) + 1
+        count = self.since_snapshot[game_id] = self.since_snapshot.get(game_id, 0) + 1
+        if count >= self.snapshot_every:
+            self.since_snapshot[game_id] = 0
+            self._put(('snapshot', game_id, seq, changed))
+        else:
+            self._put(('event', game_id, seq, changed))
+
+    def _forget(self, game_id):
+        self.last.pop(game_id, None)
+        self.seqs.pop(game_id, None)
+        self.since_snapshot.pop(game_id, None)
+
+    def drop(self, game_id):
+        """Forget a game (its snapshot and events are deleted)"""
+        self._forget(game_id)
+        self._put(('drop', game_id, None, None))
+
+    def spill(self, session):
+        """Move a finished game's final record to the finished table and forget it here"""
+        self._forget(session.game_id)
+        self._put(('spill', session.game_id, None, capture(session, {})))
+
+    def _put(self, item):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write, name='game-store', daemon=True)
+            self.writer.start()
+        self.queue.put(item)
+
+    def _write(self):
+        conn = self._connect()
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            batch = [(kind, game_id, seq, self._encode(kind, game_id, changed)) for kind, game_id, seq, changed in batch]
+            try:
+                with conn:
+                    for kind, game_id, seq, data in batch:
+                        if kind == 'event':
+                            conn.execute('INSERT OR REPLACE INTO events VALUES (?, ?, ?)', (game_id, seq, data))
+                        elif kind == 'snapshot':
+                            conn.execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)', (game_id, seq, data))
+                            conn.execute('DELETE FROM events WHERE game_id = ? AND seq <= ?', (game_id, seq))
+                        else:
+                            if kind == 'spill':
+                                conn.execute('INSERT OR REPLACE INTO finished VALUES (?, ?, ?)',
+                                             (game_id, time.time(), data))
+                            conn.execute('DELETE FROM snapshots WHERE game_id = ?', (game_id,))
+                            conn.execute('DELETE FROM events WHERE game_id = ?', (game_id,))
+            except sqlite3.Error as e:
+                log.error("[STORE] Commit of %s records failed: %s", len(batch), e)
+            else:
+                self.events += sum(1 for item in batch if item[0] == 'event')
+                self.snapshots += sum(1 for item in batch if item[0] == 'snapshot')
+                self.spilled += sum(1 for item in batch if item[0] == 'spill')
+                self.bytes += sum(len(item[3]) for item in batch if item[3])
+            self.commit_seconds += time.perf_counter() - start
+            self.commits += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            for _ in batch:
+                self.queue.task_done()
+
+    def _encode(self, kind, game_id, changed):
+        """The blob to write for a queued item, folding its changes into the game's full record"""
+        if kind in ('drop', 'spill'):
+            self.records.pop(game_id, None)
+            if kind == 'drop':
+                return None
+            return pickle.dumps(encode(changed), pickle.HIGHEST_PROTOCOL)
+        record = encode(changed)
+        full = self.records.setdefault(game_id, {})
+        full.update(record)
+        return pickle.dumps(full if kind == 'snapshot' else record, pickle.HIGHEST_PROTOCOL)
+
+    def flush(self):
+        """Wait until everything queued so far is committed"""
+        if self.writer is not None:
+            self.queue.join()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'games': len(self.seqs),
+            'pending': self.queue.qsize(),
+            'events': self.events,
+            'snapshots': self.snapshots,
+            'spilled': self.spilled,
+            'bytes': self.bytes,
+            'commits': self.commits,
+            'max_batch': self.max_batch,
+            'mean_commit_ms': round(self.commit_seconds / self.commits * 1000, 2) if self.commits else 0.0,
+        }
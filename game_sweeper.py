@@ -0,0 +1,134 @@
+"""
+Idle-game sweeper for the Twenty Dots server
+Frees games nobody is playing any more once they have been idle past their phase's TTL
+"""
+import gc
+import os
+import random
+import sys
+import time
+
+from server_log import get_logger
+
+log = get_logger('lobby')
+
+PHASES = ['lobby', 'abandoned', 'finished']
+
+
+def approx_size(obj, seen=None):
+    """Rough deep size of obj in bytes: containers and object attributes, not functions, classes or modules"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or callable(obj) or isinstance(obj, type(sys)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += approx_size(vars(obj), seen)
+    return size
+
+
+def process_rss():
+    """Resident set size of this process in bytes (None where /proc isn't available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class GameSweeper:
+    """
+    Every `interval` seconds, evict the games that sat idle longer than their phase's TTL.
+
+    A game's phase is 'finished' (someone won), 'lobby' (not started, no human connected)
+    or 'abandoned' (started, no human connected); games with a connected human that
+    nobody has won are never evicted. Idle time counts from the game's last command
+    (session.last_active), and a game is only evicted between commands.
+    """
+
+    def __init__(self, games, evict, ttls, interval=60, sleep=time.sleep, sample_size=20):
+        """
+        Args:
+            games: The server's game_id -> GameSession dict
+            evict: evict(session, phase) frees one game (the sweeper removes nothing itself)
+            ttls: Seconds of idleness allowed per phase, e.g. {'lobby': 600, 'abandoned': 1800, 'finished': 300}
+            interval: Seconds between sweeps
+            sleep: Sleep function for the server's async mode, e.g. socketio.sleep
+            sample_size: Games measured to estimate the memory of all resident games
+        """
+        self.games = games
+        self.evict = evict
+        self.ttls = ttls
+        self.interval = interval
+        self.sleep = sleep
+        self.sample_size = sample_size
+        self.evicted = dict.fromkeys(PHASES, 0)
+        self.sweeps = 0
+        self.last_sweep_ms = 0.0
+
+    @staticmethod
+    def phase(session):
+        """'finished', 'lobby', 'abandoned', or None for a game that is being played"""
+        if session.started and session.check_winner():
+            return 'finished'
+        if session.has_connected_humans():
+            return None
+        return 'abandoned' if session.started else 'lobby'
+
+    def sweep(self, now=None):
+        """Evict every idle game past its TTL. Returns how many were evicted."""
+        start = time.perf_counter()
+        now = time.time() if now is None else now
+        evicted = 0
+        for session in list(self.games.values()):
+            phase = self.phase(session)
+            if phase is None or now - session.last_active < self.ttls[phase]:
+                continue
+            if session.actor.current is not None or session.actor.queued:
+                continue  # Mid-command; the next sweep looks again
+            self.evict(session, phase)
+            self.evicted[phase] += 1
+            evicted += 1
+            log.info("[SWEEP] Evicted %s game %s (idle %.0fs)", phase, session.game_id, now - session.last_active)
+        if evicted:
+            gc.collect()  # Sessions and their actors reference each other
+        self.sweeps += 1
+        self.last_sweep_ms = (time.perf_counter() - start) * 1000
+        return evicted
+
+    def run(self):
+        """Background task: sweep forever"""
+        while True:
+            self.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                log.exception("[SWEEP] Sweep failed: %s", e)
+
+    def resident(self):
+        """Resident games per phase ('playing' for games being played)"""
+        resident = dict.fromkeys(PHASES + ['playing'], 0)
+        for session in list(self.games.values()):
+            resident[self.phase(session) or 'playing'] += 1
+        return resident
+
+    def stats(self):
+        """Resident games per phase, estimated game memory, process RSS and evictions so far"""
+        sessions = list(self.games.values())
+        resident = self.resident()
+        sample = random.sample(sessions, min(self.sample_size, len(sessions)))
+        mean_size = sum(approx_size(session, {id(session.actor)}) for session in sample) / len(sample) if sample else 0
+        return {
+            'games': len(sessions),
+            'resident': resident,
+            'approx_game_bytes': int(mean_size * len(sessions)),
+            'rss_bytes': process_rss(),
+            'evicted': self.evicted,
+            'ttls': self.ttls,
+            'sweeps': self.sweeps,
+            'last_sweep_ms': round(self.last_sweep_ms, 2),
+        }
@@ -3068,7 +3068,7 @@ class TwentyDotsGUI(QMainWindow):
                         self.ai_timer.start(2000)
                     return
             
-            card_indices = ai.choose_cards(hand)
+            card_indices = ai.choose_cards(hand, self.game, player)
             
             if not card_indices or len(card_indices) == 0:
                 print(f"AI {player} returned no card indices")
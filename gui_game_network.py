@@ -8,6 +8,7 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
 from PyQt6.QtCore import Qt, pyqtSlot
 from PyQt6.QtGui import QColor, QFont, QPainter, QPen, QBrush
 from twenty_dots import Card
+from state_delta import apply_delta, apply_hand_diff
 
 class DotWidget(QFrame):
     """Widget to display a single dot on the grid"""
@@ -134,8 +135,10 @@ class TwentyDotsNetworkGUI(QMainWindow):
         super().__init__()
         self.network_client = network_client
         self.game_state = initial_game_state
+        self.state_seq = initial_game_state.get('seq')  # game_updated deltas build on this
         self.player_name = network_client.player_name
         self.my_hand = []
+        self.hand_seq = None  # your_hand diffs build on this
         self.selected_cards = []
         self.card_widgets = []
         
@@ -340,15 +343,33 @@ class TwentyDotsNetworkGUI(QMainWindow):
         self.network_client.end_turn()
     
     @pyqtSlot(dict)
-    def on_game_updated(self, game_state):
-        """Handle game state update from server"""
-        self.game_state = game_state
+    def on_game_updated(self, update):
+        """Handle game state update from server (a full state or a delta against state_seq)"""
+        if 'delta' in update:
+            if update['base'] != self.state_seq:
+                # Missed an update - ask for a full snapshot and wait for it
+                print(f"State gap: have seq {self.state_seq}, delta builds on {update['base']}")
+                self.network_client.request_state(self.state_seq)
+                return
+            apply_delta(self.game_state, update['delta'])
+        else:
+            self.game_state = update
+        self.state_seq = update.get('seq')
         self.update_display()
     
     @pyqtSlot(dict)
-    def on_hand_received(self, data):
-        """Handle hand update from server"""
-        self.my_hand = data.get('hand', [])
+    def on_hand_received(self, update):
+        """Handle hand update from server (the whole hand or a diff against hand_seq)"""
+        if 'hand' in update:
+            self.my_hand = update['hand']
+        elif update['base'] != self.hand_seq:
+            # Missed a diff - ask for the whole hand and wait for it
+            print(f"Hand gap: have seq {self.hand_seq}, diff builds on {update['base']}")
+            self.network_client.request_hand(self.hand_seq)
+            return
+        else:
+            self.my_hand = apply_hand_diff(self.my_hand, update)
+        self.hand_seq = update.get('seq')
         self.update_hand_display()
     
     def show_error(self, message):
@@ -0,0 +1,206 @@
+"""
+Opponent-hand beliefs for the Twenty Dots AI
+Tracks which of the 159 cards each opponent can be holding from public plays and card swaps
+"""
+import random
+from typing import Dict, List
+
+from twenty_dots import Card
+
+COLORS = ['red', 'blue', 'purple', 'green']
+ROWS = 'ABCDEF'
+COLUMNS = '123456'
+
+# Card table: 144 regular cards (colour x cell), then 3 power cards per colour, then 3 landmines
+REGULAR_CARDS = 144
+POWER_SLOTS = {color: [REGULAR_CARDS + 3 * i + k for k in range(3)] for i, color in enumerate(COLORS)}
+POWER_SLOTS['landmine'] = [156, 157, 158]
+TABLE_SIZE = 159
+REGULAR_MASK = (1 << REGULAR_CARDS) - 1
+FULL_MASK = (1 << TABLE_SIZE) - 1
+
+
+def _power_kind(card) -> str:
+    """Slot group of a power card. Colour-power types are dealt at random, so only the colour identifies them."""
+    return 'landmine' if card.power == 'landmine' else card.color
+
+
+def card_index(card) -> int:
+    """Table index of a regular card (power cards share slots, see HandBeliefs._slot)."""
+    return COLORS.index(card.color) * 36 + ROWS.index(card.location[0]) * 6 + COLUMNS.index(card.location[1])
+
+
+def index_card(index: int) -> Card:
+    """Card for a table index. Colour power cards of unknown type come back with power 'unknown'."""
+    if index < REGULAR_CARDS:
+        color, cell = divmod(index, 36)
+        return Card(f"{ROWS[cell // 6]}{COLUMNS[cell % 6]}", COLORS[color])
+    if index in POWER_SLOTS['landmine']:
+        return Card('PWR', 'red', power='landmine')
+    return Card('PWR', COLORS[(index - REGULAR_CARDS) // 3], power='unknown')
+
+
+def _bits(mask: int) -> List[int]:
+    return [i for i in range(TABLE_SIZE) if mask >> i & 1]
+
+
+class HandBeliefs:
+    """
+    Public card knowledge for one game, as bitsets over the card table.
+
+    Every play goes to a discard pile and every card swap is announced to the
+    room, so the server can track for everyone:
+      - played: cards out of the game
+      - known[player]: cards known to be in player's hand (received in a card swap,
+        or refunded after a cancelled play)
+      - hidden[player]: cards only player knows are gone (landmine sacrifices)
+
+    Draws need no bookkeeping: a drawn card stays in the unseen pool, and the
+    deck size and hand sizes are read when a view is built.
+    """
+
+    def __init__(self, power_cards: bool = True):
+        self.table = FULL_MASK if power_cards else REGULAR_MASK
+        self.played = 0
+        self.known = {}
+        self.hidden = {}
+
+    def _accounted(self) -> int:
+        mask = self.played
+        for bits in self.known.values():
+            mask |= bits
+        for bits in self.hidden.values():
+            mask |= bits
+        return mask
+
+    def _slot(self, player: str, card, taken: int = None) -> int:
+        """Table index for a card leaving player's hand."""
+        if not getattr(card, 'power', None):
+            return card_index(card)
+        slots = POWER_SLOTS[_power_kind(card)]
+        # Power cards of one kind are interchangeable: reuse a slot already known to be in this hand
+        known = self.known.get(player, 0)
+        for slot in slots:
+            if known >> slot & 1:
+                return slot
+        taken = self._accounted() if taken is None else taken
+        for slot in slots:
+            if not taken >> slot & 1:
+                return slot
+        return slots[-1]
+
+    def _move(self, player: str, index: int):
+        """Clear index from player's known hand (it is no longer there)."""
+        self.known[player] = self.known.get(player, 0) & ~(1 << index)
+
+    def record_play(self, player: str, card):
+        """A card went from player's hand to the discard pile."""
+        index = self._slot(player, card)
+        self._move(player, index)
+        self.played |= 1 << index
+
+    def record_unplay(self, player: str, card):
+        """A played card was refunded to player's hand (blocked cell or cancelled power card)."""
+        if getattr(card, 'power', None):
+            slots = [s for s in POWER_SLOTS[_power_kind(card)] if self.played >> s & 1]
+            if not slots:
+                return
+            index = slots[-1]
+        else:
+            index = card_index(card)
+        self.played &= ~(1 << index)
+        self.known[player] = self.known.get(player, 0) | 1 << index
+
+    def record_hidden(self, player: str, card):
+        """player sacrificed a card for a landmine - only they know which."""
+        index = self._slot(player, card)
+        self._move(player, index)
+        self.hidden[player] = self.hidden.get(player, 0) | 1 << index
+
+    def record_swap(self, player: str, opponent: str, given, taken):
+        """A card swap: player gave `given` to opponent and took `taken` from them."""
+        moves = [(player, opponent, c) for c in given] + [(opponent, player, c) for c in taken]
+        for source, target, card in moves:
+            index = self._slot(source, card)
+            self._move(source, index)
+            self.known[target] = self.known.get(target, 0) | 1 << index
+
+    def record_power_action(self, player: str, action: dict, result: dict):
+        """Record an AI power card applied with ai_player.apply_power_action."""
+        self.record_play(player, result['card'])
+        if result.get('sacrifice'):
+            self.record_hidden(player, result['sacrifice'])
+        if result.get('taken') is not None:
+            self.record_swap(player, action['opponent'], result['given'], result['taken'])
+
+    def view(self, observer: str, game) -> 'OpponentBeliefs':
+        """
+        What observer can infer about every other hand right now.
+
+        The observer's own hand and landmine sacrifices are taken out of the
+        unseen pool; every other unseen card is equally likely to be in any
+        unknown hand slot or in the deck.
+        """
+        own = 0
+        for card in game.players[observer]['hand']:
+            own |= 1 << self._slot(observer, card, self._accounted() | own)
+        out = self.played | self.hidden.get(observer, 0) | own
+
+        known, slots = {}, {}
+        pool = self.table & ~out
+        for name, data in game.players.items():
+            if name == observer:
+                continue
+            known[name] = self.known.get(name, 0) & ~out
+            pool &= ~known[name]
+        for name in known:
+            hand_size = len(game.players[name]['hand'])
+            slots[name] = max(hand_size - bin(known[name]).count('1'), 0)
+        return OpponentBeliefs(known, slots, pool)
+
+
+class OpponentBeliefs:
+    """
+    One seat's picklable belief over its opponents' hands.
+
+    known[name] is the bitset of cards certainly in name's hand, slots[name]
+    the number of face-down cards left, drawn from pool (the unseen cards).
+    """
+
+    def __init__(self, known: Dict[str, int], slots: Dict[str, int], pool: int):
+        self.known = known
+        self.slots = slots
+        self.pool = pool
+        self.pool_size = bin(pool).count('1')
+
+    def probability(self, opponent: str, index: int) -> float:
+        """Chance that opponent holds the card at index."""
+        if self.known[opponent] >> index & 1:
+            return 1.0
+        if not self.pool >> index & 1 or not self.pool_size:
+            return 0.0
+        return min(self.slots[opponent] / self.pool_size, 1.0)
+
+    def probabilities(self, opponent: str) -> List[float]:
+        """Probability vector over the whole card table for opponent."""
+        return [self.probability(opponent, i) for i in range(TABLE_SIZE)]
+
+    def known_cards(self, opponent: str) -> List[Card]:
+        return [index_card(i) for i in _bits(self.known[opponent])]
+
+    def pool_cards(self) -> List[Card]:
+        return [index_card(i) for i in _bits(self.pool)]
+
+    def sample_hands(self, rng=random) -> Dict[str, List[Card]]:
+        """
+        One determinization: every opponent's known cards plus their face-down
+        slots dealt from the unseen pool without replacement.
+        """
+        pool = _bits(self.pool)
+        dealt = rng.sample(pool, min(sum(self.slots.values()), len(pool)))
+        hands = {}
+        for name in self.known:
+            count = min(self.slots[name], len(dealt))
+            hands[name] = self.known_cards(name) + [index_card(i) for i in dealt[:count]]
+            dealt = dealt[count:]
+        return hands
@@ -151,7 +151,7 @@ class GameLauncher(QMainWindow):
         self.network_client.game_created.connect(self.show_lobby)
         
         try:
-            if not self.network_client.connect_to_server():
+            if not self.network_client.connect_to_server(game_id):
                 QMessageBox.critical(self, "Error", "Failed to connect to server. Please wait a few seconds and try again.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Connection error: {str(e)}\n\nThe server is starting. Please wait a few seconds and try clicking 'Host Network Game' again.")
@@ -172,7 +172,7 @@ class GameLauncher(QMainWindow):
         self.network_client.error_occurred.connect(self.show_error)
         self.network_client.game_joined.connect(self.show_lobby)
         
-        if not self.network_client.connect_to_server():
+        if not self.network_client.connect_to_server(game_id):
             QMessageBox.critical(self, "Error", f"Failed to connect to {server_url}")
     
     def _request_game_list(self, game_id, player_name):
@@ -0,0 +1,385 @@
+"""
+Load test for the Twenty Dots server
+Scripted bot clients (python-socketio clients, one green thread each under eventlet) join games on a running
+game_server.py and play them to the end with the real events, then report action latency, throughput and errors.
+
+The bots need the Socket.IO client extras: pip install "python-socketio[client]"
+"""
+import eventlet
+eventlet.monkey_patch()  # Bot client threads become green threads, so thousands fit in one process
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+import socketio
+
+from matchmaking import percentile
+from state_delta import apply_delta, apply_hand_diff
+from wire_format import ENCODINGS, decode
+
+# Power cards whose play is finished by a follow-up event, and the server prompt that asks for it
+POWER_PROMPTS = {'wild_place', 'swap', 'block', 'card_swap', 'landmine'}
+# Events that answer an action (the first one to arrive after an action times it)
+REPLIES = ['game_updated', 'select_wild_position', 'select_swap_dots', 'select_block_position', 'select_card_swap',
+           'select_card_swap_opponent', 'select_opponent_cards_for_swap', 'select_landmine_sacrifice', 'game_over']
+
+
+class Stats:
+    """Results shared by every bot (green threads, so plain counters are safe)"""
+
+    def __init__(self):
+        self.latencies = {}  # action -> [seconds from emit to reply]
+        self.errors = {}  # server error message -> count
+        self.games_started = 0
+        self.games_finished = 0
+        self.game_seconds = []
+        self.stalled = 0
+        self.connect_failures = 0
+        self.unanswered = 0
+
+    def record(self, action, seconds):
+        self.latencies.setdefault(action, []).append(seconds)
+
+    def error(self, message):
+        self.errors[message] = self.errors.get(message, 0) + 1
+
+    def summary(self, elapsed):
+        def spread(values):
+            ordered = sorted(values)
+            return {
+                'count': len(ordered),
+                **{f'p{pct}_ms': round(percentile(ordered, pct) * 1000, 1) if ordered else None for pct in (50, 95, 99)},
+            }
+        actions = sum(len(values) for values in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            'elapsed_seconds': round(elapsed, 1),
+            'games': {'started': self.games_started, 'finished': self.games_finished, 'stalled': self.stalled,
+                      'mean_seconds': round(sum(self.game_seconds) / len(self.game_seconds), 1) if self.game_seconds else None},
+            'actions': actions,
+            'actions_per_second': round(actions / elapsed, 1) if elapsed else 0.0,
+            'latency': {'all': spread([v for values in self.latencies.values() for v in values]),
+                        **{action: spread(values) for action, values in sorted(self.latencies.items())}},
+            'errors': errors,
+            'error_rate': round(errors / (actions + errors), 4) if actions + errors else 0.0,
+            'error_messages': self.errors,
+            'unanswered_actions': self.unanswered,
+            'connect_failures': self.connect_failures,
+        }
+
+
+class Bot:
+    """
+    One simulated player. Plays a legal, simple game: roll when the wild dice is up, play one card
+    and end the turn, or play a power card (answering its prompt) and let the server end the turn.
+
+    Every event handler takes self.lock: the client runs handlers on their own green threads.
+    """
+
+    def __init__(self, args, stats, name, game_id, rng):
+        self.args = args
+        self.stats = stats
+        self.name = name
+        self.game_id = game_id
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.client = socketio.Client(reconnection=False)
+        self.state = None
+        self.state_seq = None
+        self.hand = []
+        self.hand_seq = None
+        self.my_turn = False
+        self.played = 0  # Cards played this turn (2 after a power card: the server ends the turn)
+        self.in_power = False  # Waiting for a power card's prompt
+        self.pending = None  # (action, emit time) awaiting a reply
+        self.last_event = time.time()
+        self.started_at = None
+        for event in REPLIES:
+            self.client.on(event, self._handler(event))
+        self.client.on('game_started', self._handler('game_started'))
+        self.client.on('your_hand', self._handler('your_hand'))
+        self.client.on('error', self._handler('error'))
+
+    def _handler(self, event):
+        method = getattr(self, f'on_{event}', None)
+
+        def handle(data=None):
+            with self.lock:
+                if not self.client.connected:
+                    return  # Arrived while the bot was leaving
+                self.last_event = time.time()
+                if self.pending and (event in REPLIES or event == 'error'):
+                    action, sent = self.pending
+                    self.pending = None
+                    if event != 'error':
+                        self.stats.record(action, time.time() - sent)
+                if method is not None:
+                    method(data)
+        return handle
+
+    def emit(self, action, data):
+        data = dict(data, game_id=self.game_id)
+        self.pending = (action, time.time())
+        self.client.emit(action, data)
+
+    # --- connection and game setup ---
+
+    def connect(self):
+        url = f'{self.args.url}?game_id={quote(self.game_id)}'
+        try:
+            self.client.connect(url, transports=[self.args.transport], wait_timeout=30)
+        except socketio.exceptions.ConnectionError:
+            self.stats.connect_failures += 1
+            return False
+        if self.args.msgpack and 'msgpack' in ENCODINGS:
+            self.client.emit('set_encoding', {'encodings': ['msgpack', 'json']})
+        return True
+
+    def start_single_player(self):
+        self.client.emit('start_single_player', {
+            'game_id': self.game_id, 'player_name': self.name, 'num_players': self.args.players,
+            'difficulty': self.args.difficulty, 'power_cards': self.args.power_cards, 'ai_pace': self.args.ai_pace,
+        })
+
+    def join(self):
+        self.client.emit('join_game', {
+            'game_id': self.game_id, 'player_name': self.name, 'player_count': self.args.players,
+            'power_cards': self.args.power_cards,
+        })
+
+    def wait(self):
+        """Block until the game is over or nothing has arrived for --stall-seconds"""
+        while not self.done.wait(1.0):
+            if time.time() - self.last_event > self.args.stall_seconds:
+                self.stats.stalled += 1
+                break
+        if self.pending:
+            self.stats.unanswered += 1
+        self.client.disconnect()
+
+    # --- server events ---
+
+    def on_game_started(self, data):
+        self.state = decode(data)
+        self.state_seq = self.state.get('seq')
+        self.started_at = time.time()
+        self.stats.games_started += 1
+        self.act()
+
+    def on_game_updated(self, data):
+        update = decode(data)
+        if 'delta' in update:
+            if self.state is None or update['base'] != self.state_seq:
+                self.client.emit('request_state', {'game_id': self.game_id, 'seq': self.state_seq})
+                return
+            apply_delta(self.state, update['delta'])
+        else:
+            self.state = update
+        self.state_seq = update.get('seq')
+        self.act()
+
+    def on_your_hand(self, data):
+        update = decode(data)
+        if 'hand' in update:
+            self.hand = update['hand']
+        elif update['base'] != self.hand_seq:
+            self.client.emit('request_hand', {'game_id': self.game_id, 'seq': self.hand_seq})
+            return
+        else:
+            self.hand = apply_hand_diff(self.hand, update)
+        self.hand_seq = update.get('seq')
+        self.act()
+
+    def on_game_over(self, data):
+        self.stats.games_finished += 1
+        if self.started_at:
+            self.stats.game_seconds.append(time.time() - self.started_at)
+        self.done.set()
+
+    def on_error(self, data):
+        self.stats.error((data or {}).get('message', '?'))
+        self.in_power = False
+        self.played = min(self.played, 1)  # A refused power card leaves the turn to end by hand
+        self.act()
+
+    # --- turn logic ---
+
+    def act(self):
+        """Take the next action if it is this bot's turn and nothing is in flight"""
+        if self.state is None or self.done.is_set():
+            return
+        my_turn = self.state.get('current_turn') == self.name
+        if my_turn and not self.my_turn:
+            self.played = 0
+            self.in_power = False
+        self.my_turn = my_turn
+        if not my_turn or self.pending or self.in_power:
+            return
+        if self.state.get('can_roll_dice'):
+            self.emit('roll_dice', {})
+            return
+        if self.played == 0:
+            card = self.pick_card()
+            if card is not None:
+                self.played = 2 if card.get('power') else 1
+                self.in_power = card.get('power') in POWER_PROMPTS
+                self.emit('play_cards', {'cards': [card]})
+                return
+        if self.played < 2:
+            self.emit('end_turn', {})
+
+    def pick_card(self):
+        power = [card for card in self.hand if card.get('power')]
+        if power and self.rng.random() < self.args.power_rate:
+            return self.rng.choice(power)
+        blocked = {(block['row'], block['col']) for block in self.state.get('blocks', [])}
+        regular = [card for card in self.hand if not card.get('power') and self.cell(card) not in blocked]
+        return self.rng.choice(regular) if regular else None
+
+    def cell(self, card):
+        row, col = card['location']
+        return 'ABCDEF'.index(row), '123456'.index(col)
+
+    def cells(self, filled):
+        blocked = {(block['row'], block['col']) for block in self.state.get('blocks', [])}
+        return [{'row': r, 'col': c} for r, row in enumerate(self.state['board']) for c, cell in enumerate(row)
+                if (cell is not None) == filled and (r, c) not in blocked]
+
+    def finish_power(self, action, data):
+        self.in_power = False
+        self.emit(action, data)
+
+    def cancel_power(self):
+        self.in_power = False
+        self.played = 1  # The card comes back; end the turn instead
+        self.emit('cancel_power_card', {})
+
+    def on_select_wild_position(self, data):
+        empty = self.cells(filled=False)
+        if empty:
+            self.finish_power('place_wild', {'position': self.rng.choice(empty)})
+        else:
+            self.cancel_power()
+
+    def on_select_block_position(self, data):
+        empty = self.cells(filled=False)
+        if empty:
+            self.finish_power('place_block', {'position': self.rng.choice(empty)})
+        else:
+            self.cancel_power()
+
+    def on_select_swap_dots(self, data):
+        dots = self.cells(filled=True)
+        if len(dots) >= 2:
+            pos1, pos2 = self.rng.sample(dots, 2)
+            self.finish_power('swap_dots', {'pos1': pos1, 'pos2': pos2})
+        else:
+            self.cancel_power()
+
+    def on_select_landmine_sacrifice(self, data):
+        empty = {(cell['row'], cell['col']) for cell in self.cells(filled=False)}
+        cards = [card for card in self.hand if not card.get('power') and self.cell(card) in empty]
+        if cards:
+            card = self.rng.choice(cards)
+            self.finish_power('place_landmine', {'sacrifice_card': {'color': card['color'], 'location': card['location']}})
+        else:
+            self.cancel_power()
+
+    def on_select_card_swap(self, data):
+        cards = [card for card in self.hand if not card.get('power')]
+        if len(cards) >= 2:
+            chosen = self.rng.sample(cards, 2)
+            self.emit('card_swap_action', {'step': 'select_own_cards',
+                                           'cards': [{'color': c['color'], 'location': c['location']} for c in chosen]})
+        else:
+            self.cancel_power()
+
+    def on_select_card_swap_opponent(self, data):
+        opponents = [o['name'] for o in data.get('opponents', []) if o['hand_size'] >= 2]
+        if opponents:
+            self.emit('card_swap_action', {'step': 'select_opponent', 'opponent': self.rng.choice(opponents)})
+        else:
+            self.cancel_power()
+
+    def on_select_opponent_cards_for_swap(self, data):
+        indices = self.rng.sample(range(data['hand_size']), 2)
+        self.finish_power('card_swap_action', {'step': 'select_opponent_cards', 'card_indices': indices})
+
+
+def run_table(args, stats, table, seed):
+    """Play --games games at one table: a single-player game per bot, or --players bots joining one game"""
+    rng = random.Random(seed)
+    for game in range(args.games):
+        if args.mode == 'single':
+            # start_single_player only keeps a client game_id of its own sp_<8 hex> form
+            game_id = f'sp_{uuid.uuid4().hex[:8]}'
+            bots = [Bot(args, stats, f'bot{table}', game_id, rng)]
+        else:
+            game_id = f'lt_{args.run_id}_{table}_{game}'
+            bots = [Bot(args, stats, f'bot{table}_{seat}', game_id, rng) for seat in range(args.players)]
+        if not all(bot.connect() for bot in bots):
+            for bot in bots:
+                if bot.client.connected:
+                    bot.client.disconnect()
+            return
+        if args.mode == 'single':
+            bots[0].start_single_player()
+        else:
+            for bot in bots:
+                bot.join()
+                eventlet.sleep(0.05)  # Seats in order; the last join starts the game
+        waiters = [eventlet.spawn(bot.wait) for bot in bots]
+        for waiter in waiters:
+            waiter.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running Twenty Dots server with scripted bot clients")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="server (or cluster router) URL")
+    parser.add_argument('--tables', type=int, default=100, help="concurrent tables (default 100)")
+    parser.add_argument('--mode', choices=['single', 'join'], default='single',
+                        help="single: one bot per start_single_player game against server AIs; "
+                             "join: --players bots join_game the same game (default single)")
+    parser.add_argument('--players', type=int, default=2, help="players per game, 2-4 (default 2)")
+    parser.add_argument('--games', type=int, default=1, help="games each table plays one after another (default 1)")
+    parser.add_argument('--power-cards', action='store_true', help="play with power cards")
+    parser.add_argument('--power-rate', type=float, default=0.5,
+                        help="chance a bot plays a power card when it has one (default 0.5)")
+    parser.add_argument('--difficulty', default='easy', help="server AI difficulty in single mode (default easy)")
+    parser.add_argument('--ai-pace', type=float, default=0.0,
+                        help="server AI pause multiplier in single mode (default 0, no pauses)")
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--msgpack', action='store_true', help="negotiate MessagePack state events")
+    parser.add_argument('--ramp-seconds', type=float, default=10.0,
+                        help="spread table starts over this many seconds (default 10)")
+    parser.add_argument('--stall-seconds', type=float, default=60.0,
+                        help="give up on a game after this long without an event (default 60)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    args.run_id = uuid.uuid4().hex[:6]
+
+    stats = Stats()
+    print(f"Load test {args.run_id}: {args.tables} {args.mode} tables x {args.games} games against {args.url}")
+    start = time.time()
+    pool = eventlet.GreenPool(args.tables)
+    for table in range(args.tables):
+        pool.spawn_n(run_table, args, stats, table, args.seed * 100003 + table)
+        eventlet.sleep(args.ramp_seconds / args.tables)
+    pool.waitall()
+    results = stats.summary(time.time() - start)
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
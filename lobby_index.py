@@ -0,0 +1,113 @@
+"""
+Open-lobby index for the Twenty Dots server
+Games that haven't started, kept per (game mode, power cards) in listing order, so list_games
+pages through the matching lobbies instead of scanning every resident game
+"""
+import bisect
+import heapq
+import itertools
+
+
+def lobby_entry(session):
+    """What list_games shows for one game, or None once it has started"""
+    if session.started:
+        return None
+    players = len(session.players)
+    return {
+        'game_id': session.game_id,
+        'game_mode': session.game_mode,
+        'power_cards': bool(session.power_cards),
+        'players': players,
+        'max_players': session.required_players,
+        'open_seats': max(0, session.required_players - players),
+        'player_names': list(session.player_order),
+    }
+
+
+class LobbyIndex:
+    """
+    Open lobbies by (game_mode, power_cards), each bucket a sorted list of listing numbers.
+
+    A lobby keeps its listing number (the order it was first listed in) until it
+    leaves the index, so the `after` cursor of query() stays valid while lobbies
+    come and go. update() reports whether a lobby's entry changed, so callers
+    only push real changes to subscribers.
+    """
+
+    def __init__(self):
+        self.entries = {}  # game_id -> entry
+        self.numbers = {}  # game_id -> listing number
+        self.buckets = {}  # (game_mode, power_cards) -> sorted listing numbers
+        self.by_number = {}  # listing number -> game_id
+        self.counter = itertools.count(1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, session):
+        """
+        Re-index one game from its current state.
+
+        Returns:
+            ('listed', entry) if it was added or changed, ('removed', game_id) if it left,
+            or None if nothing changed
+        """
+        return self.put(session.game_id, lobby_entry(session))
+
+    def put(self, game_id, entry):
+        """update() with an entry built elsewhere (e.g. by another worker), None if the game has left the lobby"""
+        old = self.entries.get(game_id)
+        if entry is None:
+            return ('removed', game_id) if self.remove(game_id) else None
+        if entry == old:
+            return None
+        key = (entry['game_mode'], entry['power_cards'])
+        if old is not None and (old['game_mode'], old['power_cards']) != key:
+            self.remove(game_id)
+        if game_id not in self.numbers:
+            number = next(self.counter)
+            self.numbers[game_id] = number
+            self.by_number[number] = game_id
+            self.buckets.setdefault(key, []).append(number)  # Numbers only grow, so this stays sorted
+        self.entries[game_id] = entry
+        return ('listed', entry)
+
+    def remove(self, game_id):
+        """Drop a game from the index. Returns whether it was listed."""
+        entry = self.entries.pop(game_id, None)
+        if entry is None:
+            return False
+        number = self.numbers.pop(game_id)
+        del self.by_number[number]
+        bucket = self.buckets[(entry['game_mode'], entry['power_cards'])]
+        del bucket[bisect.bisect_left(bucket, number)]
+        return True
+
+    @staticmethod
+    def _from(bucket, after):
+        # Lazily, so a page only touches the numbers it reads
+        return (bucket[i] for i in range(bisect.bisect_right(bucket, after), len(bucket)))
+
+    def query(self, game_mode=None, power_cards=None, min_open_seats=1, after=0, limit=20):
+        """
+        One page of lobbies in listing order.
+
+        Args:
+            game_mode, power_cards: Only lobbies with this mode / setting (None = any)
+            min_open_seats: Only lobbies with at least this many free seats
+            after: Cursor from the previous page ('next'), 0 for the first page
+
+        Returns:
+            {'games': [entry, ...], 'next': cursor for the following page, or None on the last page}
+        """
+        streams = [self._from(bucket, after) for (mode, power), bucket in self.buckets.items()
+                   if (game_mode is None or mode == game_mode) and (power_cards is None or power == power_cards)]
+        games = []
+        for number in heapq.merge(*streams):
+            entry = self.entries[self.by_number[number]]
+            if entry['open_seats'] < min_open_seats:
+                continue
+            if len(games) == limit:
+                return {'games': games, 'next': self.numbers[games[-1]['game_id']]}
+            games.append(entry)
+        return {'games': games, 'next': None}
@@ -0,0 +1,111 @@
+"""
+Matchmaking for the Twenty Dots server
+Players wait in queues bucketed by (player_count, game_mode, power_cards); a table forms as soon as a
+bucket holds enough players, and tables that wait too long are filled up with AI seats
+"""
+import time
+from collections import deque, namedtuple
+
+Ticket = namedtuple('Ticket', 'sid player_name key queued_at')
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of a sorted list (None if it is empty)"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * pct // 100) - 1))]
+
+
+class Matchmaker:
+    """
+    Waiting players per bucket, oldest first.
+
+    enqueue() does O(player_count) work: add the ticket and, if the bucket now holds
+    a full table, take its first player_count tickets. due_tables() hands out the
+    partly filled tables whose oldest player has waited `ai_fill_after` seconds, for
+    the caller to complete with AI seats.
+    """
+
+    def __init__(self, ai_fill_after=30, clock=time.time, history=1000):
+        """
+        Args:
+            ai_fill_after: Seconds the oldest player of a bucket waits before AI seats fill the table
+            clock: Time source (seconds)
+            history: Matched players whose waits are kept for the percentiles
+        """
+        self.ai_fill_after = ai_fill_after
+        self.clock = clock
+        self.queues = {}  # bucket key -> {sid: Ticket} in arrival order
+        self.waiting = {}  # sid -> bucket key
+        self.waits = deque(maxlen=history)  # Seconds from enqueue to table, latest matched players
+        self.tables = 0
+        self.ai_seats = 0
+
+    @staticmethod
+    def bucket(player_count, game_mode, power_cards):
+        return (player_count, game_mode, bool(power_cards))
+
+    def enqueue(self, sid, player_name, key):
+        """
+        Queue a player (a player already queued moves to this bucket, at the back).
+
+        Returns:
+            The tickets of a full table if this arrival completed one, else None
+        """
+        self.cancel(sid)
+        queue = self.queues.setdefault(key, {})
+        queue[sid] = Ticket(sid, player_name, key, self.clock())
+        self.waiting[sid] = key
+        if len(queue) >= key[0]:
+            return self._take(key, key[0])
+        return None
+
+    def cancel(self, sid):
+        """Take a player out of the queue. Returns whether they were queued."""
+        key = self.waiting.pop(sid, None)
+        if key is None:
+            return False
+        del self.queues[key][sid]
+        return True
+
+    def queued(self, key):
+        return len(self.queues.get(key, ()))
+
+    def _take(self, key, count):
+        queue = self.queues[key]
+        now = self.clock()
+        tickets = []
+        for _ in range(count):
+            ticket = queue.pop(next(iter(queue)))
+            del self.waiting[ticket.sid]
+            self.waits.append(now - ticket.queued_at)
+            tickets.append(ticket)
+        self.tables += 1
+        self.ai_seats += key[0] - count
+        return tickets
+
+    def due_tables(self):
+        """Take every bucket whose oldest player waited ai_fill_after seconds. Returns a list of ticket lists."""
+        now = self.clock()
+        tables = []
+        for key, queue in self.queues.items():
+            if queue and now - next(iter(queue.values())).queued_at >= self.ai_fill_after:
+                tables.append(self._take(key, min(len(queue), key[0])))
+        return tables
+
+    def stats(self):
+        ordered = sorted(self.waits)
+        waits = {}
+        for pct in PERCENTILES:
+            value = percentile(ordered, pct)
+            waits[f'p{pct}'] = None if value is None else round(value, 2)
+        return {
+            'queued': {f'{count}p/{mode}/{"power" if power else "plain"}': len(queue)
+                       for (count, mode, power), queue in self.queues.items() if queue},
+            'tables': self.tables,
+            'ai_seats': self.ai_seats,
+            'wait_seconds': waits,
+            'ai_fill_after': self.ai_fill_after,
+        }
@@ -5,6 +5,7 @@ Handles communication with the game server
 import socketio as sio_module
 from PyQt6.QtCore import QObject, pyqtSignal
 import json
+from wire_format import ENCODINGS, decode
 
 class NetworkClient(QObject):
     # Signals for communicating with GUI
@@ -18,6 +19,9 @@ class NetworkClient(QObject):
     your_hand = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     games_list_received = pyqtSignal(list)
+    lobby_updated = pyqtSignal(dict)
+    match_queued = pyqtSignal(dict)
+    match_found = pyqtSignal(dict)
     
     def __init__(self, server_url='http://localhost:5000'):
         super().__init__()
@@ -39,17 +43,23 @@ class NetworkClient(QObject):
         self.sio.on('your_hand', self._on_your_hand)
         self.sio.on('error', self._on_error)
         self.sio.on('games_list', self._on_games_list)
+        self.sio.on('lobby_updated', self._on_lobby_updated)
+        self.sio.on('match_queued', self._on_match_queued)
+        self.sio.on('match_found', self._on_match_found)
+        self.sio.on('encoding_set', self._on_encoding_set)
     
-    def connect_to_server(self):
-        """Connect to the game server"""
+    def connect_to_server(self, game_id=None):
+        """Connect to the game server (game_id routes the connection to the game's worker on a multi-worker server)"""
         import time
+        from urllib.parse import quote
         max_retries = 3
         retry_delay = 2
+        url = f"{self.server_url}?game_id={quote(game_id)}" if game_id else self.server_url
         
         for attempt in range(max_retries):
             try:
                 print(f"Connection attempt {attempt + 1}/{max_retries} to {self.server_url}")
-                self.sio.connect(self.server_url, wait_timeout=10)
+                self.sio.connect(url, wait_timeout=10)
                 self.connected_to_server = True
                 print("Successfully connected!")
                 return True
@@ -114,9 +124,49 @@ class NetworkClient(QObject):
             'game_id': self.game_id
         })
     
-    def list_games(self):
-        """Request list of available games"""
-        self.sio.emit('list_games')
+    def request_state(self, seq=None):
+        """Ask for a full game state after missing a game_updated delta"""
+        self.sio.emit('request_state', {
+            'game_id': self.game_id,
+            'seq': seq
+        })
+    
+    def request_hand(self, seq=None):
+        """Ask for the whole hand after missing a your_hand diff"""
+        self.sio.emit('request_hand', {
+            'game_id': self.game_id,
+            'seq': seq
+        })
+    
+    def list_games(self, game_mode=None, power_cards=None, after=None, subscribe=False):
+        """
+        Request a page of open games (after: the previous page's 'next' cursor).
+        subscribe=True also delivers later lobby changes through lobby_updated.
+        """
+        self.sio.emit('list_games', {
+            'game_mode': game_mode,
+            'power_cards': power_cards,
+            'after': after,
+            'subscribe': subscribe
+        })
+    
+    def unsubscribe_lobby(self):
+        """Stop lobby_updated pushes"""
+        self.sio.emit('unsubscribe_lobby')
+    
+    def find_match(self, player_name, player_count=2, game_mode='twenty_dots', power_cards=False):
+        """Queue for a game with other players (match_found arrives once a table is formed)"""
+        self.player_name = player_name
+        self.sio.emit('find_match', {
+            'player_name': player_name,
+            'player_count': player_count,
+            'game_mode': game_mode,
+            'power_cards': power_cards
+        })
+    
+    def cancel_match(self):
+        """Leave the matchmaking queue"""
+        self.sio.emit('cancel_match')
     
     # Event handlers
     def _on_connect(self):
@@ -129,8 +179,13 @@ class NetworkClient(QObject):
     
     def _on_connected(self, data):
         print(f"Session ID: {data.get('sid')}")
+        # Ask for MessagePack game states and hands if it is installed (the server falls back to JSON)
+        self.sio.emit('set_encoding', {'encodings': ENCODINGS})
         self.connected.emit()
     
+    def _on_encoding_set(self, data):
+        print(f"Wire encoding: {data.get('encoding')}")
+    
     def _on_game_created(self, data):
         print(f"Game created: {data}")
         self.game_created.emit(data)
@@ -145,13 +200,14 @@ class NetworkClient(QObject):
     
     def _on_game_started(self, data):
         print("Game started!")
-        self.game_started.emit(data)
+        self.game_started.emit(decode(data))
     
     def _on_game_updated(self, data):
         print("Game state updated")
-        self.game_updated.emit(data)
+        self.game_updated.emit(decode(data))
     
     def _on_your_hand(self, data):
+        data = decode(data)
         print(f"Received hand update: {len(data.get('hand', []))} cards")
         self.your_hand.emit(data)
     
@@ -164,3 +220,15 @@ class NetworkClient(QObject):
         games = data.get('games', [])
         print(f"Received {len(games)} available games")
         self.games_list_received.emit(games)
+    
+    def _on_lobby_updated(self, data):
+        self.lobby_updated.emit(data)
+    
+    def _on_match_queued(self, data):
+        self.match_queued.emit(data)
+    
+    def _on_match_found(self, data):
+        self.game_id = data.get('game_id')
+        self.player_name = data.get('player_name', self.player_name)
+        print(f"Matched into game {self.game_id} as {self.player_name}")
+        self.match_found.emit(data)
@@ -0,0 +1,108 @@
+"""
+Logging for the Twenty Dots server
+Records are queued by the handlers and written by a background thread, so a handler never waits on console I/O
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Subsystems, each with its own logger under 'twentydots' (LOG_LEVELS sets their levels one by one):
+#   lobby  - connections, creating/joining/starting games, resyncs
+#   turns  - card plays, power cards, dice rolls, turn changes, win checks
+#   ai     - AI turns and the AI executor
+#   engine - twenty_dots.py (deck building, dealing, dot placement)
+SUBSYSTEMS = ['lobby', 'turns', 'ai', 'engine']
+ROOT = 'twentydots'
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+
+def get_logger(subsystem):
+    """Logger for one subsystem ('lobby', 'turns', 'ai', 'engine')"""
+    return logging.getLogger(f'{ROOT}.{subsystem}')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, subsystem, message and any extra= fields"""
+
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'subsystem': record.name[len(ROOT) + 1:] or record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self.RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records (and counts them) instead of blocking when the writer falls behind"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    """'turns=DEBUG,ai=WARNING' -> {'turns': 10, 'ai': 30}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+_listener = None
+
+
+def setup_logging(level=None, levels=None, fmt=None, queue_size=None, stream=None):
+    """
+    Route every 'twentydots' logger through a queue to a background writer.
+
+    Defaults come from the environment:
+        LOG_LEVEL       level for all subsystems (default INFO)
+        LOG_LEVELS      per-subsystem overrides, e.g. 'turns=DEBUG,ai=WARNING'
+        LOG_FORMAT      'text' (default) or 'json' (one object per line)
+        LOG_QUEUE_SIZE  records held for the writer before new ones are dropped (default 10000)
+
+    Returns the queue handler (its .dropped counts records lost to a full queue).
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+    else:
+        atexit.register(lambda: _listener.stop())
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    levels = parse_levels(os.environ.get('LOG_LEVELS')) if levels is None else levels
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+    queue_size = queue_size or int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+
+    root = logging.getLogger(ROOT)
+    root.handlers = [handler]
+    root.propagate = False
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for subsystem in SUBSYSTEMS:
+        get_logger(subsystem).setLevel(levels.get(subsystem, logging.NOTSET))
+
+    _listener = logging.handlers.QueueListener(handler.queue, writer)
+    _listener.start()
+    return handler
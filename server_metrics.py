@@ -0,0 +1,164 @@
+"""
+Prometheus metrics for the Twenty Dots server
+Counters and histograms are updated in place where things happen (a dict lookup and an addition or two),
+and rendered in the Prometheus text format only when /metrics is scraped
+"""
+import bisect
+import time
+
+from socketio import packet
+
+# Seconds; also used for the event loop lag
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                     for key, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label values"""
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values -> count
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Gauge:
+    """Current value per label values: set with set()/inc()/dec(), or read from `collect` at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), collect=None):
+        """
+        Args:
+            collect: Returns {label values tuple: value} when scraped (instead of set values)
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.values = {}
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def samples(self):
+        values = self.collect() if self.collect else self.values
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    """Observations per label values, counted into fixed buckets (cumulated only when rendered)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [count per bucket (the last one past every bound), sum]
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1  # Buckets count values <= their bound
+        series[1] += value
+
+    def samples(self):
+        for key, (counts, total) in sorted(self.series.items()):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield self.name + '_bucket', dict(labels, le=_format_value(bound)), cumulative
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, cumulative
+
+
+class Registry:
+    """The server's metrics, all named `prefix`_..."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(f'{self.prefix}_{name}', help, labels))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._add(Gauge(f'{self.prefix}_{name}', help, labels, collect))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(f'{self.prefix}_{name}', help, labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def metered_packet_class(events, sizes):
+    """
+    Socket.IO packet class (for SocketIO(serializer=...)) that counts every event it encodes.
+
+    Args:
+        events: Counter (labelled by event) of emitted events
+        sizes: Counter (labelled by event) of their encoded bytes
+
+    An emit to a room is encoded once, so it counts once whatever the room's size.
+    """
+    class MeteredPacket(packet.Packet):
+        def encode(self):
+            encoded = super().encode()
+            if self.packet_type in (packet.EVENT, packet.BINARY_EVENT) and self.data:
+                event = self.data[0]
+                events.inc(event)
+                parts = encoded if isinstance(encoded, list) else [encoded]
+                sizes.inc(event, amount=sum(len(part) for part in parts))
+            return encoded
+    return MeteredPacket
+
+
+def monitor_loop_lag(sleep, histogram, interval=0.5):
+    """Background task: observe how much later than asked each sleep(interval) wakes up (the event loop's lag)"""
+    while True:
+        start = time.perf_counter()
+        sleep(interval)
+        histogram.observe(max(0.0, time.perf_counter() - start - interval))
@@ -0,0 +1,252 @@
+"""
+Headless simulator for Twenty Dots
+Plays complete AI-vs-AI games with the online server's turn rules, without sockets or delays
+"""
+import contextlib
+import os
+import random
+import time
+
+from twenty_dots import TwentyDots, Dot
+from ai_player import AIPlayer, apply_power_action
+from hand_beliefs import HandBeliefs
+
+
+def check_winner(game, player_order, game_mode='twenty_dots'):
+    """Return the winning player name for game_mode, or None (same rules as GameSession.check_winner)"""
+    colors = ['red', 'blue', 'green', 'purple']
+    for player_name in player_order:
+        data = game.players[player_name]
+        if game_mode == 'twenty_dots' and data['total_dots'] >= 20:
+            return player_name
+        if game_mode == 'five_colors' and all(data['score'].get(c, 0) >= 5 for c in colors):
+            return player_name
+        if (game_mode == 'five_with_yellow' and data.get('yellow_dots', 0) >= 5
+                and all(data['score'].get(c, 0) >= 5 for c in colors)):
+            return player_name
+    return None
+
+
+class HeadlessGame:
+    """
+    One AI-only game played to completion.
+
+    The deck is shuffled from seed and the wild dice use their own RNG seeded
+    from it too, so replaying a seed with the seats rotated gives every seat
+    the same deal and the same rolls.
+    """
+
+    def __init__(self, ai_players, seed, game_mode='twenty_dots', power_cards=True, max_turns=300):
+        """
+        Args:
+            ai_players: List of AIPlayer, one per seat in turn order
+            seed: Seed for the deck and dice
+            game_mode: 'twenty_dots', 'five_colors' or 'five_with_yellow'
+            power_cards: Include power cards in the deck
+            max_turns: Stop after this many turns (highest total wins)
+        """
+        self.ai_players = ai_players
+        self.player_order = [f"Seat {i + 1}" for i in range(len(ai_players))]
+        self.game_mode = game_mode
+        self.max_turns = max_turns
+        self.dice_rng = random.Random(seed * 7919 + 1)
+
+        random.seed(seed)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.game = TwentyDots(num_players=len(ai_players), difficulty='easy', ai_opponents={}, power_cards=power_cards)
+            self.game.shuffle_deck()
+            self.game.deal_cards(5)
+        self.game.players = {name: data for name, data in zip(self.player_order, self.game.players.values())}
+        self.game.blocks = []
+        self.game.can_roll_dice = True
+        self.game.turn_cards_played = {name: 0 for name in self.player_order}
+        self.beliefs = HandBeliefs(power_cards)
+
+        self.turns = 0
+        self.winner = None
+        self.cpu_seconds = [0.0] * len(ai_players)
+        self.decisions = [0] * len(ai_players)
+
+    def play(self):
+        """Play until someone wins, the cards run out or max_turns is hit. Returns the result dict."""
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            idle_turns = 0
+            while self.winner is None and self.turns < self.max_turns:
+                cards_before = len(self.game.deck) + sum(len(d['hand']) for d in self.game.players.values())
+                self.play_turn()
+                self.turns += 1
+                cards_after = len(self.game.deck) + sum(len(d['hand']) for d in self.game.players.values())
+                # A full round where nobody could play anything means the game is stuck
+                idle_turns = idle_turns + 1 if cards_after == cards_before else 0
+                if idle_turns >= len(self.player_order) * 2:
+                    break
+
+        totals = [self.game.players[name]['total_dots'] for name in self.player_order]
+        winner_seat = self.player_order.index(self.winner) if self.winner else None
+        if winner_seat is None and totals.count(max(totals)) == 1:
+            winner_seat = totals.index(max(totals))
+        return {
+            'winner': winner_seat,
+            'totals': totals,
+            'turns': self.turns,
+            'cpu_seconds': self.cpu_seconds,
+            'decisions': self.decisions,
+        }
+
+    def _decide(self, seat, fn, *args):
+        """Run an AI decision and charge its CPU time to the seat"""
+        start = time.process_time()
+        result = fn(*args)
+        self.cpu_seconds[seat] += time.process_time() - start
+        self.decisions[seat] += 1
+        return result
+
+    def _check_winner(self):
+        self.winner = check_winner(self.game, self.player_order, self.game_mode)
+        return self.winner is not None
+
+    def _draw_up(self, player_name):
+        hand = self.game.players[player_name]['hand']
+        while len(hand) < 5 and self.game.deck:
+            self.game.draw_card(player_name)
+
+    def _advance(self):
+        """Same as GameSession.advance_turn: tick blocks, then next player"""
+        for block in self.game.blocks[:]:
+            block['turns_remaining'] -= 1
+            if block['turns_remaining'] <= 0:
+                self.game.blocks.remove(block)
+        self.game.next_player()
+        self.game.can_roll_dice = False
+        self.game.turn_cards_played[self.game.get_current_player()] = 0
+
+    def _roll(self, player_name):
+        """Roll the wild dice. Returns True if the roll made a match (roll again)"""
+        game = self.game
+        row = self.dice_rng.choice(game.rows)
+        col = self.dice_rng.choice(game.columns)
+        if game.yellow_dot_position:
+            old_row, old_col = game.yellow_dot_position
+            old_dot = game.grid[old_row][old_col]
+            if old_dot and old_dot.color == 'yellow':
+                game.grid[old_row][old_col] = None
+        row_idx, col_idx = game.rows.index(row), game.columns.index(col)
+        game.grid[row_idx][col_idx] = Dot('yellow')
+        game.yellow_dot_position = (row_idx, col_idx)
+        match, match_color = game.check_line_match(row, col, 'yellow')
+        if match:
+            game.collect_dots(match, player_name, match_color)
+            return True
+        return False
+
+    def _play_card(self, player_name, card):
+        """Play one regular card. Returns True if the wild was replaced or collected"""
+        game = self.game
+        game.players[player_name]['hand'].remove(card)
+        game.turn_cards_played[player_name] += 1
+        self.beliefs.record_play(player_name, card)
+        row, col = card.location[0], card.location[1]
+        success, replaced_color = game.place_card_dot(card)
+        if game.check_and_detonate_landmine(f"{row}{col}", player_name):
+            return False
+
+        yellow_affected = False
+        if replaced_color == 'yellow':
+            yellow_affected = True
+            game.players[player_name]['yellow_dots'] += 1
+            game.players[player_name]['total_dots'] += 1
+        elif replaced_color in ['red', 'blue', 'purple', 'green']:
+            game.players[player_name]['score'][replaced_color] += 1
+            game.players[player_name]['total_dots'] += 1
+
+        match, match_color = game.check_line_match(row, col, card.color)
+        if match:
+            for c_idx, r_idx in match:
+                dot = game.grid[r_idx][c_idx]
+                if dot and dot.color == 'yellow':
+                    yellow_affected = True
+                    break
+            game.collect_dots(match, player_name, match_color)
+        return yellow_affected
+
+    def play_turn(self):
+        """Play the current seat's whole turn, following GameSession.execute_ai_move"""
+        game = self.game
+        player_name = game.get_current_player()
+        seat = self.player_order.index(player_name)
+        ai = self.ai_players[seat]
+
+        while True:
+            if game.can_roll_dice:
+                game.can_roll_dice = False
+                if self._roll(player_name):
+                    if self._check_winner():
+                        return
+                    game.can_roll_dice = True
+                    continue
+
+            played = game.turn_cards_played[player_name]
+            if played >= 2:
+                self._advance()
+                return
+
+            if played == 0:
+                control = ai.new_control()
+                beliefs = self.beliefs.view(player_name, game)
+                action = self._decide(seat, ai.choose_power_action, game, player_name, control, beliefs)
+                if action:
+                    result = apply_power_action(game, player_name, action, len(self.player_order))
+                    self.beliefs.record_power_action(player_name, action, result)
+                    game.turn_cards_played[player_name] = 2
+                    if self._check_winner():
+                        return
+                    self._draw_up(player_name)
+                    if result['yellow_collected']:
+                        game.can_roll_dice = True
+                        continue
+                    self._advance()
+                    return
+
+            control = ai.new_control()
+            beliefs = self.beliefs.view(player_name, game)
+            plan = self._decide(seat, ai.plan_turn, game, player_name, 2 - played, control, beliefs)
+            if not plan:
+                self._advance()
+                return
+
+            yellow_affected = self._play_card(player_name, game.players[player_name]['hand'][plan[0]])
+            if self._check_winner():
+                return
+            if game.turn_cards_played[player_name] >= 2:
+                self._draw_up(player_name)
+                if yellow_affected:
+                    game.can_roll_dice = True
+                    continue
+                self._advance()
+                return
+            if yellow_affected:
+                game.can_roll_dice = True
+
+
+def play_game(configs, seed, game_mode='twenty_dots', power_cards=True, max_turns=300):
+    """
+    Play one headless game between AI configurations.
+
+    Args:
+        configs: List of AIPlayer keyword dicts, one per seat in turn order
+            (e.g. {'difficulty': 'hard', 'weights': {...}})
+        seed: Seed for the deal and dice
+
+    Returns:
+        Dict with 'winner' (seat index or None for a draw), 'totals', 'turns',
+        'cpu_seconds' and 'decisions' (both per seat)
+    """
+    ai_players = [AIPlayer(**config) for config in configs]
+    return HeadlessGame(ai_players, seed, game_mode, power_cards, max_turns).play()
+
+
+if __name__ == '__main__':
+    import sys
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    result = play_game([{'difficulty': 'medium'}, {'difficulty': 'hard'}], seed)
+    print(f"Seed {seed}: {result}")
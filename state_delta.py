@@ -0,0 +1,83 @@
+"""
+Delta encoding for Twenty Dots game_updated broadcasts and your_hand diffs
+Shared by the server (diff_state) and the desktop network client (apply_delta, apply_hand_diff)
+"""
+
+# Per-player fields sent whole when they change (discard piles are sent as appended cards)
+PLAYER_FIELDS = ['score', 'total_dots', 'yellow_dots', 'hand_size']
+
+
+def diff_state(old, new):
+    """
+    What changed between two get_game_state() dicts.
+
+    Returns a dict with any of:
+        'cells': [[row_idx, col_idx, cell or None], ...] for changed board cells
+        'players': {name: {changed fields, 'discard_added': [...] or 'discard_pile': [...]}}
+        'players_removed': [name, ...]
+        'set': {top-level key: new value} for every other changed key
+    An empty dict means nothing changed.
+    """
+    delta = {}
+
+    cells = []
+    for r, row in enumerate(new['board']):
+        old_row = old['board'][r]
+        for c, cell in enumerate(row):
+            if cell != old_row[c]:
+                cells.append([r, c, cell])
+    if cells:
+        delta['cells'] = cells
+
+    players = {}
+    for name, data in new['players'].items():
+        before = old['players'].get(name)
+        if before is None:
+            players[name] = data
+            continue
+        changes = {key: data[key] for key in PLAYER_FIELDS if data.get(key) != before.get(key)}
+        pile, old_pile = data['discard_pile'], before['discard_pile']
+        if pile != old_pile:
+            if pile[:len(old_pile)] == old_pile:
+                changes['discard_added'] = pile[len(old_pile):]
+            else:
+                changes['discard_pile'] = pile
+        if changes:
+            players[name] = changes
+    if players:
+        delta['players'] = players
+    removed = [name for name in old['players'] if name not in new['players']]
+    if removed:
+        delta['players_removed'] = removed
+
+    changed = {key: value for key, value in new.items()
+               if key not in ('board', 'players') and old.get(key) != value}
+    if changed:
+        delta['set'] = changed
+    return delta
+
+
+def apply_delta(state, delta):
+    """Apply a diff_state() delta to a state dict in place. Returns the state."""
+    for r, c, cell in delta.get('cells', []):
+        state['board'][r][c] = cell
+    for name, changes in delta.get('players', {}).items():
+        player = state['players'].setdefault(name, {'discard_pile': []})
+        for key, value in changes.items():
+            if key == 'discard_added':
+                player['discard_pile'] = player.get('discard_pile', []) + value
+            else:
+                player[key] = value
+    for name in delta.get('players_removed', []):
+        state['players'].pop(name, None)
+    state.update(delta.get('set', {}))
+    return state
+
+
+def apply_hand_diff(hand, update):
+    """
+    Apply a your_hand diff ('removed' indices into hand, then 'added' cards appended).
+    Returns the new hand list.
+    """
+    removed = set(update['removed'])
+    return [card for index, card in enumerate(hand) if index not in removed] + update['added']
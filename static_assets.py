@@ -0,0 +1,168 @@
+"""
+Static assets for the Twenty Dots server
+The web client and its images are read once at startup, compressed ahead of time (gzip, and brotli when
+installed) and served from memory with content-hashed URLs, long-lived cache headers and ETags
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encodings we can precompress with, preferred first
+ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+
+# Only these types are worth compressing (images are compressed already)
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# A compressed variant is only kept if it saves at least this fraction of the bytes
+MIN_SAVING = 0.1
+
+IMMUTABLE = 'public, max-age=31536000, immutable'  # Hashed URLs: the content behind them never changes
+REVALIDATE = 'no-cache'  # Plain URLs: cache, but check the ETag before every use
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def accepted_encodings(header):
+    """Content-Encodings an Accept-Encoding header allows, as {encoding: q} (q=0 means refused)"""
+    accepted = {}
+    for part in (header or '').split(','):
+        encoding, _, params = part.strip().partition(';')
+        if not encoding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[encoding.strip().lower()] = q
+    return accepted
+
+
+class Asset:
+    """One file: its content type, hash, hashed URL path and body per Content-Encoding ('identity' = uncompressed)"""
+
+    def __init__(self, name, data, content_type):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f'{stem}.{self.digest}{ext}'
+        self.bodies = {'identity': data}
+        if content_type.startswith(COMPRESSIBLE):
+            for encoding in ENCODINGS:
+                body = _compress(data, encoding)
+                if len(body) <= len(data) * (1 - MIN_SAVING):
+                    self.bodies[encoding] = body
+
+    def etag(self, encoding):
+        # Strong ETags differ per encoding, each is a different byte sequence
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def pick_encoding(self, accept_encoding):
+        """Smallest variant the client accepts (identity unless it refuses it)"""
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get('*')
+        allowed = [encoding for encoding in self.bodies if encoding != 'identity'
+                   and accepted.get(encoding, wildcard or 0) > 0]
+        if allowed:
+            return min(allowed, key=lambda encoding: len(self.bodies[encoding]))
+        return 'identity'
+
+
+def _matches(if_none_match, etags):
+    """Whether an If-None-Match header matches any of etags (weak comparison, as RFC 9110 asks for)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return not tags.isdisjoint(etags)
+
+
+class StaticAssets:
+    """
+    Files served from memory, each under its own name and its content-hashed name.
+
+    A later file's references to earlier ones (quoted names, e.g. src="logo.png") are
+    rewritten to their hashed names before it is hashed and compressed, so pages pick
+    up a changed image without browsers ever revalidating the image itself.
+    """
+
+    def __init__(self, root, names):
+        """
+        Args:
+            root: Directory the files are in
+            names: File names, referenced files before the pages that reference them
+        """
+        self.assets = {}  # name and hashed name -> Asset
+        self.compressed_bytes = 0
+        self.original_bytes = 0
+        for name in names:
+            with open(os.path.join(root, name), 'rb') as f:
+                data = f.read()
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if content_type.startswith('text/'):
+                data = self._link(data)
+                content_type += '; charset=utf-8'
+            asset = Asset(name, data, content_type)
+            self.assets[name] = self.assets[asset.hashed_name] = asset
+            self.original_bytes += len(data)
+            self.compressed_bytes += min(len(body) for body in asset.bodies.values())
+
+    def _link(self, data):
+        for name, asset in list(self.assets.items()):
+            if name == asset.name:
+                for quote in (b'"', b"'"):
+                    data = data.replace(quote + name.encode() + quote, quote + asset.hashed_name.encode() + quote)
+        return data
+
+    def url(self, name):
+        """Hashed URL path of a file"""
+        return '/' + self.assets[name].hashed_name
+
+    def response(self, path, accept_encoding=None, if_none_match=None):
+        """
+        Serve a file by its name or hashed name.
+
+        Returns:
+            (status, headers, body), or None if path isn't one of the files
+        """
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        encoding = asset.pick_encoding(accept_encoding)
+        headers = {
+            'ETag': asset.etag(encoding),
+            'Cache-Control': IMMUTABLE if path == asset.hashed_name else REVALIDATE,
+            'Vary': 'Accept-Encoding',
+        }
+        if _matches(if_none_match, {asset.etag(e) for e in asset.bodies}):
+            return 304, headers, b''
+        headers['Content-Type'] = asset.content_type
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, headers, asset.bodies[encoding]
+
+    def stats(self):
+        files = {asset.name: asset for asset in self.assets.values()}
+        return {
+            'files': {name: {'url': '/' + asset.hashed_name,
+                             'bytes': {encoding: len(body) for encoding, body in asset.bodies.items()}}
+                      for name, asset in files.items()},
+            'encodings': ENCODINGS,
+            'original_bytes': self.original_bytes,
+            'smallest_bytes': self.compressed_bytes,
+        }
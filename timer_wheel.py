@@ -0,0 +1,150 @@
+"""
+Timer wheel for the Twenty Dots server
+Delayed callbacks (the pauses between AI moves) kept as entries in a hierarchical timing wheel
+that one background task advances, instead of one sleeping task per waiting game
+"""
+import time
+
+from server_log import get_logger
+
+log = get_logger('ai')
+
+
+class Timer:
+    """One scheduled callback (returned by TimerWheel.schedule, pass it to cancel)"""
+    __slots__ = ('due', 'when', 'fn', 'args', 'done')
+
+    def __init__(self, due, when, fn, args):
+        self.due = due  # Wheel tick it fires on
+        self.when = when  # Clock time it was asked for
+        self.fn = fn
+        self.args = args
+        self.done = False  # Fired or cancelled
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel: `levels` wheels of `slots` slots each.
+
+    A slot of level 0 holds the timers due on one tick; a slot of level n covers
+    slots**n ticks, and its timers move down a level when the wheel below
+    wraps around to it. schedule() and cancel() are O(1) and each tick only looks
+    at one slot, however many timers are pending. Timers past the top level's
+    range wait in its farthest slot and are re-placed until they are due.
+    Cancelled timers stay in their slot and are skipped.
+    """
+
+    def __init__(self, tick=0.05, slots=64, levels=4, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            tick: Seconds per tick (timers fire on the first tick at or after their time)
+            slots: Slots per level
+            levels: Wheels; they span slots**levels ticks together
+            clock: Time source (seconds)
+            sleep: Sleep function for the server's async mode, e.g. socketio.sleep
+        """
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.sleep = sleep
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.started = clock()
+        self.base = 0  # Next tick to process
+        self.pending = 0
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.late_seconds = 0.0
+        self.max_late = 0.0
+
+    def _place(self, timer):
+        ticks = min(timer.due - self.base, self.slots ** self.levels - 1)
+        due = self.base + ticks
+        level = 0
+        while ticks >= self.slots ** (level + 1):
+            level += 1
+        self.wheels[level][(due // self.slots ** level) % self.slots].append(timer)
+
+    def schedule(self, delay, fn, *args):
+        """Call fn(*args) from run() once delay seconds have passed. Returns the Timer."""
+        when = self.clock() + delay
+        due = max(self.base, -int(-(when - self.started) // self.tick))  # First tick at or after `when`
+        timer = Timer(due, when, fn, args)
+        self._place(timer)
+        self.pending += 1
+        self.scheduled += 1
+        return timer
+
+    def cancel(self, timer):
+        """Stop a timer from firing. Returns whether it was still pending."""
+        if timer.done:
+            return False
+        timer.done = True
+        self.pending -= 1
+        self.cancelled += 1
+        return True
+
+    def _cascade(self, level):
+        # Move one slot of `level` down to the levels below (re-placing by due tick)
+        index = (self.base // self.slots ** level) % self.slots
+        timers, self.wheels[level][index] = self.wheels[level][index], []
+        for timer in timers:
+            if not timer.done:
+                self._place(timer)
+
+    def advance(self, now=None):
+        """Fire every timer due by `now` (default: the clock). Returns how many fired."""
+        now = self.clock() if now is None else now
+        target = int((now - self.started) // self.tick)
+        if not self.pending:
+            self.base = max(self.base, target + 1)  # Every slot is empty, skip straight there
+            return 0
+        fired = 0
+        while self.base <= target:
+            level = 1
+            while level < self.levels and self.base % self.slots ** level == 0:
+                level += 1
+            for upper in range(level - 1, 0, -1):  # Highest first, so timers can fall through several levels
+                self._cascade(upper)
+            index = self.base % self.slots
+            timers, self.wheels[0][index] = self.wheels[0][index], []
+            self.base += 1
+            for timer in timers:
+                if timer.done:
+                    continue
+                if timer.due >= self.base:
+                    self._place(timer)  # Was past the top level's range, not due yet
+                    continue
+                timer.done = True
+                self.pending -= 1
+                late = max(0.0, now - timer.when)
+                self.late_seconds += late
+                self.max_late = max(self.max_late, late)
+                self.fired += 1
+                fired += 1
+                try:
+                    timer.fn(*timer.args)
+                except Exception as e:
+                    self.failed += 1
+                    log.exception("[TIMER] %s failed: %s", getattr(timer.fn, '__name__', repr(timer.fn)), e)
+        return fired
+
+    def run(self):
+        """Background task: advance the wheel every tick forever"""
+        while True:
+            self.sleep(self.tick)
+            self.advance()
+
+    def stats(self):
+        return {
+            'pending': self.pending,
+            'scheduled': self.scheduled,
+            'fired': self.fired,
+            'cancelled': self.cancelled,
+            'failed': self.failed,
+            'mean_late_ms': round(self.late_seconds / self.fired * 1000, 1) if self.fired else 0.0,
+            'max_late_ms': round(self.max_late * 1000, 1),
+            'tick_ms': round(self.tick * 1000, 1),
+        }
@@ -0,0 +1,237 @@
+"""
+Self-play tournament for Twenty Dots AI configurations
+Plays round-robin or Swiss schedules over a process pool and rates each configuration with Elo
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulator import play_game
+
+DEFAULT_CONFIGS = [
+    {'name': 'easy', 'difficulty': 'easy'},
+    {'name': 'medium', 'difficulty': 'medium'},
+    {'name': 'hard', 'difficulty': 'hard'},
+]
+
+# Columns of each game row in the results file
+GAME_COLUMNS = ['first', 'second', 'seed', 'score', 'turns', 'cpu_ms_first', 'cpu_ms_second',
+                'decisions_first', 'decisions_second']
+
+
+def _ai_kwargs(config):
+    """AIPlayer keyword arguments for a config (everything except its name)"""
+    return {key: value for key, value in config.items() if key != 'name'}
+
+
+def play_pairing(job):
+    """
+    Process-pool worker: play one seeded deal twice with the seats swapped.
+
+    Args:
+        job: (index_a, index_b, config_a, config_b, seed, game_options)
+
+    Returns:
+        Two game rows (see GAME_COLUMNS); score is 1 / 0.5 / 0 for the first seat
+    """
+    a, b, config_a, config_b, seed, options = job
+    rows = []
+    for first, second, configs in ((a, b, [config_a, config_b]), (b, a, [config_b, config_a])):
+        result = play_game([_ai_kwargs(c) for c in configs], seed, **options)
+        score = 0.5 if result['winner'] is None else (1.0 if result['winner'] == 0 else 0.0)
+        rows.append([first, second, seed, score, result['turns'],
+                     round(result['cpu_seconds'][0] * 1000, 2), round(result['cpu_seconds'][1] * 1000, 2),
+                     result['decisions'][0], result['decisions'][1]])
+    return rows
+
+
+def round_robin_pairings(num_configs, games_per_pair, next_seed):
+    """Every configuration against every other, games_per_pair seeded deals each"""
+    return [(a, b, next_seed())
+            for a in range(num_configs) for b in range(a + 1, num_configs)
+            for _ in range(games_per_pair)]
+
+
+def swiss_pairings(points, played, games_per_pair, next_seed):
+    """
+    One Swiss round: pair neighbours in the standings, avoiding rematches where possible.
+    The lowest-ranked configuration sits out when the count is odd.
+    """
+    order = sorted(range(len(points)), key=lambda i: (-points[i], i))
+    pairings = []
+    while len(order) >= 2:
+        a = order.pop(0)
+        partner = next((b for b in order if (min(a, b), max(a, b)) not in played), order[0])
+        order.remove(partner)
+        played.add((min(a, partner), max(a, partner)))
+        pairings.extend((a, partner, next_seed()) for _ in range(games_per_pair))
+    return pairings
+
+
+def fit_elo(num_configs, games, iterations=200):
+    """
+    Fit Elo ratings (Bradley-Terry, draws count half) to game rows.
+
+    Every configuration also gets one virtual draw against a 1500-rated anchor
+    so unbeaten or winless configurations still get a finite rating.
+    Ratings are centred on 1500.
+    """
+    wins = [[0.0] * num_configs for _ in range(num_configs)]
+    for row in games:
+        first, second, score = row[0], row[1], row[3]
+        wins[first][second] += score
+        wins[second][first] += 1.0 - score
+
+    strength = [1.0] * num_configs
+    for _ in range(iterations):
+        updated = []
+        for i in range(num_configs):
+            won = 0.5 + sum(wins[i])
+            denominator = 1.0 / (strength[i] + 1.0)
+            for j in range(num_configs):
+                played = wins[i][j] + wins[j][i]
+                if played:
+                    denominator += played / (strength[i] + strength[j])
+            updated.append(won / denominator)
+        strength = updated
+
+    ratings = [400 * math.log10(s) for s in strength]
+    mean = sum(ratings) / num_configs
+    return [1500 + r - mean for r in ratings]
+
+
+def rate(num_configs, games, bootstrap=200, seed=0):
+    """Elo ratings with 95% bootstrap confidence intervals. Returns (ratings, [(low, high), ...])"""
+    ratings = fit_elo(num_configs, games)
+    rng = random.Random(seed)
+    samples = [[] for _ in range(num_configs)]
+    for _ in range(bootstrap):
+        resample = [games[rng.randrange(len(games))] for _ in games]
+        for i, r in enumerate(fit_elo(num_configs, resample, iterations=100)):
+            samples[i].append(r)
+    intervals = []
+    for values in samples:
+        values.sort()
+        intervals.append((values[int(0.025 * (len(values) - 1))], values[int(0.975 * (len(values) - 1))]))
+    return ratings, intervals
+
+
+def run_tournament(configs, schedule='round_robin', games_per_pair=10, rounds=None,
+                   workers=None, seed=1, game_options=None):
+    """
+    Run a tournament and return the results dict (see write_results).
+
+    Args:
+        configs: List of dicts with 'name' plus AIPlayer keyword arguments
+            ('difficulty', 'time_budget', 'weights')
+        schedule: 'round_robin' or 'swiss'
+        games_per_pair: Seeded deals per pairing (each played in both seatings)
+        rounds: Swiss rounds (default: ceil(log2(n)) + 1)
+        workers: Process pool size (default: CPU count)
+        seed: First deal seed; later deals count up from it
+        game_options: Extra play_game arguments (game_mode, power_cards, max_turns)
+    """
+    options = game_options or {}
+    seeds = iter(range(seed, seed + 10 ** 9))
+    next_seed = lambda: next(seeds)
+    games = []
+    start = time.time()
+
+    def play_all(pairings, pool):
+        jobs = [(a, b, configs[a], configs[b], s, options) for a, b, s in pairings]
+        for rows in pool.map(play_pairing, jobs):
+            games.extend(rows)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if schedule == 'swiss':
+            points = [0.0] * len(configs)
+            played = set()
+            for round_number in range(rounds or math.ceil(math.log2(max(len(configs), 2))) + 1):
+                first_new = len(games)
+                play_all(swiss_pairings(points, played, games_per_pair, next_seed), pool)
+                for row in games[first_new:]:
+                    points[row[0]] += row[3]
+                    points[row[1]] += 1.0 - row[3]
+                print(f"[TOURNAMENT] Swiss round {round_number + 1} done, {len(games)} games")
+        else:
+            play_all(round_robin_pairings(len(configs), games_per_pair, next_seed), pool)
+
+    ratings, intervals = rate(len(configs), games, seed=seed)
+    standings = []
+    for i, config in enumerate(configs):
+        mine = [(row, 0) for row in games if row[0] == i] + [(row, 1) for row in games if row[1] == i]
+        cpu_ms = sum(row[5 + side] for row, side in mine)
+        decisions = sum(row[7 + side] for row, side in mine)
+        score = sum(row[3] if side == 0 else 1.0 - row[3] for row, side in mine)
+        standings.append({
+            'name': config.get('name', f"config_{i}"),
+            'elo': round(ratings[i], 1),
+            'elo_ci95': [round(intervals[i][0], 1), round(intervals[i][1], 1)],
+            'games': len(mine),
+            'score': score,
+            'cpu_ms_per_game': round(cpu_ms / len(mine), 2) if mine else 0,
+            'cpu_ms_per_decision': round(cpu_ms / decisions, 3) if decisions else 0,
+        })
+
+    return {
+        'schedule': schedule,
+        'seed': seed,
+        'game_options': options,
+        'elapsed_seconds': round(time.time() - start, 1),
+        'configs': configs,
+        'standings': sorted(standings, key=lambda s: -s['elo']),
+        'game_columns': GAME_COLUMNS,
+        'games': games,
+    }
+
+
+def write_results(results, path):
+    """Write results as compact JSON (game rows are arrays, see GAME_COLUMNS)"""
+    with open(path, 'w') as f:
+        json.dump(results, f, separators=(',', ':'))
+
+
+def print_standings(results):
+    print("=" * 78)
+    print(f"{'Config':<20}{'Elo':>8}{'95% CI':>18}{'Games':>7}{'Score':>8}{'ms/game':>9}{'ms/dec':>8}")
+    print("-" * 78)
+    for s in results['standings']:
+        ci = f"[{s['elo_ci95'][0]:.0f}, {s['elo_ci95'][1]:.0f}]"
+        print(f"{s['name']:<20}{s['elo']:>8.0f}{ci:>18}{s['games']:>7}{s['score']:>8.1f}"
+              f"{s['cpu_ms_per_game']:>9.1f}{s['cpu_ms_per_decision']:>8.2f}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Twenty Dots AI self-play tournament")
+    parser.add_argument('--configs', help="JSON file with a list of AI configs (default: easy/medium/hard)")
+    parser.add_argument('--schedule', choices=['round_robin', 'swiss'], default='round_robin')
+    parser.add_argument('--games', type=int, default=10, help="Seeded deals per pairing (each played both ways)")
+    parser.add_argument('--rounds', type=int, help="Swiss rounds")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--game-mode', default='twenty_dots', choices=['twenty_dots', 'five_colors', 'five_with_yellow'])
+    parser.add_argument('--no-power-cards', action='store_true')
+    parser.add_argument('--max-turns', type=int, default=300)
+    parser.add_argument('--out', default='tournament_results.json')
+    args = parser.parse_args()
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+
+    results = run_tournament(
+        configs, args.schedule, args.games, args.rounds, args.workers, args.seed,
+        {'game_mode': args.game_mode, 'power_cards': not args.no_power_cards, 'max_turns': args.max_turns})
+    write_results(results, args.out)
+    print_standings(results)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
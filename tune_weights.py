@@ -0,0 +1,278 @@
+"""
+Offline tuning of the AI evaluation weights
+Generates self-play datasets with the headless simulator, fits the weights and writes a versioned weight file
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_player import AIPlayer, BoardSim, DEFAULT_WEIGHTS, WEIGHTS_FILE, WEIGHTS_FORMAT, _cell, load_weights
+from simulator import HeadlessGame
+from tournament import play_pairing
+
+# Evaluation terms recorded for every position (see position_features)
+FEATURES = ['gain', 'hand_potential', 'open_lines', 'denial']
+
+# Columns of each dataset row
+ROW_COLUMNS = ['seed', 'turn', 'seat', 'move', 'features', 'outcome', 'margin']
+
+# Weights the search never uses on regular-card positions, so they are kept from the current file
+UNTUNED = [name for name in DEFAULT_WEIGHTS if name not in FEATURES]
+
+
+def position_features(ai, game, player_name, plan):
+    """
+    Evaluation terms of the position after playing plan: dots gained, best card
+    left in hand, open lines, and the biggest collection left for the reply.
+    """
+    hand = game.players[player_name]['hand']
+    sim = BoardSim.from_game(game, player_name)
+    gained = sum(sim.play_card(*_cell(hand[i]), hand[i].color) or 0 for i in plan)
+    rest = [c for j, c in enumerate(hand) if j not in plan]
+    potential = max((ai.card_value(sim, c) for c in rest), default=0)
+    open_cells = [(r, c) for r in range(6) for c in range(6) if not sim.grid[r][c] and (r, c) not in sim.blocked]
+    threat = max((ai._threat(sim, r, c) for r, c in open_cells), default=0)
+    return [gained, max(potential, 0), sim.open_lines(), threat]
+
+
+class RecordingGame(HeadlessGame):
+    """HeadlessGame that records every regular-card decision as a dataset row"""
+
+    def __init__(self, ai_players, seed, **options):
+        super().__init__(ai_players, seed, **options)
+        self.seed = seed
+        self.rows = []
+
+    def _decide(self, seat, fn, *args):
+        result = super()._decide(seat, fn, *args)
+        if getattr(fn, '__name__', '') == 'plan_turn' and result:
+            game, player_name = args[0], args[1]
+            hand = game.players[player_name]['hand']
+            move = [f"{hand[i].color}:{hand[i].location[0]}{hand[i].location[1]}" for i in result]
+            features = position_features(self.ai_players[seat], game, player_name, result)
+            self.rows.append([self.seed, self.turns, seat, move, features])
+        return result
+
+
+def generate_chunk(job):
+    """
+    Process-pool worker: play a range of seeded games and stream their rows to one chunk file.
+
+    Args:
+        job: (path, configs, first_seed, games, game_options)
+
+    Returns:
+        (path, games played, rows written)
+    """
+    path, configs, first_seed, games, options = job
+    written = 0
+    with open(path, 'w') as f:
+        for seed in range(first_seed, first_seed + games):
+            # Rotate the seats so every config plays every position
+            rotation = seed % len(configs)
+            seat_configs = configs[rotation:] + configs[:rotation]
+            recorder = RecordingGame([AIPlayer(**c) for c in seat_configs], seed, **options)
+            result = recorder.play()
+            totals = result['totals']
+            for row in recorder.rows:
+                seat = row[2]
+                outcome = 0.5 if result['winner'] is None else (1.0 if result['winner'] == seat else 0.0)
+                margin = totals[seat] - max(t for i, t in enumerate(totals) if i != seat)
+                f.write(json.dumps(row + [outcome, margin], separators=(',', ':')) + '\n')
+                written += 1
+    return path, games, written
+
+
+def generate(out_dir, configs, games, games_per_chunk=200, workers=None, seed=1, game_options=None):
+    """
+    Play self-play games and write their positions to out_dir/chunk_NNNNN.jsonl.
+
+    Each chunk is written by one worker as its games finish, so memory stays
+    flat however many positions the run produces.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for index, first in enumerate(range(seed, seed + games, games_per_chunk)):
+        count = min(games_per_chunk, seed + games - first)
+        jobs.append((os.path.join(out_dir, f"chunk_{index:05d}.jsonl"), configs, first, count, game_options or {}))
+
+    start = time.time()
+    positions = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, played, written in pool.map(generate_chunk, jobs):
+            positions += written
+            print(f"[TUNE] {path}: {played} games, {written} positions")
+    print(f"[TUNE] Generated {positions} positions from {games} games in {time.time() - start:.1f}s")
+    return positions
+
+
+def _solve(matrix, vector):
+    """Solve a small linear system by Gaussian elimination with partial pivoting"""
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        if abs(a[col][col]) < 1e-12:
+            continue
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * y for x, y in zip(a[r], a[col])]
+    return [a[i][n] / a[i][i] if abs(a[i][i]) >= 1e-12 else 0.0 for i in range(n)]
+
+
+def fit_regression(data_dir, target='outcome', ridge=1.0):
+    """
+    Fit weights by ridge regression of the game result on the position features.
+
+    Chunks are streamed line by line into the normal equations, so only a
+    (features + 1)^2 matrix is held in memory.
+
+    Returns:
+        (weights dict with gain scaled to 1.0, number of positions)
+    """
+    size = len(FEATURES) + 1
+    xtx = [[0.0] * size for _ in range(size)]
+    xty = [0.0] * size
+    positions = 0
+    column = ROW_COLUMNS.index(target)
+    for path in sorted(glob.glob(os.path.join(data_dir, 'chunk_*.jsonl'))):
+        with open(path) as f:
+            for line in f:
+                row = json.loads(line)
+                x = [1.0] + [float(v) for v in row[4]]
+                y = float(row[column])
+                for i in range(size):
+                    xty[i] += x[i] * y
+                    for j in range(size):
+                        xtx[i][j] += x[i] * x[j]
+                positions += 1
+    if not positions:
+        raise ValueError(f"No positions found in {data_dir}")
+
+    for i in range(1, size):
+        xtx[i][i] += ridge
+    beta = dict(zip(FEATURES, _solve(xtx, xty)[1:]))
+
+    # Open lines and the reply's threat count against the mover, so their weights are the negated coefficients
+    raw = {'gain': beta['gain'], 'hand_potential': beta['hand_potential'],
+           'open_lines': -beta['open_lines'], 'denial': -beta['denial']}
+    scale = raw['gain'] if raw['gain'] > 0 else 1.0
+    return {name: round(max(value / scale, 0.0), 4) for name, value in raw.items()}, positions
+
+
+def evolve(generations=10, population=6, games=20, sigma=0.3, workers=None, seed=1, game_options=None,
+           difficulty='hard', time_budget=0.05):
+    """
+    Fit weights by a (1 + lambda) evolution strategy over self-play.
+
+    Starts from the current weight file. Each generation mutates the incumbent
+    weights, plays every mutant against the incumbent on the same seeded deals
+    (both seatings), and keeps the best mutant if it scored over 55%.
+
+    Returns:
+        (weights dict, games played)
+    """
+    rng = random.Random(seed)
+    incumbent = dict(DEFAULT_WEIGHTS, **load_weights())
+    played = 0
+    next_seed = seed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for generation in range(generations):
+            mutants = [{name: round(value * rng.lognormvariate(0, sigma), 4) for name, value in incumbent.items()}
+                       for _ in range(population)]
+            seeds = list(range(next_seed, next_seed + games))
+            next_seed += games
+            base = {'difficulty': difficulty, 'time_budget': time_budget}
+            jobs = [(1, 0, dict(base, weights=mutant), dict(base, weights=incumbent), s, game_options or {})
+                    for mutant in mutants for s in seeds]
+            scores = [0.0] * population
+            for index, rows in enumerate(pool.map(play_pairing, jobs)):
+                # play_pairing rows: first seat's score, mutant is index 1
+                for row in rows:
+                    scores[index // games] += row[3] if row[0] == 1 else 1.0 - row[3]
+                played += len(rows)
+            best = max(range(population), key=lambda i: scores[i])
+            rate = scores[best] / (2 * games)
+            if rate > 0.55:
+                incumbent = mutants[best]
+            print(f"[TUNE] Generation {generation + 1}: best mutant scored {rate:.0%}"
+                  f"{' - adopted' if rate > 0.55 else ''} {incumbent}")
+    return incumbent, played
+
+
+def write_weights(weights, path, method, positions=None, games=None):
+    """Write a weight file one version above the file it replaces (untuned weights are carried over)"""
+    previous = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+    merged = {name: previous.get('weights', {}).get(name, DEFAULT_WEIGHTS[name]) for name in UNTUNED}
+    merged.update(weights)
+    data = {
+        'format': WEIGHTS_FORMAT,
+        'version': previous.get('version', 0) + 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'method': method,
+        'positions': positions,
+        'games': games,
+        'weights': merged,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"[TUNE] Wrote weights version {data['version']} to {path}: {merged}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the Twenty Dots AI evaluation weights")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help="Write a self-play dataset in chunk files")
+    gen.add_argument('--out', default='selfplay')
+    gen.add_argument('--games', type=int, default=1000)
+    gen.add_argument('--games-per-chunk', type=int, default=200)
+    gen.add_argument('--configs', help="JSON file with a list of AI configs (default: medium vs hard)")
+
+    fit = commands.add_parser('fit', help="Fit weights to a dataset by ridge regression")
+    fit.add_argument('--data', default='selfplay')
+    fit.add_argument('--target', choices=['outcome', 'margin'], default='outcome')
+    fit.add_argument('--ridge', type=float, default=1.0)
+
+    evo = commands.add_parser('evolve', help="Fit weights by evolutionary self-play")
+    evo.add_argument('--generations', type=int, default=10)
+    evo.add_argument('--population', type=int, default=6)
+    evo.add_argument('--games', type=int, default=20, help="Seeded deals per mutant (each played both ways)")
+    evo.add_argument('--sigma', type=float, default=0.3)
+
+    for command in (gen, evo):
+        command.add_argument('--workers', type=int, default=os.cpu_count())
+        command.add_argument('--seed', type=int, default=1)
+        command.add_argument('--max-turns', type=int, default=300)
+    for command in (fit, evo):
+        command.add_argument('--weights-out', default=WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        configs = [{'difficulty': 'medium'}, {'difficulty': 'hard'}]
+        if args.configs:
+            with open(args.configs) as f:
+                configs = [{k: v for k, v in c.items() if k != 'name'} for c in json.load(f)]
+        generate(args.out, configs, args.games, args.games_per_chunk, args.workers, args.seed,
+                 {'max_turns': args.max_turns})
+    elif args.command == 'fit':
+        weights, positions = fit_regression(args.data, args.target, args.ridge)
+        write_weights(weights, args.weights_out, f"ridge regression on {args.target}", positions=positions)
+    else:
+        weights, games = evolve(args.generations, args.population, args.games, args.sigma, args.workers,
+                                args.seed, {'max_turns': args.max_turns})
+        write_weights(weights, args.weights_out, 'evolution strategy', games=games)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,9 @@
+import logging
+
+# Engine diagnostics (the server routes these through server_log; standalone, warnings go to stderr)
+log = logging.getLogger('twentydots.engine')
+
+
 class Card:
     """Represents a single card in the Twenty Dots deck."""
     
@@ -184,14 +190,14 @@ class TwentyDots:
             True if successful, False if invalid position or already occupied
         """
         if col not in self.columns or row not in self.rows:
-            print(f"Invalid position: {col}{row}")
+            log.warning("Invalid position: %s%s", col, row)
             return False
         
         col_idx = self.columns.index(col)
         row_idx = self.rows.index(row)
         
         if self.grid[row_idx][col_idx]:
-            print(f"Position {col}{row} already occupied!")
+            log.warning("Position %s%s already occupied!", col, row)
             return False
         
         self.grid[row_idx][col_idx] = True
@@ -209,14 +215,14 @@ class TwentyDots:
             True if successful, False if invalid position or empty
         """
         if col not in self.columns or row not in self.rows:
-            print(f"Invalid position: {col}{row}")
+            log.warning("Invalid position: %s%s", col, row)
             return False
         
         col_idx = self.columns.index(col)
         row_idx = self.rows.index(row)
         
         if not self.grid[row_idx][col_idx]:
-            print(f"Position {col}{row} is already empty!")
+            log.warning("Position %s%s is already empty!", col, row)
             return False
         
         self.grid[row_idx][col_idx] = False
@@ -231,7 +237,7 @@ class TwentyDots:
         import random
         deck = []
         
-        print("[DECK CREATION] Building new shuffled deck...")
+        log.debug("[DECK CREATION] Building new shuffled deck...")
         
         # Create 36 regular location cards for each color (144 total)
         all_locations = []
@@ -243,7 +249,7 @@ class TwentyDots:
             for location in all_locations:
                 deck.append(Card(location, color))
         
-        print(f"[DECK CREATION] Created {len(deck)} cards across {len(self.colors)} colors")
+        log.debug("[DECK CREATION] Created %s cards across %s colors", len(deck), len(self.colors))
         
         # Add power cards separately (not tied to specific locations)
         if self.power_cards_enabled:
@@ -276,20 +282,20 @@ class TwentyDots:
         player_names = list(self.players.keys())
         card_idx = 0
         
-        print(f"[DEAL_CARDS] Starting to deal {cards_per_player} cards to {len(player_names)} players")
-        print(f"[DEAL_CARDS] First 10 cards in deck: {[(c.location, c.color) for c in self.deck[:10]]}")
+        log.debug("[DEAL_CARDS] Starting to deal %s cards to %s players", cards_per_player, len(player_names))
+        log.debug("[DEAL_CARDS] First 10 cards in deck: %s", [(c.location, c.color) for c in self.deck[:10]])
         
         for _ in range(cards_per_player):
             for player in player_names:
                 if card_idx < len(self.deck):
                     card = self.deck[card_idx]
-                    print(f"[DEAL_CARDS] Dealing card {card_idx} to {player}: {card.location} {card.color}")
+                    log.debug("[DEAL_CARDS] Dealing card %s to %s: %s %s", card_idx, player, card.location, card.color)
                     self.players[player]['hand'].append(card)
                     card_idx += 1
         
         # Remaining cards stay in deck for drawing
         self.deck = self.deck[card_idx:]
-        print(f"[DEAL_CARDS] Dealing complete. {len(self.deck)} cards remaining in deck")
+        log.debug("[DEAL_CARDS] Dealing complete. %s cards remaining in deck", len(self.deck))
     
     def draw_card(self, player_name: str) -> Card:
         """Draw a card from the deck for a player."""
@@ -521,7 +527,7 @@ class TwentyDots:
                 # If it's a yellow dot, track it separately
                 if dot.color == 'yellow':
                     self.players[player_name]['yellow_dots'] += multiplier
-                    print(f"[COLLECT_DOTS] {player_name} collected yellow dot! Total yellow: {self.players[player_name]['yellow_dots']}")
+                    log.debug("[COLLECT_DOTS] %s collected yellow dot! Total yellow: %s", player_name, self.players[player_name]['yellow_dots'])
                 else:
                     # Award points for the actual dot color collected
                     self.players[player_name]['score'][dot.color] += multiplier
@@ -0,0 +1,142 @@
+"""
+Wire encodings for Twenty Dots Socket.IO payloads
+Clients that negotiate it get MessagePack with board cells as small ints; everyone else gets JSON
+"""
+import json
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Board cell codes in MessagePack payloads (0 = empty cell)
+DOT_CODES = {'red': 1, 'blue': 2, 'purple': 3, 'green': 4, 'yellow': 5}
+DOT_COLORS = {code: color for color, code in DOT_CODES.items()}
+ROWS = 'ABCDEF'
+COLUMNS = '123456'
+
+# Encodings this side can speak, preferred first
+ENCODINGS = ['msgpack', 'json'] if msgpack else ['json']
+
+
+class JSONText(str):
+    """A payload already encoded as JSON (e.g. a cached game state), sent by PacketJSON as it is"""
+
+
+class PacketJSON:
+    """
+    json module for Socket.IO packets (SocketIO(json=...)): event arguments that are
+    JSONText are spliced into the packet instead of being encoded again.
+    """
+
+    @staticmethod
+    def dumps(data, **kwargs):
+        if isinstance(data, list) and any(isinstance(arg, JSONText) for arg in data):
+            return '[' + ','.join(arg if isinstance(arg, JSONText) else json.dumps(arg, **kwargs) for arg in data) + ']'
+        return json.dumps(data, **kwargs)
+
+    loads = staticmethod(json.loads)
+
+
+def negotiate(offered):
+    """First encoding in the client's offered list that we support (JSON if none)"""
+    for encoding in offered or []:
+        if encoding in ENCODINGS:
+            return encoding
+    return 'json'
+
+
+def _compact_cell(cell):
+    return DOT_CODES[cell['color']] if cell else 0
+
+
+def _expand_cell(code, r, c):
+    return {'color': DOT_COLORS[code], 'location': (ROWS[r], COLUMNS[c])} if code else None
+
+
+def compact_payload(payload):
+    """
+    Board cells as small ints: full states get a board of codes, game_updated
+    deltas get [row, col, code] cells. Other payloads are returned as they are.
+    """
+    if 'board' in payload:
+        payload = dict(payload, board=[[_compact_cell(cell) for cell in row] for row in payload['board']])
+    delta = payload.get('delta')
+    if delta and 'cells' in delta:
+        cells = [[r, c, _compact_cell(cell)] for r, c, cell in delta['cells']]
+        payload = dict(payload, delta=dict(delta, cells=cells))
+    return payload
+
+
+def expand_payload(payload):
+    """Undo compact_payload()"""
+    if 'board' in payload:
+        payload['board'] = [[_expand_cell(code, r, c) for c, code in enumerate(row)]
+                            for r, row in enumerate(payload['board'])]
+    delta = payload.get('delta')
+    if delta and 'cells' in delta:
+        delta['cells'] = [[r, c, _expand_cell(code, r, c)] for r, c, code in delta['cells']]
+    return payload
+
+
+def encode(payload, encoding):
+    """Payload as it goes on the wire: MessagePack bytes, or the dict itself for Socket.IO's JSON"""
+    if encoding == 'msgpack':
+        return msgpack.packb(compact_payload(payload), use_bin_type=True)
+    return payload
+
+
+def decode(data):
+    """Payload dict from either encoding (clients call this on every encoded event)"""
+    if isinstance(data, (bytes, bytearray)):
+        return expand_payload(msgpack.unpackb(data, raw=False, strict_map_key=False))
+    return data
+
+
+class WireStats:
+    """
+    Payload size and encode time per event and encoding.
+
+    MessagePack payloads are measured on every emit, since encoding them is
+    the real work. JSON payloads are encoded by Socket.IO, so only one emit in
+    `sample_every` per event is dumped once more to measure it (the packet
+    counters behind /metrics count every emitted byte anyway); JSONText ones
+    are measured every time.
+    """
+
+    def __init__(self, sample_every=50):
+        self.sample_every = sample_every
+        self.events = {}  # event -> encoding -> [emits, measured emits, measured bytes, measured seconds]
+
+    def encode(self, event, payload, encoding):
+        """encode() one payload and record its size and encode time (sampled for JSON)"""
+        entry = self.events.setdefault(event, {}).setdefault(encoding, [0, 0, 0, 0.0])
+        entry[0] += 1
+        if encoding == 'msgpack':
+            start = time.perf_counter()
+            data = encode(payload, encoding)
+            size = len(data)
+        elif isinstance(payload, JSONText):
+            start = time.perf_counter()
+            data = payload
+            size = len(payload)  # Encoded already, measuring it is free
+        elif entry[0] % self.sample_every == 1 or self.sample_every == 1:
+            start = time.perf_counter()
+            data = payload
+            size = len(json.dumps(payload, separators=(',', ':')))
+        else:
+            return payload
+        entry[1] += 1
+        entry[2] += size
+        entry[3] += time.perf_counter() - start
+        return data
+
+    def summary(self):
+        return {event: {encoding: {
+            'emits': emits,
+            'measured': measured,
+            'mean_bytes': round(size / measured, 1),
+            'mean_encode_us': round(seconds / measured * 1e6, 1),
+        } for encoding, (emits, measured, size, seconds) in encodings.items() if measured}
+            for event, encodings in self.events.items()}